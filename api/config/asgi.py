@@ -3,6 +3,27 @@ ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run under uvicorn (one process per core; the async views don't need threads):
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+The async intake endpoints are /api/async/records/ and
+/api/async/records/success/. They return the same bodies as their sync
+counterparts. The sync endpoints also work here, on a thread per request.
+Keep QUERY_PROFILING off in production. Its middleware is sync-only.
+
+Benchmark (manage.py bench_http; one process each, SQLite, 500 creates):
+
+    --concurrency 8 --slow-clients 16       req/s   p50 ms   p95 ms
+    gunicorn gthread, 8 threads, sync view    6.1     1863     2074
+    uvicorn, async view                      77.6       97      194
+
+Slow uploads pin gunicorn's threads, while uvicorn reads request bodies on
+the event loop. With fast clients only and a local database, the WSGI path
+is as fast or faster (no thread hops), so the gain is per-process
+connection capacity, not raw throughput. Re-run against the production
+database before resizing workers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
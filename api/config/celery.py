@@ -1,14 +1,32 @@
 """
 Celery configuration for api project.
 
-Start worker: celery -A config worker -l info
-Start beat:   celery -A config beat -l info
+Tasks are routed to dispatch, maintenance and notifications queues (see
+records.routing), and a worker only consumes the queues given with -Q; a
+bare `celery -A config worker` consumes notifications alone and never
+processes a batch.
+
+Development (one worker for everything):
+
+    celery -A config worker -Q dispatch,maintenance,notifications -l info
+    celery -A config beat -l info
+
+With DISPATCH_SHARDS > 1, add the shard queues (dispatch.0 ... dispatch.N-1):
+
+    celery -A config worker -Q dispatch,dispatch.0,dispatch.1,maintenance,notifications -l info
+
+Production (one worker per queue):
+
+    celery -A config worker -Q dispatch -n dispatch@%h -l info
+    celery -A config worker -Q maintenance -n maintenance@%h -l info
+    celery -A config worker -Q notifications -n notifications@%h -l info
 """
 
 import os
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import celeryd_init
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -21,12 +39,45 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Auto-discover tasks in all installed apps
 app.autodiscover_tasks()
 
-# Beat schedule: Run batch processing every 2 hours
+# Beat schedule: Safety-net sweep every 2 hours (new records are dispatched
+# by records.microbatch within seconds)
 app.conf.beat_schedule = {
-    'process-batch-every-1-second': {
-        'task': 'records.tasks.process_batch',
+    'dispatch-backlog-every-2-hours': {
+        'task': 'records.tasks.dispatch_backlog',
         'schedule': crontab(minute=0, hour='*/2'),  # Every 2 hours   
     },
+    'recover-batch-attempts-every-5-minutes': {
+        'task': 'records.tasks.recover_batch_attempts',
+        'schedule': crontab(minute='*/5'),
+    },
+    'reconcile-stats-every-15-minutes': {
+        'task': 'records.tasks.reconcile_stats',
+        'schedule': crontab(minute='*/15'),
+    },
+    'archive-records-daily': {
+        'task': 'records.tasks.archive_records',
+        'schedule': crontab(minute=30, hour=3),
+    },
 }
 
 app.conf.timezone = 'UTC'
+
+
+@celeryd_init.connect
+def configure_queue_worker(sender=None, conf=None, options=None, **kwargs):
+    """Apply WORKER_QUEUE_OPTIONS for the queues this worker consumes (-Q)."""
+    # Import here: Django settings are only ready once the worker starts
+    from records.routing import worker_options
+
+    queues = options.get('queues') or [conf.task_default_queue]
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    tuned = worker_options(queues)
+    if tuned is None:
+        return
+
+    # Explicit command-line values win
+    if not options.get('concurrency'):
+        conf.worker_concurrency = tuned['concurrency']
+    if not options.get('prefetch_multiplier'):
+        conf.worker_prefetch_multiplier = tuned['prefetch_multiplier']
@@ -3,6 +3,7 @@ Django settings for api project.
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config
 import os
 
@@ -58,7 +59,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise that stays async under ASGI (see records.middleware)
+    'records.middleware.WhiteNoiseMiddleware',
 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +68,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Removes itself unless METRICS_ENABLED
+    'records.metrics.MetricsMiddleware',
+    # Removes itself unless QUERY_PROFILING
+    'records.profiling.QueryProfileMiddleware',
 ]
 
 
@@ -74,6 +80,8 @@ MIDDLEWARE = [
 # ========================
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['ETag', 'Server-Timing', 'Idempotent-Replayed']
 
 
 # ========================
@@ -162,6 +170,164 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 
+# ========================
+# RECORDS API
+# ========================
+
+# Keyset pagination for GET /api/records/success/
+RECORDS_PAGE_SIZE = config('RECORDS_PAGE_SIZE', default=50, cast=int)
+RECORDS_MAX_PAGE_SIZE = config('RECORDS_MAX_PAGE_SIZE', default=500, cast=int)
+
+# Rows fetched per round-trip when streaming from a server-side cursor
+RECORDS_STREAM_CHUNK_SIZE = config('RECORDS_STREAM_CHUNK_SIZE', default=2000, cast=int)
+
+# Rows per keyset query (and Parquet row group) for exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=5000, cast=int)
+
+# Serialize list responses from value tuples (orjson when installed) instead
+# of DRF serializer fields; output is byte-identical
+RECORDS_FAST_SERIALIZATION = config('RECORDS_FAST_SERIALIZATION', default=True, cast=bool)
+
+# Seconds a cached SUCCESS page lives (it is also invalidated on every write)
+RECORDS_LIST_CACHE_TIMEOUT = config('RECORDS_LIST_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Seconds a create response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+
+# Per-status counters and hourly throughput in Redis (see records.stats)
+STATS_ENABLED = config('STATS_ENABLED', default=True, cast=bool)
+STATS_HOURLY_RETENTION_HOURS = config('STATS_HOURLY_RETENTION_HOURS', default=168, cast=int)
+
+# Bulk ingestion via POST /api/records/bulk/
+RECORDS_BULK_MAX_ITEMS = config('RECORDS_BULK_MAX_ITEMS', default=5000, cast=int)
+RECORDS_BULK_CHUNK_SIZE = config('RECORDS_BULK_CHUNK_SIZE', default=500, cast=int)
+
+
+# ========================
+# BATCH PROCESSING
+# ========================
+
+# Records claimed per external API call
+BATCH_SIZE = config('BATCH_SIZE', default=10, cast=int)
+
+# process_batch workers fanned out by each dispatch_backlog run
+BATCH_CONCURRENCY = config('BATCH_CONCURRENCY', default=4, cast=int)
+
+# Keep claiming batches until the queue is empty (bounded per run)
+BATCH_DRAIN = config('BATCH_DRAIN', default=True, cast=bool)
+BATCH_MAX_BATCHES_PER_RUN = config('BATCH_MAX_BATCHES_PER_RUN', default=100, cast=int)
+
+# Sub-batches claimed per round and posted concurrently (1 = one at a time)
+BATCH_FANOUT = config('BATCH_FANOUT', default=1, cast=int)
+BATCH_FANOUT_CONCURRENCY = config('BATCH_FANOUT_CONCURRENCY', default=8, cast=int)
+
+# Event-driven micro-batching: flush after N new records or T ms, whichever
+# comes first (the Beat run stays as a safety-net sweeper)
+MICROBATCH_ENABLED = config('MICROBATCH_ENABLED', default=True, cast=bool)
+MICROBATCH_MAX_RECORDS = config('MICROBATCH_MAX_RECORDS', default=50, cast=int)
+MICROBATCH_MAX_WAIT_MS = config('MICROBATCH_MAX_WAIT_MS', default=2000, cast=int)
+
+# Adaptive (AIMD) batch sizing from observed external API latency
+BATCH_ADAPTIVE = config('BATCH_ADAPTIVE', default=True, cast=bool)
+BATCH_SIZE_MIN = config('BATCH_SIZE_MIN', default=5, cast=int)
+BATCH_SIZE_MAX = config('BATCH_SIZE_MAX', default=500, cast=int)
+BATCH_ADAPTIVE_TARGET_LATENCY = config('BATCH_ADAPTIVE_TARGET_LATENCY', default=10.0, cast=float)
+BATCH_ADAPTIVE_MAX_ERROR_RATE = config('BATCH_ADAPTIVE_MAX_ERROR_RATE', default=0.1, cast=float)
+BATCH_ADAPTIVE_INCREASE = config('BATCH_ADAPTIVE_INCREASE', default=5, cast=int)
+BATCH_ADAPTIVE_DECREASE = config('BATCH_ADAPTIVE_DECREASE', default=0.5, cast=float)
+BATCH_ADAPTIVE_WINDOW = config('BATCH_ADAPTIVE_WINDOW', default=50, cast=int)
+
+# Per-record retries: exponential backoff (seconds) and dead-lettering
+BATCH_MAX_ATTEMPTS = config('BATCH_MAX_ATTEMPTS', default=5, cast=int)
+BATCH_RETRY_BASE_DELAY = config('BATCH_RETRY_BASE_DELAY', default=300, cast=int)
+BATCH_RETRY_MAX_DELAY = config('BATCH_RETRY_MAX_DELAY', default=86400, cast=int)
+
+# Seconds before an IN_PROGRESS claim is considered abandoned and reclaimable
+BATCH_CLAIM_TIMEOUT = config('BATCH_CLAIM_TIMEOUT', default=600, cast=int)
+
+# Seconds a batch may sit with a stored but unapplied response before the
+# recovery sweep applies it (must be well under BATCH_CLAIM_TIMEOUT)
+BATCH_RECOVERY_GRACE = config('BATCH_RECOVERY_GRACE', default=60, cast=int)
+
+# Daily archival: SUCCESS records older than this move to ArchivedRecord,
+# ARCHIVE_CHUNK_SIZE rows per transaction, at most ARCHIVE_MAX_CHUNKS_PER_RUN
+ARCHIVE_RETENTION_DAYS = config('ARCHIVE_RETENTION_DAYS', default=90, cast=int)
+ARCHIVE_CHUNK_SIZE = config('ARCHIVE_CHUNK_SIZE', default=5000, cast=int)
+ARCHIVE_MAX_CHUNKS_PER_RUN = config('ARCHIVE_MAX_CHUNKS_PER_RUN', default=200, cast=int)
+
+
+# ========================
+# EXTERNAL BATCH API
+# ========================
+
+EXTERNAL_API_URL = config('EXTERNAL_API_URL', default='https://dev.micro.mgsigma.net/batch/process')
+
+# Pooled keep-alive connections per worker process (>= BATCH_FANOUT_CONCURRENCY)
+EXTERNAL_API_POOL_SIZE = config('EXTERNAL_API_POOL_SIZE', default=10, cast=int)
+
+# Seconds; a slow response should not hold a worker forever
+EXTERNAL_API_CONNECT_TIMEOUT = config('EXTERNAL_API_CONNECT_TIMEOUT', default=5, cast=float)
+EXTERNAL_API_READ_TIMEOUT = config('EXTERNAL_API_READ_TIMEOUT', default=30, cast=float)
+
+# Transport-level retries (connect errors and 503) with jittered backoff
+EXTERNAL_API_RETRIES = config('EXTERNAL_API_RETRIES', default=3, cast=int)
+EXTERNAL_API_BACKOFF = config('EXTERNAL_API_BACKOFF', default=0.5, cast=float)
+EXTERNAL_API_BACKOFF_JITTER = config('EXTERNAL_API_BACKOFF_JITTER', default=0.5, cast=float)
+
+# Gzip request bodies (only enable if the API accepts Content-Encoding: gzip)
+EXTERNAL_API_GZIP = config('EXTERNAL_API_GZIP', default=False, cast=bool)
+EXTERNAL_API_GZIP_MIN_BYTES = config('EXTERNAL_API_GZIP_MIN_BYTES', default=1024, cast=int)
+
+# Circuit breaker shared by all workers: open after THRESHOLD failures within
+# WINDOW seconds, fail fast for RESET_TIMEOUT seconds, then probe once
+EXTERNAL_API_BREAKER_ENABLED = config('EXTERNAL_API_BREAKER_ENABLED', default=True, cast=bool)
+EXTERNAL_API_BREAKER_THRESHOLD = config('EXTERNAL_API_BREAKER_THRESHOLD', default=5, cast=int)
+EXTERNAL_API_BREAKER_WINDOW = config('EXTERNAL_API_BREAKER_WINDOW', default=60, cast=float)
+EXTERNAL_API_BREAKER_RESET_TIMEOUT = config('EXTERNAL_API_BREAKER_RESET_TIMEOUT', default=30, cast=float)
+# A 429 opens the breaker for its Retry-After (RESET_TIMEOUT if missing),
+# capped at RETRY_AFTER_MAX seconds
+EXTERNAL_API_RETRY_AFTER_MAX = config('EXTERNAL_API_RETRY_AFTER_MAX', default=300, cast=float)
+
+# Token bucket across all workers: requests/second (0 disables) and burst size;
+# callers wait at most RATE_MAX_WAIT seconds for a token before backing off
+EXTERNAL_API_RATE_LIMIT = config('EXTERNAL_API_RATE_LIMIT', default=10, cast=float)
+EXTERNAL_API_RATE_BURST = config('EXTERNAL_API_RATE_BURST', default=20, cast=int)
+EXTERNAL_API_RATE_MAX_WAIT = config('EXTERNAL_API_RATE_MAX_WAIT', default=1.0, cast=float)
+
+
+# ========================
+# METRICS
+# ========================
+
+# Prometheus metrics at /metrics (needs prometheus_client); when off, the
+# instrumentation is a no-op and the middleware is not loaded
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+
+
+# ========================
+# QUERY PROFILING
+# ========================
+
+# Count queries and DB time per request/task (Server-Timing header, logs)
+QUERY_PROFILING = config('QUERY_PROFILING', default=DEBUG, cast=bool)
+
+# Max queries per request (by URL name) or task run (by task name);
+# QUERY_BUDGET_STRICT raises instead of logging, for tests
+QUERY_BUDGETS = {
+    'record-create': 3,
+    'record-bulk-create': 5,
+    'records-success': 2,
+    'process_batch': 15,
+}
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
+# Fraction of requests run under cProfile (0 disables); the slowest
+# PROFILE_KEEP profiles are kept in PROFILE_DIR
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_KEEP = config('PROFILE_KEEP', default=20, cast=int)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'logs' / 'profiles'))
+
+
 # ========================
 # CELERY
 # ========================
@@ -173,6 +339,58 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Queues and routing (see records.routing). Unrouted tasks go to the light
+# notifications queue.
+CELERY_TASK_ROUTES = ('records.routing.route_task',)
+CELERY_TASK_DEFAULT_QUEUE = 'notifications'
+
+# Ack after the task finishes, so a worker killed mid-batch has its task
+# redelivered (claims and the batch outbox make that safe)
+CELERY_TASK_ACKS_LATE = config('CELERY_TASK_ACKS_LATE', default=True, cast=bool)
+CELERY_TASK_REJECT_ON_WORKER_LOST = CELERY_TASK_ACKS_LATE
+
+# Worker concurrency and prefetch multiplier per queue, applied when a
+# worker starts (unless given on the command line). Long dispatch and
+# maintenance tasks reserve nothing ahead, so an idle process picks them up.
+WORKER_QUEUE_OPTIONS = {
+    'dispatch': {
+        'concurrency': config('DISPATCH_WORKER_CONCURRENCY', default=4, cast=int),
+        'prefetch_multiplier': 1,
+    },
+    'maintenance': {
+        'concurrency': config('MAINTENANCE_WORKER_CONCURRENCY', default=1, cast=int),
+        'prefetch_multiplier': 1,
+    },
+    'notifications': {
+        'concurrency': config('NOTIFICATIONS_WORKER_CONCURRENCY', default=4, cast=int),
+        'prefetch_multiplier': config('NOTIFICATIONS_PREFETCH_MULTIPLIER', default=4, cast=int),
+    },
+}
+
+# Split dispatch into queues dispatch.0 .. dispatch.N-1 by record ID (1 = off)
+DISPATCH_SHARDS = config('DISPATCH_SHARDS', default=1, cast=int)
+
+
+# ========================
+# REDIS
+# ========================
+
+# Shared worker state (adaptive batch sizing); defaults to the Celery broker
+REDIS_URL = config('REDIS_URL', default=CELERY_BROKER_URL)
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=2, cast=float)
+
+# Response cache (SUCCESS list pages)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+        },
+    }
+}
+
 
 # ========================
 # DEFAULT PRIMARY KEY
@@ -0,0 +1,157 @@
+"""
+Adaptive batch sizing driven by observed external API latency.
+
+Every batch reports its size, latency and outcome. Recent observations are
+kept in Redis so all workers share one view of the downstream, and the batch
+size is adjusted AIMD-style: grow additively while p95 latency stays under
+the target, cut multiplicatively on errors or slow responses.
+
+Usage:
+    from records.adaptive import batch_size_controller
+
+    size = batch_size_controller.current()
+    ...
+    batch_size_controller.observe(len(records), latency, ok=True)
+"""
+
+import redis
+from django.conf import settings
+
+from records.logger import logger
+from records.redis_client import get_redis
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class AdaptiveBatchSize:
+    """AIMD batch size controller with state shared through Redis."""
+
+    SIZE_KEY = 'records:batch_size:current'
+    LATENCY_KEY = 'records:batch_size:latency'
+    ERRORS_KEY = 'records:batch_size:errors'
+    # WATCH retries per observation before giving up the step
+    MAX_UPDATE_TRIES = 5
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    @property
+    def enabled(self):
+        return settings.BATCH_ADAPTIVE
+
+    def _clamp(self, size):
+        return max(settings.BATCH_SIZE_MIN, min(settings.BATCH_SIZE_MAX, int(size)))
+
+    def current(self):
+        """Return the batch size to use now (BATCH_SIZE if disabled or Redis is down)."""
+        if not self.enabled:
+            return settings.BATCH_SIZE
+        try:
+            value = self.client.get(self.SIZE_KEY)
+        except redis.RedisError as e:
+            logger.warning("Adaptive batch size unavailable, using BATCH_SIZE: %s", e)
+            return settings.BATCH_SIZE
+        return self._clamp(value) if value is not None else self._clamp(settings.BATCH_SIZE)
+
+    def stats(self):
+        """Return p50/p95 latency and error rate over the observation window."""
+        pipe = self.client.pipeline()
+        pipe.lrange(self.LATENCY_KEY, 0, -1)
+        pipe.lrange(self.ERRORS_KEY, 0, -1)
+        return self._summarize(*pipe.execute())
+
+    def _summarize(self, latencies, errors):
+        latencies = [float(v) for v in latencies]
+        errors = [int(v) for v in errors]
+        return {
+            'p50': percentile(latencies, 50) if latencies else None,
+            'p95': percentile(latencies, 95) if latencies else None,
+            'error_rate': sum(errors) / len(errors) if errors else 0.0,
+            'samples': len(errors),
+        }
+
+    def observe(self, batch_size, latency, ok=True):
+        """
+        Record one external call of `batch_size` records and adjust the
+        shared batch size.
+
+        Each step starts from the shared current size, not from
+        `batch_size`: a micro-batch or the tail of a drain is smaller than
+        the size in force and says nothing about what it should be. The
+        read-modify-write runs under WATCH, so concurrent workers cannot
+        overwrite each other's step.
+        """
+        if not self.enabled:
+            return
+
+        window = settings.BATCH_ADAPTIVE_WINDOW
+        try:
+            pipe = self.client.pipeline()
+            if ok:
+                pipe.lpush(self.LATENCY_KEY, latency)
+                pipe.ltrim(self.LATENCY_KEY, 0, window - 1)
+            pipe.lpush(self.ERRORS_KEY, 0 if ok else 1)
+            pipe.ltrim(self.ERRORS_KEY, 0, window - 1)
+            pipe.execute()
+
+            with self.client.pipeline() as pipe:
+                for _ in range(self.MAX_UPDATE_TRIES):
+                    try:
+                        pipe.watch(self.SIZE_KEY)
+                        value = pipe.get(self.SIZE_KEY)
+                        size = self._clamp(value if value is not None else settings.BATCH_SIZE)
+                        stats = self._summarize(
+                            pipe.lrange(self.LATENCY_KEY, 0, -1),
+                            pipe.lrange(self.ERRORS_KEY, 0, -1),
+                        )
+                        new_size = self._next_size(size, latency, ok, stats)
+                        pipe.multi()
+                        pipe.set(self.SIZE_KEY, new_size)
+                        pipe.execute()
+                        break
+                    except redis.WatchError:
+                        continue
+                else:
+                    # Other workers kept stepping; theirs stand for this round
+                    return
+        except redis.RedisError as e:
+            logger.warning("Could not update adaptive batch size: %s", e)
+            return
+
+        if new_size != size:
+            logger.info(
+                "Batch size %d -> %d after a %d-record batch (p95=%s, error_rate=%.2f)",
+                size, new_size, batch_size, stats['p95'], stats['error_rate']
+            )
+
+    def _next_size(self, size, latency, ok, stats):
+        """
+        Multiplicative decrease when this call failed or exceeded the target
+        latency; additive increase only while the window's p95 and error
+        rate are both healthy; otherwise hold.
+        """
+        target = settings.BATCH_ADAPTIVE_TARGET_LATENCY
+
+        if not ok or latency > target:
+            return self._clamp(size * settings.BATCH_ADAPTIVE_DECREASE)
+
+        healthy = (
+            (stats['p95'] is None or stats['p95'] <= target)
+            and stats['error_rate'] <= settings.BATCH_ADAPTIVE_MAX_ERROR_RATE
+        )
+        if healthy:
+            return self._clamp(size + settings.BATCH_ADAPTIVE_INCREASE)
+        return size
+
+
+# Default controller instance - import this
+batch_size_controller = AdaptiveBatchSize()
@@ -1,15 +1,17 @@
 from django.contrib import admin
-from records.models import Record
+from records.models import ArchivedRecord, BatchAttempt, Record
 
 
 @admin.register(Record)
 class RecordAdmin(admin.ModelAdmin):
     """Admin configuration for Record model."""
     
-    list_display = ['id', 'name', 'email', 'phone_number', 'status', 'created_at']
+    list_display = ['id', 'name', 'email', 'phone_number', 'status', 'attempt_count', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['name', 'email', 'phone_number']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'attempt_count', 'next_attempt_at', 'last_error', 'content_hash', 'created_at', 'updated_at',
+    ]
     ordering = ['-created_at']
     
     fieldsets = (
@@ -17,10 +19,44 @@ class RecordAdmin(admin.ModelAdmin):
             'fields': ('name', 'email', 'phone_number', 'link', 'dob')
         }),
         ('Status', {
-            'fields': ('status',)
+            'fields': ('status', 'attempt_count', 'next_attempt_at', 'last_error')
+        }),
+        ('Deduplication', {
+            'fields': ('content_hash',),
+            'classes': ('collapse',)
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(BatchAttempt)
+class BatchAttemptAdmin(admin.ModelAdmin):
+    """Admin configuration for the batch outbox."""
+
+    list_display = ['id', 'status', 'payload_hash', 'created_at', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['payload_hash']
+    readonly_fields = [
+        'status', 'payload_hash', 'claimed', 'claimed_at', 'response',
+        'outcomes', 'error', 'created_at', 'updated_at',
+    ]
+    ordering = ['-created_at']
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    """Read-only admin for archived SUCCESS records."""
+
+    list_display = ['id', 'name', 'email', 'phone_number', 'status', 'created_at', 'archived_at']
+    list_filter = ['archived_at']
+    search_fields = ['name', 'email', 'phone_number']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,103 @@
+"""
+Archival of processed records.
+
+SUCCESS records never change again, but every work-queue claim and list
+page runs against the live table. archive_records moves SUCCESS rows older
+than ARCHIVE_RETENTION_DAYS into ArchivedRecord, ARCHIVE_CHUNK_SIZE rows
+per transaction: one INSERT ... SELECT copies the chunk inside the
+database and one DELETE removes it, so the live table stays roughly the
+size of the retention window.
+
+The SUCCESS list reads both tables with ?include_archived=1, and so do
+duplicate detection (records.dedup, via the indexed content_hash) and
+exports (records.export).
+
+Usage:
+    from records.archive import archive_records
+
+    archive_records()                      # one scheduled run
+    archive_records(before=timezone.now()) # archive everything processed
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from records.cache import bump_success_version
+from records.logger import logger
+from records.models import ArchivedRecord, Record
+
+
+# Columns copied as-is from Record to ArchivedRecord
+ARCHIVE_COLUMNS = (
+    'id', 'name', 'email', 'phone_number', 'link', 'dob',
+    'status', 'attempt_count', 'content_hash', 'created_at', 'updated_at',
+)
+
+
+def archivable_queryset(before):
+    """SUCCESS records created before `before`, oldest first."""
+    return Record.objects.filter(
+        status=Record.Status.SUCCESS, created_at__lt=before
+    ).order_by('created_at', 'id')
+
+
+def _archive_chunk(before, chunk_size, archived_at):
+    """Move one chunk; returns the number of rows moved."""
+    with transaction.atomic():
+        # Concurrent runs skip each other's rows instead of copying them twice
+        ids = list(
+            archivable_queryset(before)
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(column) for column in ARCHIVE_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(ArchivedRecord._meta.db_table)} ({columns}, {qn('archived_at')}) "
+                f"SELECT {columns}, %s FROM {qn(Record._meta.db_table)} WHERE {qn('id')} IN ({placeholders})",
+                [connection.ops.adapt_datetimefield_value(archived_at), *ids],
+            )
+            cursor.execute(
+                f"DELETE FROM {qn(Record._meta.db_table)} WHERE {qn('id')} IN ({placeholders})",
+                ids,
+            )
+        return len(ids)
+
+
+def archive_records(before=None, chunk_size=None, max_chunks=None):
+    """
+    Move SUCCESS records created before `before` (default: now minus
+    ARCHIVE_RETENTION_DAYS) into ArchivedRecord.
+
+    Stops after `max_chunks` chunks (ARCHIVE_MAX_CHUNKS_PER_RUN) so a large
+    first run is spread over several scheduled runs.
+
+    Returns:
+        Number of records archived.
+    """
+    if before is None:
+        before = timezone.now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    max_chunks = max_chunks or settings.ARCHIVE_MAX_CHUNKS_PER_RUN
+    archived_at = timezone.now()
+
+    total = 0
+    for _ in range(max_chunks):
+        moved = _archive_chunk(before, chunk_size, archived_at)
+        total += moved
+        if moved < chunk_size:
+            break
+
+    if total:
+        # Live-only list pages just lost rows
+        bump_success_version()
+        logger.info("Archived %d SUCCESS records created before %s", total, before)
+    return total
@@ -0,0 +1,260 @@
+"""
+Work-queue helpers for batch processing.
+
+Records are claimed with SELECT ... FOR UPDATE SKIP LOCKED and flipped to
+IN_PROGRESS in the same transaction, so any number of workers can drain the
+backlog concurrently without sending a record twice.
+"""
+
+import random
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, Q
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from records import stats
+from records.cache import bump_success_version
+from records.logger import logger
+from records.models import Record
+
+
+# Statuses a batch worker is allowed to pick up
+CLAIMABLE_STATUSES = [Record.Status.PENDING, Record.Status.FAILED]
+
+# Fields needed to build the external API payload and schedule retries
+PAYLOAD_FIELDS = ['id', 'name', 'email', 'phone_number', 'link', 'dob', 'status', 'attempt_count']
+
+
+def claimable_queryset(shard=None):
+    """
+    Records a batch worker may claim, in queue order.
+
+    PENDING/FAILED rows qualify once their next_attempt_at is due, so failed
+    records back off instead of taking every batch slot. Claims older than
+    BATCH_CLAIM_TIMEOUT (a worker that died mid-batch) are treated as
+    claimable again. With a `shard`, only records with
+    id % DISPATCH_SHARDS == shard qualify (see records.routing).
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.BATCH_CLAIM_TIMEOUT)
+    queryset = Record.objects.filter(
+        Q(status__in=CLAIMABLE_STATUSES, next_attempt_at__lte=now)
+        | Q(status=Record.Status.IN_PROGRESS, claimed_at__lt=stale_before)
+    )
+    if shard is not None:
+        queryset = queryset.alias(
+            shard=Mod(F('id'), settings.DISPATCH_SHARDS, output_field=IntegerField())
+        ).filter(shard=shard)
+    return queryset.order_by('next_attempt_at', 'id')
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter for a record's next attempt.
+
+    The delay doubles per failed attempt up to BATCH_RETRY_MAX_DELAY, and a
+    random half of it is dropped so failures from one batch spread out.
+    """
+    delay = min(
+        settings.BATCH_RETRY_MAX_DELAY,
+        settings.BATCH_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+    )
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def claim_batch(batch_size, shard=None):
+    """
+    Atomically claim up to `batch_size` records for this worker.
+
+    Rows locked by another worker are skipped rather than waited on. See
+    claimable_queryset for which rows qualify.
+
+    Returns:
+        List of claimed Record instances, with `status` still holding the
+        status they had before the claim and `claimed_at` set to the claim
+        time.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        records = list(
+            claimable_queryset(shard)
+            .select_for_update(skip_locked=True)
+            .only(*PAYLOAD_FIELDS)[:batch_size]
+        )
+        if records:
+            Record.objects.filter(id__in=[r.id for r in records]).update(
+                status=Record.Status.IN_PROGRESS,
+                claimed_at=now,
+                updated_at=now,
+            )
+            changes = Counter({Record.Status.IN_PROGRESS: len(records)})
+            changes.subtract(r.status for r in records)
+            stats.adjust(changes)
+
+    for record in records:
+        record.claimed_at = now
+    return records
+
+
+def _held(claimed_at):
+    """Rows still IN_PROGRESS under the given claim (any claim if None)."""
+    queryset = Record.objects.filter(status=Record.Status.IN_PROGRESS)
+    if claimed_at is not None:
+        queryset = queryset.filter(claimed_at=claimed_at)
+    return queryset
+
+
+def release_batch(records, claimed_at=None, error=None):
+    """
+    Hand claimed records back to the queue with their previous status.
+
+    Used when the external call fails and the batch will be retried. Only
+    rows still IN_PROGRESS are touched, so results already applied stay put;
+    passing `claimed_at` also leaves rows another worker has since reclaimed.
+    A transport `error` is stored as last_error but does not count as an
+    attempt, so a downstream outage cannot dead-letter records.
+    """
+    if not records:
+        return
+
+    failed_ids = [r.id for r in records if r.status == Record.Status.FAILED]
+    pending_ids = [r.id for r in records if r.status != Record.Status.FAILED]
+    now = timezone.now()
+    in_progress = _held(claimed_at)
+    extra = {'last_error': str(error)} if error is not None else {}
+
+    released = Counter()
+    with transaction.atomic():
+        if pending_ids:
+            released[Record.Status.PENDING] = in_progress.filter(id__in=pending_ids).update(
+                status=Record.Status.PENDING, updated_at=now, **extra
+            )
+        if failed_ids:
+            released[Record.Status.FAILED] = in_progress.filter(id__in=failed_ids).update(
+                status=Record.Status.FAILED, updated_at=now, **extra
+            )
+        stats.adjust({Record.Status.IN_PROGRESS: -released.total(), **released})
+
+    logger.info("Released %d claimed records back to the queue", len(records))
+
+
+def parse_results(results):
+    """Map the external API response to {record_id: status}."""
+    outcomes = {}
+    for result in results:
+        try:
+            record_id = int(result.get('id'))
+        except (TypeError, ValueError):
+            logger.error("Invalid record id in response: %r", result.get('id'))
+            continue
+        outcomes[record_id] = result.get('status')
+    return outcomes
+
+
+def apply_results(records, results, claimed_at=None, error=None):
+    """
+    Write external API results back for a claimed batch.
+
+    Results are grouped by status and applied with one UPDATE per status in
+    a single transaction, so the query count is constant per batch. Failed
+    records are rescheduled with backoff (one UPDATE per attempt count) and
+    moved to DEAD after BATCH_MAX_ATTEMPTS; `error` replaces the default
+    last_error for them. Claimed records missing from the response are
+    released back to the queue.
+
+    Returns:
+        Dict with processed/success/failed/dead counts.
+    """
+    claimed = {r.id: r for r in records}
+    outcomes = parse_results(results)
+
+    unknown_ids = outcomes.keys() - claimed.keys()
+    if unknown_ids:
+        logger.error("Records %s not found in this batch", sorted(unknown_ids))
+
+    success_ids = {
+        record_id for record_id, status in outcomes.items()
+        if record_id in claimed and status == 'SUCCESS'
+    }
+    failed_ids = (outcomes.keys() & claimed.keys()) - success_ids
+    unanswered = [r for record_id, r in claimed.items() if record_id not in outcomes]
+
+    now = timezone.now()
+    in_progress = _held(claimed_at)
+
+    # Group failures by the attempt number they are about to reach
+    failed_by_attempts = defaultdict(list)
+    for record_id in failed_ids:
+        failed_by_attempts[claimed[record_id].attempt_count + 1].append(record_id)
+    dead_ids = []
+    # Rows actually moved out of IN_PROGRESS, per new status
+    moved = Counter()
+
+    with transaction.atomic():
+        if success_ids:
+            moved[Record.Status.SUCCESS] = in_progress.filter(id__in=success_ids).update(
+                status=Record.Status.SUCCESS, last_error='', updated_at=now
+            )
+            # Cached SUCCESS pages are stale once this commits
+            transaction.on_commit(bump_success_version)
+
+        for attempts, ids in failed_by_attempts.items():
+            last_error = f"{error or 'External API returned FAILED'} (attempt {attempts})"
+            if attempts >= settings.BATCH_MAX_ATTEMPTS:
+                moved[Record.Status.DEAD] += in_progress.filter(id__in=ids).update(
+                    status=Record.Status.DEAD, attempt_count=attempts,
+                    last_error=last_error, updated_at=now
+                )
+                dead_ids.extend(ids)
+            else:
+                moved[Record.Status.FAILED] += in_progress.filter(id__in=ids).update(
+                    status=Record.Status.FAILED, attempt_count=attempts,
+                    next_attempt_at=now + retry_delay(attempts),
+                    last_error=last_error, updated_at=now
+                )
+
+        stats.adjust(
+            {Record.Status.IN_PROGRESS: -moved.total(), **moved},
+            success=moved[Record.Status.SUCCESS],
+            failed=moved[Record.Status.FAILED],
+            dead=moved[Record.Status.DEAD],
+        )
+        release_batch(unanswered, claimed_at=claimed_at)
+
+    logger.info(
+        "Applied batch results: %d SUCCESS, %d FAILED, %d DEAD, %d unanswered",
+        len(success_ids), len(failed_ids) - len(dead_ids), len(dead_ids), len(unanswered)
+    )
+    retrying_ids = sorted(set(failed_ids) - set(dead_ids))
+    if retrying_ids:
+        logger.warning("Records %s marked as FAILED", retrying_ids)
+    if dead_ids:
+        logger.error("Records %s moved to DEAD after %d attempts",
+                     sorted(dead_ids), settings.BATCH_MAX_ATTEMPTS)
+
+    return {
+        'processed': len(success_ids) + len(failed_ids),
+        'success': len(success_ids),
+        'failed': len(failed_ids) - len(dead_ids),
+        'dead': len(dead_ids),
+    }
+
+
+def build_payload(records):
+    """Build the external API payload for a list of records."""
+    return [
+        {
+            'id': record.id,
+            'name': record.name,
+            'email': record.email,
+            'phoneNumber': record.phone_number,
+            'link': record.link or '',
+            'dob': record.dob.strftime('%d/%m/%Y') if record.dob else ''
+        }
+        for record in records
+    ]
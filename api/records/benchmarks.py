@@ -0,0 +1,236 @@
+"""
+Benchmarks for the API hot paths and the batch worker.
+
+Each benchmark returns a plain dict of numbers, so results can be written as
+JSON and compared between commits. They are run by `manage.py bench` and,
+at small volumes, by the test suite.
+
+Usage:
+    from records.benchmarks import bench_drain, seed_records
+
+    seed_records(10_000, status=Record.Status.PENDING)
+    print(bench_drain(10_000, latency=0.05))
+"""
+
+import json
+import platform
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+import django
+from django.db import connection
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from records.cache import bump_success_version
+from records.models import Record
+from records.testing import FakeBatchAPI
+
+
+# Status mix of a mature table: mostly processed, a small backlog
+STATUS_WEIGHTS = {
+    Record.Status.SUCCESS: 90,
+    Record.Status.PENDING: 7,
+    Record.Status.FAILED: 3,
+}
+
+
+def seed_records(rows, status=None, chunk_size=5000):
+    """
+    Bulk insert `rows` synthetic records.
+
+    With no `status`, statuses follow STATUS_WEIGHTS. Rows are spread over
+    the past 30 days so list pages cover a realistic created_at range.
+    """
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    start = Record.objects.count()
+    now = timezone.now()
+
+    for offset in range(0, rows, chunk_size):
+        count = min(chunk_size, rows - offset)
+        last_id = Record.objects.aggregate(last=Max('id'))['last'] or 0
+        records = Record.objects.bulk_create([
+            Record(
+                name=f"Bench User {start + offset + i}",
+                email=f"bench{start + offset + i}@example.com",
+                phone_number=f"+91{9000000000 + start + offset + i}",
+                status=status or random.choices(statuses, weights)[0],
+                next_attempt_at=now,
+            )
+            for i in range(count)
+        ])
+        # auto_now_add ignores created_at on insert; backdate afterwards.
+        # Ids are read back because not every backend returns them.
+        ids = Record.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)
+        for record, pk in zip(records, ids):
+            record.pk = pk
+            record.created_at = now - timedelta(seconds=random.randint(0, 30 * 86400))
+        Record.objects.bulk_update(records, ['created_at'], batch_size=500)
+
+
+def summarize(samples):
+    """p50/p95/max in milliseconds for a list of durations in seconds."""
+    ordered = sorted(samples)
+    p95 = ordered[max(0, round(0.95 * len(ordered)) - 1)]
+    return {
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def _client():
+    return Client(SERVER_NAME='localhost')
+
+
+def bench_create(requests=200):
+    """Throughput of POST /api/records/ through the full request stack."""
+    client = _client()
+    samples = []
+    # Unique per run, so a rerun against a kept database is not a duplicate
+    run = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+
+    for i in range(requests):
+        body = {
+            'name': f"Create Bench {run} {i}",
+            'email': f"create{i}.{run}@example.com",
+            'phone_number': f"+91{8000000000 + i}",
+            'link': 'https://example.com',
+        }
+        sent_at = time.perf_counter()
+        response = client.post('/api/records/', body, content_type='application/json')
+        samples.append(time.perf_counter() - sent_at)
+        if response.status_code != 201:
+            raise RuntimeError(f"Create failed with {response.status_code}: {response.content[:200]}")
+
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 1),
+        **summarize(samples),
+    }
+
+
+def bench_bulk_create(items=1000):
+    """Throughput of POST /api/records/bulk/ for one large JSON array."""
+    run = uuid.uuid4().hex[:8]
+    body = json.dumps([
+        {
+            'name': f"Bulk Bench {run} {i}",
+            'email': f"bulk{i}.{run}@example.com",
+            'phone_number': f"+91{7000000000 + i}",
+        }
+        for i in range(items)
+    ])
+    started = time.perf_counter()
+    response = _client().post('/api/records/bulk/', body, content_type='application/json')
+    elapsed = time.perf_counter() - started
+    if response.status_code != 201:
+        raise RuntimeError(f"Bulk create failed with {response.status_code}")
+    return {'items': items, 'records_per_s': round(items / elapsed, 1), 'ms': round(elapsed * 1000, 3)}
+
+
+def bench_list(repeats=50, page_size=50, pages=5):
+    """
+    Latency of GET /api/records/success/ against the current table.
+
+    `cold` bumps the cache version before every request, so each one hits
+    the database; `warm` is served from the page cache. `page_N` follows the
+    cursor `pages` pages in, cold.
+    """
+    client = _client()
+    url = f'/api/records/success/?page_size={page_size}'
+
+    def timed_get(path):
+        sent_at = time.perf_counter()
+        response = client.get(path)
+        elapsed = time.perf_counter() - sent_at
+        if response.status_code != 200:
+            raise RuntimeError(f"List failed with {response.status_code}")
+        return elapsed, response
+
+    cold, warm, deep = [], [], []
+    for _ in range(repeats):
+        bump_success_version()
+        elapsed, response = timed_get(url)
+        cold.append(elapsed)
+        warm.append(timed_get(url)[0])
+
+        bump_success_version()
+        cursor = response.json()['next_cursor']
+        for page_number in range(pages):
+            if not cursor:
+                break
+            took, page = timed_get(f'{url}&cursor={cursor}')
+            cursor = page.json()['next_cursor']
+            if page_number == pages - 1:
+                deep.append(took)
+
+    return {
+        'rows': Record.objects.count(),
+        'success_rows': Record.objects.filter(status=Record.Status.SUCCESS).count(),
+        'repeats': repeats,
+        'page_size': page_size,
+        'cold': summarize(cold),
+        'warm': summarize(warm),
+        # Absent when the table has fewer pages than that
+        **({f'page_{pages + 1}': summarize(deep)} if deep else {}),
+    }
+
+
+def bench_drain(rows, latency=0.0, batch_size=None, fanout=None):
+    """
+    Wall time for process_batch to drain `rows` PENDING records against a
+    local FakeBatchAPI answering every record with SUCCESS.
+
+    The circuit breaker and rate limiter are switched off so the numbers
+    reflect the worker itself, not the configured request rate.
+    """
+    # Import here to avoid circular imports
+    from records.tasks import process_batch
+
+    Record.objects.filter(status__in=[Record.Status.PENDING, Record.Status.FAILED]).delete()
+    seed_records(rows, status=Record.Status.PENDING)
+
+    overrides = {
+        'BATCH_DRAIN': True,
+        'BATCH_MAX_BATCHES_PER_RUN': rows,
+        'EXTERNAL_API_BREAKER_ENABLED': False,
+        'EXTERNAL_API_RATE_LIMIT': 0,
+        'MICROBATCH_ENABLED': False,
+    }
+    if batch_size:
+        overrides.update(BATCH_SIZE=batch_size, BATCH_ADAPTIVE=False)
+    if fanout:
+        overrides['BATCH_FANOUT'] = fanout
+
+    with FakeBatchAPI(latency=latency) as api, override_settings(EXTERNAL_API_URL=api.url, **overrides):
+        started = time.perf_counter()
+        result = process_batch()
+        elapsed = time.perf_counter() - started
+
+    return {
+        'rows': rows,
+        'api_latency_s': latency,
+        'seconds': round(elapsed, 3),
+        'records_per_s': round(result.get('success', 0) / elapsed, 1),
+        'batches': result.get('batches', 0),
+        'success': result.get('success', 0),
+        'http_requests': api.requests,
+        'http_connections': api.connections,
+    }
+
+
+def environment():
+    """Context stored alongside results so runs can be compared fairly."""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
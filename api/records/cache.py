@@ -0,0 +1,95 @@
+"""
+Response cache for the SUCCESS records list.
+
+Pages are cached under a version number that process_batch bumps whenever it
+writes SUCCESS rows, so stale pages are never served and nothing has to be
+deleted explicitly. The same version backs the list view's ETag.
+
+Cache errors (e.g. Redis down) are logged and treated as misses; the view
+then falls back to the database.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from records.logger import logger
+
+
+VERSION_KEY = 'records:success:version'
+
+
+def success_version():
+    """Return the current SUCCESS list version, or None if the cache is down."""
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, timeout=None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+    except Exception as e:
+        logger.warning("SUCCESS list cache unavailable: %s", e)
+        return None
+
+
+def bump_success_version():
+    """Invalidate every cached SUCCESS page."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (evicted or never set): any fresh value invalidates
+        cache.add(VERSION_KEY, 1, timeout=None)
+    except Exception as e:
+        logger.warning("Could not bump SUCCESS list cache version: %s", e)
+
+
+def page_fingerprint(cursor, page_size, archived=False):
+    """Short stable digest of the page parameters."""
+    raw = f"{cursor or ''}|{page_size}{'|archived' if archived else ''}".encode('utf-8')
+    return hashlib.md5(raw, usedforsecurity=False).hexdigest()[:16]
+
+
+def page_etag(version, cursor, page_size, archived=False):
+    return f'"success-{version}-{page_fingerprint(cursor, page_size, archived)}"'
+
+
+def etag_matches(etag, if_none_match):
+    """
+    True if an If-None-Match header value matches `etag`.
+
+    The header is a comma-separated list of entity tags, or `*` for any;
+    tags are compared weakly (a W/ prefix is ignored on either side).
+    """
+    if not etag or not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    if tags == ['*']:
+        return True
+    etag = etag.removeprefix('W/')
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def _page_key(version, cursor, page_size, archived):
+    return f"records:success:v{version}:{page_fingerprint(cursor, page_size, archived)}"
+
+
+def get_page(version, cursor, page_size, archived=False):
+    """Return the cached page body or None."""
+    try:
+        return cache.get(_page_key(version, cursor, page_size, archived))
+    except Exception as e:
+        logger.warning("SUCCESS list cache read failed: %s", e)
+        return None
+
+
+def set_page(version, cursor, page_size, body, archived=False):
+    try:
+        cache.set(
+            _page_key(version, cursor, page_size, archived),
+            body,
+            timeout=settings.RECORDS_LIST_CACHE_TIMEOUT,
+        )
+    except Exception as e:
+        logger.warning("SUCCESS list cache write failed: %s", e)
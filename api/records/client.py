@@ -0,0 +1,213 @@
+"""
+Process-wide HTTP client for the external batch API.
+
+A single requests.Session is kept per process so batches reuse pooled
+keep-alive connections instead of paying a TCP+TLS handshake every run.
+Every call goes through the shared circuit breaker and rate limiter
+(records.resilience).
+
+Usage:
+    from records.client import post_batch
+
+    results = post_batch(payload)
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from records import metrics
+from records.resilience import breaker, rate_limiter
+
+
+class UnusableResponse(Exception):
+    """The API accepted the batch (2xx) but its response could not be read."""
+
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+def build_session():
+    """Create a Session with a sized connection pool and retry policy."""
+    retry = Retry(
+        total=settings.EXTERNAL_API_RETRIES,
+        connect=settings.EXTERNAL_API_RETRIES,
+        # Never retry once the request may have reached the API, so a slow
+        # response cannot cause the same batch to be processed twice
+        read=0,
+        status=settings.EXTERNAL_API_RETRIES,
+        # Only 503 means the batch was not processed; a 502/504 from a proxy
+        # may hide one that was, so it is left to the outbox (records.outbox)
+        status_forcelist=(503,),
+        allowed_methods=frozenset({'POST'}),
+        backoff_factor=settings.EXTERNAL_API_BACKOFF,
+        backoff_jitter=settings.EXTERNAL_API_BACKOFF_JITTER,
+        raise_on_status=False,
+        # Otherwise a 429 with Retry-After is retried by sleeping in the
+        # worker; it opens the shared breaker instead (see post_batch)
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.EXTERNAL_API_POOL_SIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Content-Type': 'application/json',
+        'Accept-Encoding': 'gzip',
+    })
+    return session
+
+
+def get_session():
+    """
+    Return the Session for this process.
+
+    Celery prefork workers fork after import, so the session is rebuilt when
+    the PID changes rather than sharing sockets with the parent.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = build_session()
+                _session_pid = pid
+    return _session
+
+
+def reset_session():
+    """Close the pooled session; the next call builds a fresh one."""
+    global _session, _session_pid
+
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def encode_body(payload):
+    """Serialize the payload, gzipping it when enabled and large enough."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    if settings.EXTERNAL_API_GZIP and len(body) >= settings.EXTERNAL_API_GZIP_MIN_BYTES:
+        return gzip.compress(body), {'Content-Encoding': 'gzip'}
+    return body, {}
+
+
+def post_batch(payload, url=None, idempotency_key=None):
+    """
+    POST a batch payload to the external API and return the parsed JSON.
+
+    `idempotency_key` is sent as the Idempotency-Key header so a downstream
+    that supports it can drop duplicate deliveries of the same batch.
+
+    Raises:
+        records.resilience.ExternalAPIUnavailable: Without sending anything,
+            when the circuit breaker is open or the rate limit is reached.
+        requests.exceptions.RequestException: On connection errors,
+            timeouts or a non-2xx response.
+        UnusableResponse: On a 2xx whose body is not a JSON list. The batch
+            was delivered, so it must not simply be sent again.
+    """
+    probe = breaker.allow()
+    try:
+        rate_limiter.acquire()
+        body, headers = encode_body(payload)
+    except Exception:
+        # Nothing was sent, so a half-open probe has nothing to report
+        if probe:
+            breaker.release_probe()
+        raise
+
+    if idempotency_key:
+        headers['Idempotency-Key'] = idempotency_key
+    metrics.BATCH_SIZE.observe(len(payload))
+    sent_at = time.perf_counter()
+    try:
+        response = get_session().post(
+            url or settings.EXTERNAL_API_URL,
+            data=body,
+            headers=headers,
+            timeout=(
+                settings.EXTERNAL_API_CONNECT_TIMEOUT,
+                settings.EXTERNAL_API_READ_TIMEOUT,
+            ),
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        metrics.EXTERNAL_API_SECONDS.labels(outcome='error').observe(time.perf_counter() - sent_at)
+        if is_rate_limited(e):
+            # Every worker holds off for as long as the API asked
+            breaker.open_for(retry_after(e.response))
+        # Other 4xx mean the request was wrong, not that the API is unhealthy
+        elif not is_client_error(e):
+            breaker.record_failure()
+        elif probe:
+            breaker.release_probe()
+        raise
+
+    try:
+        results = response.json()
+        if not isinstance(results, list):
+            raise ValueError(f"expected a list, got {type(results).__name__}")
+    except ValueError as e:
+        metrics.EXTERNAL_API_SECONDS.labels(outcome='error').observe(time.perf_counter() - sent_at)
+        breaker.record_failure()
+        raise UnusableResponse(
+            f"Unusable {response.status_code} response from external API: {e}"
+        ) from e
+
+    metrics.EXTERNAL_API_SECONDS.labels(outcome='ok').observe(time.perf_counter() - sent_at)
+    breaker.record_success()
+    return results
+
+
+def is_client_error(error):
+    """True for an HTTP 4xx response other than 429 Too Many Requests."""
+    response = getattr(error, 'response', None)
+    return (
+        response is not None
+        and 400 <= response.status_code < 500
+        and response.status_code != 429
+    )
+
+
+def is_rate_limited(error):
+    """True for an HTTP 429 response."""
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code == 429
+
+
+def retry_after(response):
+    """
+    Seconds to wait from a Retry-After header, in seconds or as an HTTP
+    date. Falls back to EXTERNAL_API_BREAKER_RESET_TIMEOUT and is capped at
+    EXTERNAL_API_RETRY_AFTER_MAX.
+    """
+    value = response.headers.get('Retry-After', '').strip()
+    seconds = settings.EXTERNAL_API_BREAKER_RESET_TIMEOUT
+    if value.isdigit():
+        seconds = int(value)
+    elif value:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            pass
+    return min(max(seconds, 0), settings.EXTERNAL_API_RETRY_AFTER_MAX)
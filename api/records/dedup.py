@@ -0,0 +1,157 @@
+"""
+Duplicate-submission detection.
+
+Two layers:
+
+- Idempotency-Key: a client that retries a request with the same key gets
+  the original response replayed from the cache, without touching the DB.
+- Content hash: every new record stores a SHA-256 of its normalized
+  (name, email, phone_number, dob) under a unique index, so a duplicate
+  submission is caught by the insert itself and merged into the existing
+  record. Duplicates never reach the work queue, so they cost no external
+  API calls. Archived records (records.archive) keep their hash in an
+  indexed column and are checked too, so content processed long ago is
+  still recognized.
+
+Usage:
+    from records.dedup import create_unique
+
+    record, created = create_unique(serializer.validated_data)
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from records.logger import logger
+
+
+IDEMPOTENCY_PREFIX = 'records:idempotency:'
+
+
+def content_hash(name, email, phone_number, dob=None):
+    """SHA-256 of the normalized identifying fields of a submission."""
+    normalized = '\x1f'.join([
+        ' '.join(name.split()).casefold(),
+        email.strip().lower(),
+        phone_number.strip(),
+        dob.isoformat() if dob else '',
+    ])
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def hash_of(data):
+    """content_hash of a validated_data dict or a Record instance."""
+    if isinstance(data, dict):
+        return content_hash(data['name'], data['email'], data['phone_number'], data.get('dob'))
+    return content_hash(data.name, data.email, data.phone_number, data.dob)
+
+
+def create_unique(validated_data):
+    """
+    Create a record unless one with the same content already exists.
+
+    The unique index decides between live records, so concurrent identical
+    submissions cannot both insert.
+
+    Returns:
+        (record, created) where record is the existing one on a duplicate
+        (an ArchivedRecord if it has been archived).
+    """
+    # Import here to avoid circular imports
+    from records.models import ArchivedRecord, Record
+
+    digest = hash_of(validated_data)
+    archived = ArchivedRecord.objects.filter(content_hash=digest).first()
+    if archived is not None:
+        logger.info("Duplicate submission merged into archived record %s", archived.pk)
+        return archived, False
+    try:
+        with transaction.atomic():
+            return Record.objects.create(content_hash=digest, **validated_data), True
+    except IntegrityError:
+        existing = Record.objects.filter(content_hash=digest).first()
+        if existing is None:
+            raise
+        logger.info("Duplicate submission merged into record %s", existing.pk)
+        return existing, False
+
+
+async def acreate_unique(validated_data):
+    """Async version of create_unique, for async views."""
+    from records.models import ArchivedRecord, Record
+
+    digest = hash_of(validated_data)
+    archived = await ArchivedRecord.objects.filter(content_hash=digest).afirst()
+    if archived is not None:
+        logger.info("Duplicate submission merged into archived record %s", archived.pk)
+        return archived, False
+    try:
+        return await Record.objects.acreate(content_hash=digest, **validated_data), True
+    except IntegrityError:
+        existing = await Record.objects.filter(content_hash=digest).afirst()
+        if existing is None:
+            raise
+        logger.info("Duplicate submission merged into record %s", existing.pk)
+        return existing, False
+
+
+def split_duplicates(records):
+    """
+    Assign content hashes to unsaved records and separate out duplicates.
+
+    A record is a duplicate if an earlier record in the same list, or one
+    already stored (live or archived), has the same hash.
+
+    Returns:
+        (new_records, duplicates) where duplicates maps a record's index in
+        `records` to the ID of the record it duplicates (None if that is an
+        earlier, not yet inserted, item of the same list).
+    """
+    from records.models import ArchivedRecord, Record
+
+    for record in records:
+        record.content_hash = hash_of(record)
+
+    hashes = {r.content_hash for r in records}
+    existing = dict(
+        ArchivedRecord.objects.filter(content_hash__in=hashes).values_list('content_hash', 'id')
+    )
+    existing.update(
+        Record.objects.filter(content_hash__in=hashes).values_list('content_hash', 'id')
+    )
+
+    new_records, duplicates, seen = [], {}, set()
+    for index, record in enumerate(records):
+        if record.content_hash in existing:
+            duplicates[index] = existing[record.content_hash]
+        elif record.content_hash in seen:
+            duplicates[index] = None
+        else:
+            seen.add(record.content_hash)
+            new_records.append(record)
+    return new_records, duplicates
+
+
+def _idempotency_key(key):
+    # Client keys are arbitrary strings; hash them into a safe cache key
+    return IDEMPOTENCY_PREFIX + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def get_idempotent_response(key):
+    """Return the stored (status, body) for an Idempotency-Key, or None."""
+    try:
+        return cache.get(_idempotency_key(key))
+    except Exception as e:
+        logger.warning("Idempotency cache unavailable: %s", e)
+        return None
+
+
+def store_idempotent_response(key, status, body):
+    """Remember a successful response for IDEMPOTENCY_KEY_TTL seconds."""
+    try:
+        cache.set(_idempotency_key(key), (status, dict(body)), timeout=settings.IDEMPOTENCY_KEY_TTL)
+    except Exception as e:
+        logger.warning("Idempotency cache write failed: %s", e)
@@ -0,0 +1,150 @@
+"""
+Asyncio fan-out of claimed records to the external batch API.
+
+A large claim is split into sub-batches that are posted concurrently, bounded
+by a semaphore, and each response is applied as soon as it arrives. Drain
+time then scales with BATCH_FANOUT_CONCURRENCY rather than the number of
+batches.
+
+Usage:
+    from records.dispatcher import dispatch_batches
+
+    totals = dispatch_batches(split_batches(records, 10))
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from records import metrics
+from records.adaptive import batch_size_controller
+from records.batch import build_payload
+from records.client import UnusableResponse, post_batch
+from records.logger import logger
+from records.outbox import apply_attempt, mark_failed, mark_responded, mark_unusable, open_attempt
+from records.resilience import ExternalAPIUnavailable
+
+
+def split_batches(records, batch_size):
+    """Split a claimed list of records into sub-batches of `batch_size`."""
+    return [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+
+
+def _db(func):
+    """
+    Wrap a sync DB function for the event loop.
+
+    Calls run on asgiref's shared thread, which outlives each asyncio.run
+    and has no request cycle to recycle its connection, so stale or broken
+    connections are closed before every call.
+    """
+    def call(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+    return sync_to_async(call, thread_sensitive=True)
+
+
+async def _send(loop, executor, semaphore, records, attempt, payload):
+    """POST one sub-batch; returns (records, attempt, results, error)."""
+    async with semaphore:
+        sent_at = time.monotonic()
+        try:
+            # requests is blocking, so each call runs on the pool thread
+            with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='send'):
+                results = await loop.run_in_executor(
+                    executor,
+                    lambda: post_batch(payload, idempotency_key=attempt.payload_hash),
+                )
+            error = None
+        except ExternalAPIUnavailable as e:
+            # Rejected before sending; says nothing about latency
+            return records, attempt, None, e
+        except (requests.exceptions.RequestException, UnusableResponse) as e:
+            results, error = None, e
+        except Exception as e:
+            # Still released by the caller rather than left SENDING
+            return records, attempt, None, e
+        latency = time.monotonic() - sent_at
+
+        # Redis round-trips are blocking too
+        await loop.run_in_executor(
+            executor,
+            lambda: batch_size_controller.observe(len(records), latency, ok=error is None),
+        )
+        return records, attempt, results, error
+
+
+async def _dispatch(batches, concurrency):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    opened = _db(open_attempt)
+    responded = _db(mark_responded)
+    apply = _db(apply_attempt)
+    failed = _db(mark_failed)
+    unusable = _db(mark_unusable)
+
+    totals = {'batches': 0, 'processed': 0, 'success': 0, 'failed': 0, 'dead': 0, 'errors': []}
+
+    # Outbox entries are written before anything is posted
+    outgoing = []
+    for records in batches:
+        with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='build'):
+            payload = build_payload(records)
+            attempt = await opened(records, payload)
+        outgoing.append((records, attempt, payload))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = [
+            _send(loop, executor, semaphore, records, attempt, payload)
+            for records, attempt, payload in outgoing
+        ]
+
+        for future in asyncio.as_completed(pending):
+            records, attempt, results, error = await future
+            try:
+                if isinstance(error, UnusableResponse):
+                    # Delivered, so its records fail with backoff rather than
+                    # being released for an immediate re-send
+                    logger.error("Sub-batch of %d records: %s", len(records), error)
+                    with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='apply'):
+                        result = await unusable(attempt, error)
+                elif error is not None:
+                    logger.error("Sub-batch of %d records failed: %s", len(records), error)
+                    await failed(attempt, error)
+                    totals['errors'].append(error)
+                    continue
+                else:
+                    # Apply each response as it arrives rather than waiting for all
+                    with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='apply'):
+                        await responded(attempt, results)
+                        result = await apply(attempt.pk)
+            except Exception as e:
+                # Keep going so the other sub-batches are still finished; a
+                # stored response is applied later by recover_attempts
+                logger.error("Could not finish sub-batch of %d records: %s", len(records), e)
+                totals['errors'].append(e)
+                continue
+            totals['batches'] += 1
+            if result is not None:
+                for key in ('processed', 'success', 'failed', 'dead'):
+                    totals[key] += result[key]
+
+    return totals
+
+
+def dispatch_batches(batches, concurrency=None):
+    """
+    Send sub-batches concurrently and apply results incrementally.
+
+    Each sub-batch goes through the outbox (records.outbox). Failed
+    sub-batches are released back to the queue; their exceptions are
+    returned under 'errors' so the caller can decide whether to retry.
+    """
+    concurrency = concurrency or settings.BATCH_FANOUT_CONCURRENCY
+    logger.info("Fanning out %d sub-batches (concurrency=%d)", len(batches), concurrency)
+    return asyncio.run(_dispatch(batches, concurrency))
@@ -0,0 +1,219 @@
+"""
+Streaming export of records as CSV, NDJSON or Parquet.
+
+Rows are read one status at a time in (created_at, id) keyset chunks of
+EXPORT_CHUNK_SIZE, so every query is a range scan on
+record_status_created_idx and memory stays flat however large the export
+is. Unlike a server-side cursor this also streams on MySQL, and no
+transaction is held open while a slow client downloads. Archived records
+(records.archive) are only read when asked for.
+
+Parquet needs pyarrow; without it only CSV and NDJSON are available.
+
+Usage:
+    from records.export import export_chunks, iter_rows
+
+    rows = iter_rows(statuses=['SUCCESS'], since=since, include_archived=True)
+    for chunk in export_chunks('csv', rows):
+        out.write(chunk)
+"""
+
+import csv
+import io
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from records.models import ArchivedRecord, Record
+from records.serializers import render_json
+
+# Optional Parquet writer
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+EXPORT_FIELDS = (
+    'id', 'name', 'email', 'phone_number', 'link', 'dob',
+    'status', 'attempt_count', 'created_at', 'updated_at',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown format or status, or an unparseable date."""
+
+
+def available_formats():
+    return [fmt for fmt in CONTENT_TYPES if fmt != 'parquet' or HAS_PYARROW]
+
+
+def parse_bound(value, name):
+    """
+    Parse a `since`/`until` filter: an ISO date (midnight in the current
+    timezone) or an ISO datetime. Returns None for an empty value.
+    """
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ExportError(f"Invalid {name}: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_statuses(values):
+    """Validate status filters; an empty list means every status."""
+    unknown = set(values) - set(Record.Status.values)
+    if unknown:
+        raise ExportError(f"Unknown status: {', '.join(sorted(unknown))}")
+    return [status for status in Record.Status.values if status in values]
+
+
+def _keyset_chunks(records, chunk_size):
+    """Yield `records` (ordered by created_at, id) in keyset chunks."""
+    last = None
+    while True:
+        page = records
+        if last:
+            created_at, pk = last
+            page = page.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        rows = list(page[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            break
+        last = (rows[-1][8], rows[-1][0])
+
+
+def iter_rows(statuses=None, since=None, until=None, chunk_size=None, include_archived=False):
+    """
+    Yield lists of EXPORT_FIELDS tuples with created_at in [since, until).
+
+    Output is grouped by status, oldest first within each status. With
+    `include_archived`, archived records are exported with SUCCESS, ahead
+    of the live ones (archival moves the oldest rows first).
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+    def filtered(records):
+        if since:
+            records = records.filter(created_at__gte=since)
+        if until:
+            records = records.filter(created_at__lt=until)
+        return records.order_by('created_at', 'id').values_list(*EXPORT_FIELDS)
+
+    for status in statuses or Record.Status.values:
+        if include_archived and status == Record.Status.SUCCESS:
+            yield from _keyset_chunks(filtered(ArchivedRecord.objects.all()), chunk_size)
+        yield from _keyset_chunks(filtered(Record.objects.filter(status=status)), chunk_size)
+
+
+def _text(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in chunks:
+        writer.writerows(['' if v is None else _text(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(chunks):
+    for rows in chunks:
+        yield b''.join(
+            render_json(dict(zip(EXPORT_FIELDS, map(_text, row)))) + b'\n'
+            for row in rows
+        )
+
+
+class _Drain:
+    """Write-only file object whose contents are taken after each write."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.position += len(data)
+        return self.buffer.write(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def parquet_chunks(chunks):
+    """One Parquet row group per chunk; the footer comes last."""
+    tz = 'UTC' if settings.USE_TZ else None
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('name', pa.string()),
+        ('email', pa.string()),
+        ('phone_number', pa.string()),
+        ('link', pa.string()),
+        ('dob', pa.date32()),
+        ('status', pa.string()),
+        ('attempt_count', pa.int64()),
+        ('created_at', pa.timestamp('us', tz=tz)),
+        ('updated_at', pa.timestamp('us', tz=tz)),
+    ])
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(
+                [dict(zip(EXPORT_FIELDS, row)) for row in rows], schema=schema
+            ))
+            yield sink.take()
+    yield sink.take()
+
+
+def export_chunks(fmt, chunks):
+    """Encode chunks from iter_rows as `fmt`, yielding bytes."""
+    if fmt not in available_formats():
+        raise ExportError(f"Unsupported export format: {fmt}")
+    if fmt == 'csv':
+        return csv_chunks(chunks)
+    if fmt == 'ndjson':
+        return ndjson_chunks(chunks)
+    return parquet_chunks(chunks)
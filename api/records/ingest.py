@@ -0,0 +1,77 @@
+"""
+Bulk insertion of validated records.
+"""
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from records import stats
+from records.logger import logger
+from records.microbatch import notify_created
+from records.models import Record
+
+
+def bulk_insert(records):
+    """
+    Insert unsaved Record instances in chunks of RECORDS_BULK_CHUNK_SIZE.
+
+    Backends that return primary keys from a multi-row INSERT (PostgreSQL,
+    SQLite, MariaDB) use bulk_create. MySQL cannot, so rows are saved one by
+    one inside the same transaction to still report their IDs.
+
+    If a concurrent request inserted one of the records first (content_hash
+    collision), the rows are inserted one at a time instead and the
+    duplicates are skipped and reported.
+
+    Returns:
+        (created_ids, conflicts): created record IDs in input order, and
+        {position in `records`: ID of the record it duplicates} for rows
+        skipped on a collision.
+    """
+    if not records:
+        return [], {}
+
+    try:
+        created, conflicts = _insert(records), {}
+    except IntegrityError:
+        logger.info("Bulk insert hit a duplicate, inserting %d records one by one", len(records))
+        created, conflicts = _insert_skipping_duplicates(records)
+
+    logger.info("Bulk inserted %d records", len(created))
+    return [record.pk for record in created], conflicts
+
+
+def _insert(records):
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            created = Record.objects.bulk_create(
+                records, batch_size=settings.RECORDS_BULK_CHUNK_SIZE
+            )
+            # bulk_create skips Record.save(), so signal the dispatcher here
+            transaction.on_commit(lambda: notify_created(len(created)))
+            stats.created(len(created))
+        else:
+            for record in records:
+                record.save()
+            created = records
+    return created
+
+
+def _insert_skipping_duplicates(records):
+    created, conflicts = [], {}
+    for position, record in enumerate(records):
+        # The failed bulk insert may have assigned primary keys
+        record.pk = None
+        record._state.adding = True
+        try:
+            with transaction.atomic():
+                record.save()
+        except IntegrityError:
+            conflicts[position] = (
+                Record.objects.filter(content_hash=record.content_hash)
+                .values_list('id', flat=True).first()
+            )
+            logger.info("Duplicate submission merged into record %s", conflicts[position])
+            continue
+        created.append(record)
+    return created, conflicts
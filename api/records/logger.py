@@ -1,30 +1,50 @@
 """
 Centralized logging utility for the batch_processor application.
 
+Records are handed to a QueueHandler and written by a background
+QueueListener, so request threads never block on console or disk I/O. The
+listener thread is started on first use in each process, so Celery prefork
+children (forked after import, without the parent's threads) get their own.
+Each UTC day is written to its own file (logs/app-2026-01-21.log). Every
+gunicorn worker and Celery child appends to the same file and switches to
+the next one when the date changes; no process ever renames a log file, so
+concurrent processes cannot clobber each other's rollover.
+
 Usage:
     from records.logger import logger
-    
-    logger.info("Processing record")
+
+    logger.info("Processing record %s", record_id)
     logger.error("Failed to process", exc_info=True)
     logger.debug("Debug info", extra={"record_id": 123})
+
+Pass values as arguments rather than f-strings so disabled levels cost
+nothing.
 """
 
+import atexit
 import logging
 import os
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
+from decouple import config
+
 # Create logs directory if it doesn't exist
 LOGS_DIR = Path(__file__).resolve().parent.parent / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
 
-# Log file path with date
-LOG_FILE = LOGS_DIR / f"app_{datetime.now().strftime('%Y-%m-%d')}.log"
+# Daily log files are named app-<UTC date>.log; LOG_BACKUP_COUNT past days are kept
+LOG_FILE_PREFIX = 'app'
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=14, cast=int)
+LOG_LEVEL = config('LOG_LEVEL', default='DEBUG')
 
 
 class CustomFormatter(logging.Formatter):
     """Custom formatter with colors for console output."""
-    
+
     COLORS = {
         'DEBUG': '\033[36m',     # Cyan
         'INFO': '\033[32m',      # Green
@@ -33,60 +53,157 @@ class CustomFormatter(logging.Formatter):
         'CRITICAL': '\033[35m',  # Magenta
     }
     RESET = '\033[0m'
-    
+
     def __init__(self, use_colors=True):
         super().__init__()
         self.use_colors = use_colors
         self.fmt = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
         self.datefmt = "%Y-%m-%d %H:%M:%S"
-    
+
+        # Build one formatter per level up front instead of per record
+        self._plain = logging.Formatter(self.fmt, datefmt=self.datefmt)
+        self._by_level = {
+            level: logging.Formatter(f"{color}{self.fmt}{self.RESET}", datefmt=self.datefmt)
+            for level, color in self.COLORS.items()
+        }
+
     def format(self, record):
-        # Create formatter for this record
         if self.use_colors:
-            color = self.COLORS.get(record.levelname, self.RESET)
-            formatter = logging.Formatter(
-                f"{color}{self.fmt}{self.RESET}",
-                datefmt=self.datefmt
-            )
+            formatter = self._by_level.get(record.levelname, self._plain)
         else:
-            formatter = logging.Formatter(self.fmt, datefmt=self.datefmt)
-        
+            formatter = self._plain
+
         return formatter.format(record)
 
 
-def setup_logger(name: str = "batch_processor", level: str = "DEBUG") -> logging.Logger:
+class DailyFileHandler(logging.FileHandler):
+    """
+    Appends to a file named after the current UTC date and moves on to a
+    new one when the date changes.
+
+    Unlike TimedRotatingFileHandler it never renames anything, so any number
+    of processes can share it: each one only opens the day's file in append
+    mode. Files older than `backup_count` days are deleted by whichever
+    process gets there first.
+    """
+
+    def __init__(self, directory, prefix, backup_count=0, encoding=None):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.backup_count = backup_count
+        self.day = self._today()
+        super().__init__(self._path(self.day), encoding=encoding, delay=True)
+
+    def _today(self):
+        return datetime.now(timezone.utc).date()
+
+    def _path(self, day):
+        return self.directory / f"{self.prefix}-{day.isoformat()}.log"
+
+    def _prune(self):
+        if self.backup_count <= 0:
+            return
+        # ISO dates compare as strings
+        oldest = (self.day - timedelta(days=self.backup_count)).isoformat()
+        for path in self.directory.glob(f"{self.prefix}-*.log"):
+            if path.stem[len(self.prefix) + 1:] < oldest:
+                try:
+                    path.unlink()
+                except OSError:
+                    # Another process removed it first
+                    pass
+
+    def emit(self, record):
+        # Called with the handler lock held (Handler.handle)
+        day = self._today()
+        if day != self.day:
+            self.day = day
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._path(day))
+            self._prune()
+        super().emit(record)
+
+
+class ProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler that runs its own QueueListener in every process.
+
+    A thread does not survive fork, so the listener is (re)started lazily
+    when the PID changes, with a fresh queue, the same way
+    records.client.get_session rebuilds its session.
+    """
+
+    def __init__(self, *handlers):
+        super().__init__(queue.SimpleQueue())
+        self.targets = handlers
+        self.listener = None
+        self.listener_pid = None
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's lock may have been held by another thread at fork time
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self.listener_pid == pid:
+            return
+        with self._start_lock:
+            if self.listener_pid == pid:
+                return
+            self.queue = queue.SimpleQueue()
+            self.listener = QueueListener(
+                self.queue, *self.targets, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.listener.stop)
+            self.listener_pid = pid
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+
+def setup_logger(name: str = "batch_processor", level: str = LOG_LEVEL) -> logging.Logger:
     """
     Set up and return a configured logger instance.
-    
+
     Args:
         name: Logger name (default: 'batch_processor')
-        level: Logging level (default: 'DEBUG')
-    
+        level: Logging level (default: LOG_LEVEL env var, else 'DEBUG')
+
     Returns:
         Configured logger instance
     """
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper(), logging.DEBUG))
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
+
     # Console handler with colors
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG)
     console_handler.setFormatter(CustomFormatter(use_colors=True))
-    
-    # File handler without colors
-    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
+
+    # File handler without colors, one file per day
+    file_handler = DailyFileHandler(
+        LOGS_DIR,
+        LOG_FILE_PREFIX,
+        backup_count=LOG_BACKUP_COUNT,
+        encoding='utf-8',
+    )
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(CustomFormatter(use_colors=False))
-    
-    # Add handlers
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
+
+    # Callers only enqueue; a background thread does the actual writes
+    logger.addHandler(ProcessQueueHandler(console_handler, file_handler))
+
     return logger
 
 
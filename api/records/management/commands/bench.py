@@ -0,0 +1,149 @@
+"""
+Benchmark the API and batch worker and write the results as JSON.
+
+Runs in a throwaway test database, so the configured database is never
+seeded or modified. Pass a previous results file to --compare to see the
+change per metric.
+
+Usage:
+    python manage.py bench
+    python manage.py bench --sizes 1000,100000 --drain 5000 --latency 0.05
+    python manage.py bench --only list --compare bench-results/abc1234.json
+"""
+
+import json
+import subprocess
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from records import benchmarks
+from records.models import Record
+
+
+SUITES = ('list', 'create', 'drain')
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class Command(BaseCommand):
+    help = "Measure create throughput, list latency and batch drain time; write JSON results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', default=','.join(SUITES),
+                            help=f"Comma-separated suites to run ({', '.join(SUITES)})")
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help="Table sizes to measure list latency at")
+        parser.add_argument('--creates', type=int, default=200, help="Single-record POSTs to time")
+        parser.add_argument('--bulk', type=int, default=1000, help="Items in the bulk POST")
+        parser.add_argument('--repeats', type=int, default=20, help="List requests per table size")
+        parser.add_argument('--drain', type=int, default=2000, help="PENDING rows for the drain run")
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help="Seconds the fake external API waits per request")
+        parser.add_argument('--output', help="Results file (default: bench-results/<revision>.json)")
+        parser.add_argument('--compare', help="Previous results file to diff against")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database")
+
+    def handle(self, *args, **options):
+        suites = [s.strip() for s in options['only'].split(',') if s.strip()]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(sorted(unknown))}")
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            # Keep new records from queueing Celery tasks during the run
+            with override_settings(MICROBATCH_ENABLED=False):
+                results = self.run_suites(suites, sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        revision = git_revision()
+        report = {
+            'revision': revision,
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'environment': benchmarks.environment(),
+            'results': results,
+        }
+
+        output = Path(options['output'] or Path('bench-results') / f"{revision or 'latest'}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {output}"))
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), report)
+
+    def run_suites(self, suites, sizes, options):
+        results = {}
+
+        # List first, so the created rows don't skew the table sizes
+        if 'list' in suites:
+            self.stdout.write(self.style.MIGRATE_HEADING("List"))
+            results['list'] = {}
+            for size in sizes:
+                # Grow the table to each size in turn rather than reseeding
+                benchmarks.seed_records(max(0, size - Record.objects.count()))
+                results['list'][str(size)] = benchmarks.bench_list(options['repeats'])
+                self.report(results['list'][str(size)], label=f"{size} rows")
+
+        if 'create' in suites:
+            self.stdout.write(self.style.MIGRATE_HEADING("Create"))
+            results['create'] = benchmarks.bench_create(options['creates'])
+            results['bulk_create'] = benchmarks.bench_bulk_create(options['bulk'])
+            self.report(results['create'])
+            self.report(results['bulk_create'])
+
+        if 'drain' in suites:
+            self.stdout.write(self.style.MIGRATE_HEADING("Drain"))
+            results['drain'] = benchmarks.bench_drain(options['drain'], latency=options['latency'])
+            self.report(results['drain'])
+
+        return results
+
+    def report(self, result, label=''):
+        prefix = f"  {label}: " if label else "  "
+        self.stdout.write(prefix + json.dumps(result))
+
+    def compare(self, previous, current):
+        before = flatten(previous.get('results', {}))
+        after = flatten(current['results'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nChange since {previous.get('revision') or 'previous run'}"
+        ))
+        for metric in sorted(before.keys() & after.keys()):
+            old, new = before[metric], after[metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            self.stdout.write(f"  {metric:<40} {old:>12} -> {new:<12} {change}")
@@ -0,0 +1,156 @@
+"""
+Load-test a running API server over real HTTP connections.
+
+Opens --concurrency keep-alive connections and sends --requests requests
+across them as fast as responses come back, then reports throughput and
+latency. Use it to compare the WSGI and ASGI deployments (see
+config/asgi.py).
+
+--slow-clients adds connections that trickle each request body over
+--slow-seconds, like clients on poor mobile networks, for as long as the
+main load runs. A server that reads bodies on a worker thread loses a
+thread to each of them.
+
+Usage:
+    python manage.py bench_http --url http://127.0.0.1:8000/api/records/ --concurrency 64
+    python manage.py bench_http --url http://127.0.0.1:8000/api/async/records/success/ --method GET
+    python manage.py bench_http --url http://127.0.0.1:8000/api/records/ --slow-clients 16
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from records.benchmarks import summarize
+
+
+class Command(BaseCommand):
+    help = "Measure throughput and latency of a running server under concurrent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', required=True, help="Endpoint to hit (http:// only)")
+        parser.add_argument('--method', default='POST', choices=['GET', 'POST'])
+        parser.add_argument('--requests', type=int, default=2000, help="Total requests")
+        parser.add_argument('--concurrency', type=int, default=64, help="Open connections")
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help="Extra connections that upload bodies slowly")
+        parser.add_argument('--slow-seconds', type=float, default=2.0,
+                            help="Seconds each slow client takes to send a body")
+        parser.add_argument('--output', help="Also write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError("--url must be an http:// URL")
+
+        result = asyncio.run(self.run(
+            url.hostname, url.port or 80, url.path or '/', options['method'],
+            options['requests'], options['concurrency'],
+            options['slow_clients'], options['slow_seconds'],
+        ))
+        result.update(url=options['url'], method=options['method'])
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+
+    async def run(self, host, port, path, method, total, concurrency, slow_clients, slow_seconds):
+        samples, statuses = [], {}
+        remaining = iter(range(total))
+        done = asyncio.Event()
+
+        async def connection():
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                for i in remaining:
+                    request = self.build_request(host, path, method, i)
+                    started = time.perf_counter()
+                    writer.write(request)
+                    await writer.drain()
+                    status, keep_alive = await self.read_response(reader)
+                    samples.append(time.perf_counter() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if not keep_alive:
+                        writer.close()
+                        reader, writer = await asyncio.open_connection(host, port)
+            finally:
+                writer.close()
+
+        async def slow_connection(n):
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                while not done.is_set():
+                    request = self.build_request(host, path, 'POST', total + n)
+                    split = request.index(b'\r\n\r\n') + 4
+                    writer.write(request[:split])
+                    body = request[split:]
+                    for offset in range(len(body)):
+                        await asyncio.sleep(slow_seconds / len(body))
+                        writer.write(body[offset:offset + 1])
+                        await writer.drain()
+                    await self.read_response(reader)
+            finally:
+                writer.close()
+
+        slow = [asyncio.create_task(slow_connection(n)) for n in range(slow_clients)]
+        started = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*slow, return_exceptions=True)
+
+        return {
+            'requests': len(samples),
+            'concurrency': concurrency,
+            'slow_clients': slow_clients,
+            'seconds': round(elapsed, 3),
+            'requests_per_s': round(len(samples) / elapsed, 1),
+            'statuses': statuses,
+            **summarize(samples),
+        }
+
+    def build_request(self, host, path, method, n):
+        body = b''
+        if method == 'POST':
+            body = json.dumps({
+                'name': f"Load Test {n}",
+                'email': f"load{n}@example.com",
+                'phone_number': f"+91{6000000000 + n % 1000000000}",
+            }).encode('utf-8')
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        )
+        return head.encode('ascii') + body
+
+    async def read_response(self, reader):
+        """Read one response; returns (status code, connection kept alive)."""
+        status_line = await reader.readline()
+        if not status_line:
+            raise CommandError("Server closed the connection")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        return status, headers.get('connection') != 'close'
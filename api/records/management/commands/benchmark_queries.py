@@ -0,0 +1,78 @@
+"""
+Seed records and show how the hot queries are executed.
+
+Seeding runs in a throwaway test database, so the configured database is
+never modified. --no-seed skips the test database and only runs the
+(read-only) queries against the configured one.
+
+Usage:
+    python manage.py benchmark_queries --rows 1000000
+    python manage.py benchmark_queries --no-seed
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from records.batch import claimable_queryset
+from records.benchmarks import seed_records
+from records.models import Record
+
+
+class Command(BaseCommand):
+    help = "Seed Record rows and EXPLAIN the work-queue and SUCCESS list queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Rows to seed")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk INSERT")
+        parser.add_argument('--no-seed', action='store_true',
+                            help="Only run the queries, against the configured database")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database")
+
+    def handle(self, *args, **options):
+        if options['no_seed']:
+            self.run_queries()
+            return
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            # A kept database already holds the rows from the last run
+            rows = max(0, options['rows'] - Record.objects.count())
+            self.seed(rows, options['chunk_size'])
+            self.run_queries()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def run_queries(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("ANALYZE records_record")
+            elif connection.vendor == 'mysql':
+                cursor.execute("ANALYZE TABLE records_record")
+
+        self.benchmark("Work-queue claim", claimable_queryset().only('id')[:100])
+        self.benchmark(
+            "SUCCESS list page",
+            Record.objects.filter(status=Record.Status.SUCCESS)
+            .order_by('-created_at', '-id')[:50],
+        )
+
+    def seed(self, rows, chunk_size):
+        started = time.perf_counter()
+        seed_records(rows, chunk_size=chunk_size)
+        self.stdout.write(f"Seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    def benchmark(self, label, queryset):
+        started = time.perf_counter()
+        list(queryset)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        analyze = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label} ({elapsed_ms:.2f} ms)"))
+        self.stdout.write(queryset.explain(**analyze))
@@ -0,0 +1,206 @@
+"""
+Prometheus metrics for the API and the batch worker.
+
+Metrics are only collected when METRICS_ENABLED is on and prometheus_client
+is installed; otherwise every metric is a no-op and MetricsMiddleware removes
+itself at startup, so instrumented code costs almost nothing.
+
+Scrape GET /metrics. Under gunicorn or Celery prefork, set
+PROMETHEUS_MULTIPROC_DIR to a shared, empty directory so every process's
+samples are aggregated into one response.
+
+Usage:
+    from records import metrics
+
+    with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='claim'):
+        records = claim_batch(size)
+    metrics.RECORDS_PROCESSED.labels(status='SUCCESS').inc(len(records))
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, multiprocess
+    from prometheus_client.core import GaugeMetricFamily
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+
+
+ENABLED = settings.METRICS_ENABLED and HAS_PROMETHEUS
+
+# Seconds; spans a cached list page (~1ms) up to the external API read timeout
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class _NoOpMetric:
+    """Stands in for any metric when metrics are disabled."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+def _metric(kind, name, documentation, **kwargs):
+    if not ENABLED:
+        return _NoOpMetric()
+    return getattr(prometheus_client, kind)(name, documentation, **kwargs)
+
+
+RECORDS_PROCESSED = _metric(
+    'Counter',
+    'records_processed_total',
+    'Records finished by process_batch, by resulting status',
+    labelnames=['status'],
+)
+BATCH_SIZE = _metric(
+    'Histogram',
+    'records_batch_size',
+    'Records per batch sent to the external API',
+    buckets=BATCH_SIZE_BUCKETS,
+)
+BATCH_STAGE_SECONDS = _metric(
+    'Histogram',
+    'records_batch_stage_seconds',
+    'Time process_batch spends per stage (claim, build, send, apply)',
+    labelnames=['stage'],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_API_SECONDS = _metric(
+    'Histogram',
+    'records_external_api_seconds',
+    'External batch API request latency',
+    labelnames=['outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = _metric(
+    'Histogram',
+    'records_http_request_seconds',
+    'API request latency by view',
+    labelnames=['view', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def timer(metric, **labels):
+    """Observe the duration of the block on `metric` (skipped when disabled)."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.labels(**labels).observe(time.perf_counter() - started)
+
+
+def count_processed(result):
+    """Count the outcome of a process_batch run or apply_results call."""
+    if not ENABLED:
+        return
+    for key, status in (('success', 'SUCCESS'), ('failed', 'FAILED'), ('dead', 'DEAD')):
+        if result.get(key):
+            RECORDS_PROCESSED.labels(status=status).inc(result[key])
+
+
+class BacklogCollector:
+    """Reports queue depth per status, counted from the database at scrape time."""
+
+    def collect(self):
+        # Import here to avoid circular imports
+        from records.models import Record
+
+        gauge = GaugeMetricFamily(
+            'records_backlog', 'Records waiting for or in batch processing', labels=['status']
+        )
+        waiting = [Record.Status.PENDING, Record.Status.FAILED, Record.Status.IN_PROGRESS]
+        counts = dict(
+            Record.objects.filter(status__in=waiting)
+            .values_list('status')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for status in waiting:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+if ENABLED and not MULTIPROCESS:
+    prometheus_client.REGISTRY.register(BacklogCollector())
+
+
+def _registry():
+    """Registry to scrape: this process's, or merged across processes."""
+    if not MULTIPROCESS:
+        return prometheus_client.REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(BacklogCollector())
+    return registry
+
+
+def metrics_view(request):
+    """GET /metrics in the Prometheus text format (404 when disabled)."""
+    if not ENABLED:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(
+        prometheus_client.generate_latest(_registry()),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
+
+
+class MetricsMiddleware:
+    """Observes request latency per resolved view (WSGI and ASGI)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not ENABLED:
+            # Django drops the middleware entirely
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_SECONDS.labels(
+            view=match.view_name if match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        ).observe(time.perf_counter() - started)
@@ -0,0 +1,129 @@
+"""
+Event-driven micro-batching of newly created records.
+
+Every committed record creation bumps a shared counter in Redis. A batch is
+flushed as soon as MICROBATCH_MAX_RECORDS have accumulated, or
+MICROBATCH_MAX_WAIT_MS after the first record of a window, whichever comes
+first. The Celery Beat run remains as a safety-net sweeper for anything a
+lost signal leaves behind.
+
+Usage:
+    from records.microbatch import notify_created
+
+    transaction.on_commit(lambda: notify_created(len(created)))
+"""
+
+import uuid
+
+import redis
+from django.conf import settings
+
+from records.logger import logger
+from records.redis_client import get_redis
+
+
+PENDING_KEY = 'records:microbatch:pending'
+# Holds the open window's token; outlives the flush countdown so the flush
+# task can still tell that the window is its own
+TIMER_KEY = 'records:microbatch:timer'
+
+# Outcomes of the debounce script
+NOTHING, START_TIMER, FLUSH_NOW = 0, 1, 2
+
+# Atomically count new records and decide whether to flush. Only the caller
+# that crosses the size threshold, or that opens a new time window, acts.
+DEBOUNCE_SCRIPT = """
+local pending = redis.call('INCRBY', KEYS[1], ARGV[1])
+if pending >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 2
+end
+if redis.call('SET', KEYS[2], ARGV[4], 'NX', 'PX', ARGV[3]) then
+    redis.call('SET', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Close the window only if it is still the one the timer was started for;
+# a timer that fires after a size flush must not close the next window.
+# Returns 1 if the window was closed.
+CLOSE_SCRIPT = """
+local token = redis.call('GET', KEYS[2])
+if token and token ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
+_scripts = {}
+
+
+def _run(source, args):
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = get_redis().register_script(source)
+    return script(keys=[PENDING_KEY, TIMER_KEY], args=args)
+
+
+def _debounce(count, token):
+    return _run(DEBOUNCE_SCRIPT, [
+        count,
+        settings.MICROBATCH_MAX_RECORDS,
+        # Twice the countdown: long enough for a late flush task to find it
+        2 * settings.MICROBATCH_MAX_WAIT_MS,
+        token,
+    ])
+
+
+def notify_created(count=1):
+    """
+    Signal that `count` records were committed.
+
+    Call from transaction.on_commit so workers never look for rows that are
+    not visible yet. Redis and broker errors are logged and ignored; the
+    Beat sweeper picks those records up instead.
+    """
+    if not settings.MICROBATCH_ENABLED or count <= 0:
+        return
+
+    # Import here to avoid circular imports (tasks -> models -> microbatch)
+    from records.tasks import flush_microbatch, start_batch_workers
+
+    token = uuid.uuid4().hex
+    try:
+        action = _debounce(count, token)
+    except redis.RedisError as e:
+        logger.warning("Micro-batch signal dropped, Beat will sweep: %s", e)
+        return
+
+    # The records are already committed, so a broker outage must not turn
+    # the request that created them into an error
+    try:
+        if action == FLUSH_NOW:
+            logger.debug("Micro-batch size threshold reached, dispatching")
+            start_batch_workers()
+        elif action == START_TIMER:
+            flush_microbatch.apply_async(
+                args=[token], countdown=settings.MICROBATCH_MAX_WAIT_MS / 1000
+            )
+    except Exception as e:
+        logger.error("Micro-batch dispatch failed, Beat will sweep: %s", e)
+
+
+def reset(token=None):
+    """
+    Close the window opened with `token` (any window if None) so the next
+    record starts a new one.
+
+    Returns:
+        False if a newer window is open, so its own timer will flush it;
+        True otherwise, including when Redis is unavailable.
+    """
+    try:
+        if token is None:
+            get_redis().delete(PENDING_KEY, TIMER_KEY)
+            return True
+        return bool(_run(CLOSE_SCRIPT, [token]))
+    except redis.RedisError as e:
+        logger.warning("Could not reset micro-batch window: %s", e)
+        return True
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a batch worker last claimed this record', null=True),
+        ),
+        migrations.AlterField(
+            model_name='record',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20),
+        ),
+    ]
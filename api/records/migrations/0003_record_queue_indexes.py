@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:30
+
+from django.db import migrations, models
+
+
+# PostgreSQL only: a small index over just the rows the work-queue can claim.
+# MySQL has no partial indexes and relies on record_status_created_idx.
+PARTIAL_INDEX_NAME = 'record_unprocessed_idx'
+
+
+def create_partial_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {PARTIAL_INDEX_NAME} "
+        "ON records_record (created_at, id) "
+        "WHERE status IN ('PENDING', 'FAILED', 'IN_PROGRESS')"
+    )
+
+
+def drop_partial_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {PARTIAL_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0002_record_claim'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='record_status_created_idx'),
+        ),
+        # The composite index's leading column replaces the old status index
+        migrations.AlterField(
+            model_name='record',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(create_partial_index, drop_partial_index),
+    ]
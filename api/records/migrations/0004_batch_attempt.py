@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0003_record_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('SENDING', 'Sending'), ('RESPONDED', 'Responded'), ('APPLIED', 'Applied'), ('FAILED', 'Failed'), ('ABANDONED', 'Abandoned')], default='SENDING', max_length=20)),
+                ('payload_hash', models.CharField(db_index=True, help_text='SHA-256 of the JSON payload; sent as the Idempotency-Key', max_length=64)),
+                ('claimed', models.JSONField(help_text='Record IDs in this batch mapped to their status before the claim')),
+                ('claimed_at', models.DateTimeField(help_text='Claim timestamp shared by every record in this batch')),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('outcomes', models.JSONField(blank=True, help_text='Per-record outcome: SUCCESS, FAILED or UNANSWERED', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Batch Attempt',
+                'verbose_name_plural': 'Batch Attempts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='attempt_status_updated_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:30
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_next_attempt_at(apps, schema_editor):
+    # Existing rows keep their queue position
+    Record = apps.get_model('records', 'Record')
+    Record.objects.update(next_attempt_at=F('created_at'))
+
+
+# PostgreSQL only: swap the partial work-queue index for one on the due time.
+# Stale IN_PROGRESS claims are found through record_status_created_idx.
+def swap_partial_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS record_unprocessed_idx")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS record_due_idx "
+        "ON records_record (next_attempt_at, id) "
+        "WHERE status IN ('PENDING', 'FAILED')"
+    )
+
+
+def restore_partial_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS record_due_idx")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS record_unprocessed_idx "
+        "ON records_record (created_at, id) "
+        "WHERE status IN ('PENDING', 'FAILED', 'IN_PROGRESS')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0004_batch_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0, help_text='Times the external API returned FAILED for this record'),
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time a batch worker may pick this record up'),
+        ),
+        migrations.AlterField(
+            model_name='record',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILED', 'Failed'), ('DEAD', 'Dead')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['status', 'next_attempt_at', 'id'], name='record_status_due_idx'),
+        ),
+        migrations.AlterField(
+            model_name='batchattempt',
+            name='claimed',
+            field=models.JSONField(help_text='Record IDs in this batch mapped to their pre-claim status and attempt count'),
+        ),
+        migrations.RunPython(backfill_next_attempt_at, migrations.RunPython.noop),
+        migrations.RunPython(swap_partial_index, restore_partial_index),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:15
+
+import hashlib
+
+from django.db import migrations, models
+
+
+# Frozen copy of records.dedup.content_hash
+def content_hash(name, email, phone_number, dob):
+    normalized = '\x1f'.join([
+        ' '.join(name.split()).casefold(),
+        email.strip().lower(),
+        phone_number.strip(),
+        dob.isoformat() if dob else '',
+    ])
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+# Which copy of duplicated content keeps the hash: one already processed
+# (or in flight) first, otherwise the oldest
+KEEP_RANK = {'SUCCESS': 0, 'IN_PROGRESS': 1}
+
+
+def _chunks(Record):
+    last_id = 0
+    while True:
+        rows = list(
+            Record.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'name', 'email', 'phone_number', 'dob', 'status')[:2000]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def backfill_content_hash(apps, schema_editor):
+    """
+    Hash existing rows. One row per hash keeps it: a SUCCESS copy if there
+    is one, so content already delivered is never sent again, else an
+    IN_PROGRESS one, else the lowest ID. The other copies keep a NULL hash,
+    and those not yet processed are marked DUPLICATE so they are never sent
+    to the external API.
+    """
+    Record = apps.get_model('records', 'Record')
+
+    # First pass: pick the keeper of each hash
+    keepers = {}
+    for rows in _chunks(Record):
+        for record_id, name, email, phone_number, dob, status in rows:
+            digest = content_hash(name, email, phone_number, dob)
+            candidate = (KEEP_RANK.get(status, 2), record_id)
+            if digest not in keepers or candidate < keepers[digest]:
+                keepers[digest] = candidate
+
+    # Second pass: hash the keepers, retire the other unprocessed copies
+    for rows in _chunks(Record):
+        hashed, duplicate_ids = [], []
+        for record_id, name, email, phone_number, dob, status in rows:
+            digest = content_hash(name, email, phone_number, dob)
+            if keepers[digest][1] == record_id:
+                hashed.append(Record(id=record_id, content_hash=digest))
+            elif status in ('PENDING', 'FAILED'):
+                duplicate_ids.append(record_id)
+
+        Record.objects.bulk_update(hashed, ['content_hash'])
+        Record.objects.filter(id__in=duplicate_ids).update(status='DUPLICATE')
+
+
+def clear_duplicates(apps, schema_editor):
+    Record = apps.get_model('records', 'Record')
+    Record.objects.filter(status='DUPLICATE').update(status='PENDING')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0005_record_retry_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of normalized name/email/phone/dob; NULL on legacy duplicates', max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='record',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILED', 'Failed'), ('DEAD', 'Dead'), ('DUPLICATE', 'Duplicate')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(backfill_content_hash, clear_duplicates),
+        # Unique only once the backfill has left one row per hash
+        migrations.AlterField(
+            model_name='record',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of normalized name/email/phone/dob; NULL on legacy duplicates', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
+from records import stats
+from records.dedup import hash_of
 from records.logger import logger
+from records.microbatch import notify_created
 
 
 class Record(models.Model):
@@ -11,8 +15,11 @@ class Record(models.Model):
     
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
+        IN_PROGRESS = 'IN_PROGRESS', 'In Progress'
         SUCCESS = 'SUCCESS', 'Success'
         FAILED = 'FAILED', 'Failed'
+        DEAD = 'DEAD', 'Dead'
+        DUPLICATE = 'DUPLICATE', 'Duplicate'
     
     name = models.CharField(max_length=255)
     email = models.EmailField()
@@ -31,16 +38,44 @@ class Record(models.Model):
         help_text="Date of birth"
     )
     status = models.CharField(
-        max_length=10,
+        max_length=20,
         choices=Status.choices,
-        default=Status.PENDING,
-        db_index=True  # Index for faster filtering
+        default=Status.PENDING
+    )
+    claimed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a batch worker last claimed this record"
+    )
+    attempt_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the external API returned FAILED for this record"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time a batch worker may pick this record up"
+    )
+    last_error = models.TextField(blank=True, default='')
+    content_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="SHA-256 of normalized name/email/phone/dob; NULL on legacy duplicates"
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Work-queue (status IN ... ORDER BY created_at) and SUCCESS list
+            # (status = ... ORDER BY -created_at, -id) are both range scans
+            models.Index(fields=['status', 'created_at', 'id'], name='record_status_created_idx'),
+            # Due-work query: status IN ... AND next_attempt_at <= now
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='record_status_due_idx'),
+        ]
         verbose_name = 'Record'
         verbose_name_plural = 'Records'
     
@@ -49,8 +84,105 @@ class Record(models.Model):
     
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        if is_new and self.content_hash is None:
+            # Duplicates fail the unique index (see records.dedup)
+            self.content_hash = hash_of(self)
         super().save(*args, **kwargs)
         if is_new:
-            logger.info(f"New record created: {self.name} (ID: {self.pk})")
+            logger.info("New record created: %s (ID: %s)", self.name, self.pk)
+            # Wake the micro-batch dispatcher once the row is visible
+            transaction.on_commit(notify_created)
+            stats.created()
         else:
-            logger.debug(f"Record updated: {self.name} (ID: {self.pk}, Status: {self.status})")
+            logger.debug("Record updated: %s (ID: %s, Status: %s)", self.name, self.pk, self.status)
+
+
+class ArchivedRecord(models.Model):
+    """
+    SUCCESS records moved out of the live table once older than
+    ARCHIVE_RETENTION_DAYS (see records.archive).
+
+    Rows keep their original ID, so IDs and list cursors stay valid across
+    both tables.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    email = models.EmailField()
+    phone_number = models.CharField(max_length=20)
+    link = models.URLField(blank=True, null=True)
+    dob = models.DateField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=Record.Status.choices)
+    attempt_count = models.PositiveIntegerField(default=0)
+    # Checked by duplicate detection (records.dedup) alongside the live table
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Merged SUCCESS list (ORDER BY -created_at, -id)
+            models.Index(fields=['created_at', 'id'], name='archived_created_idx'),
+        ]
+        verbose_name = 'Archived record'
+        verbose_name_plural = 'Archived records'
+
+    def __str__(self):
+        return f"{self.name} ({self.email}) - archived"
+
+
+class BatchAttempt(models.Model):
+    """
+    Outbox entry for one batch sent to the external API.
+
+    Written before the POST and updated with the response before any record
+    status changes, so a worker that crashes mid-batch can be recovered by
+    applying the stored response instead of re-sending the batch.
+    """
+
+    class Status(models.TextChoices):
+        SENDING = 'SENDING', 'Sending'
+        RESPONDED = 'RESPONDED', 'Responded'
+        APPLIED = 'APPLIED', 'Applied'
+        FAILED = 'FAILED', 'Failed'
+        ABANDONED = 'ABANDONED', 'Abandoned'
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.SENDING
+    )
+    payload_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="SHA-256 of the JSON payload; sent as the Idempotency-Key"
+    )
+    claimed = models.JSONField(
+        help_text="Record IDs in this batch mapped to their pre-claim status and attempt count"
+    )
+    claimed_at = models.DateTimeField(
+        help_text="Claim timestamp shared by every record in this batch"
+    )
+    response = models.JSONField(blank=True, null=True)
+    outcomes = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Per-record outcome: SUCCESS, FAILED or UNANSWERED"
+    )
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Batch Attempt'
+        verbose_name_plural = 'Batch Attempts'
+        indexes = [
+            # Recovery sweep: unfinished attempts by age
+            models.Index(fields=['status', 'updated_at'], name='attempt_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Batch attempt {self.pk} ({len(self.claimed)} records) - {self.status}"
@@ -0,0 +1,163 @@
+"""
+Transactional outbox for batches sent to the external API.
+
+Every batch is recorded as a BatchAttempt before it is posted:
+
+    SENDING -> RESPONDED -> APPLIED
+            -> FAILED      (request failed; records released for retry)
+            -> APPLIED     (2xx we could not read; every record failed)
+            -> ABANDONED   (worker died mid-request; records reclaimed later)
+
+The response is persisted (RESPONDED) before any record status changes, and
+applying it locks the attempt row and flips it to APPLIED in the same
+transaction. A crash at any point therefore either leaves a response that
+recovery applies exactly once, or no response at all - never a batch that
+succeeded downstream but gets posted again.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from records.batch import apply_results, parse_results, release_batch
+from records.logger import logger
+from records.models import BatchAttempt, Record
+
+
+def payload_hash(payload):
+    """Stable SHA-256 of a payload, independent of key order."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def open_attempt(records, payload):
+    """Persist a SENDING attempt for a claimed batch before it is posted."""
+    return BatchAttempt.objects.create(
+        payload_hash=payload_hash(payload),
+        claimed={
+            str(r.id): {'status': r.status, 'attempts': r.attempt_count}
+            for r in records
+        },
+        claimed_at=records[0].claimed_at,
+    )
+
+
+def claimed_records(attempt):
+    """Rebuild lightweight Record carriers (id, pre-claim status, attempts)."""
+    return [
+        Record(id=int(record_id), status=claim['status'], attempt_count=claim['attempts'])
+        for record_id, claim in attempt.claimed.items()
+    ]
+
+
+def mark_responded(attempt, results):
+    """Persist the external response; from here on the batch is never re-sent."""
+    attempt.response = results
+    attempt.status = BatchAttempt.Status.RESPONDED
+    attempt.save(update_fields=['response', 'status', 'error', 'updated_at'])
+
+
+def mark_failed(attempt, error):
+    """Record a failed request and release the batch back to the queue."""
+    with transaction.atomic():
+        attempt.status = BatchAttempt.Status.FAILED
+        attempt.error = str(error)
+        attempt.save(update_fields=['status', 'error', 'updated_at'])
+        release_batch(
+            claimed_records(attempt), claimed_at=attempt.claimed_at, error=error
+        )
+
+
+def mark_unusable(attempt, error):
+    """
+    Fail a delivered batch whose 2xx response could not be read.
+
+    The API may have acted on the batch, so its records are not released
+    for an immediate re-send. The error is stored on the attempt and each
+    record is failed as if the API had answered FAILED: it counts an
+    attempt, backs off, and goes DEAD after BATCH_MAX_ATTEMPTS.
+
+    Returns:
+        processed/success/failed counts, as apply_attempt.
+    """
+    attempt.error = str(error)
+    mark_responded(attempt, [
+        {'id': int(record_id), 'status': 'FAILED'} for record_id in attempt.claimed
+    ])
+    return apply_attempt(attempt.pk)
+
+
+def apply_attempt(attempt_id):
+    """
+    Apply a RESPONDED attempt's stored response exactly once.
+
+    The attempt row is locked, so concurrent callers (the worker that sent
+    the batch and the recovery sweep) cannot both apply it.
+
+    Returns:
+        processed/success/failed counts, or None if it was already applied.
+    """
+    with transaction.atomic():
+        attempt = (
+            BatchAttempt.objects.select_for_update(skip_locked=True)
+            .filter(pk=attempt_id, status=BatchAttempt.Status.RESPONDED)
+            .first()
+        )
+        if attempt is None:
+            return None
+
+        result = apply_results(
+            claimed_records(attempt), attempt.response, claimed_at=attempt.claimed_at,
+            error=attempt.error or None,
+        )
+
+        answered = parse_results(attempt.response)
+        attempt.outcomes = {
+            record_id: (
+                'SUCCESS' if answered.get(int(record_id)) == 'SUCCESS'
+                else 'FAILED' if int(record_id) in answered
+                else 'UNANSWERED'
+            )
+            for record_id in attempt.claimed
+        }
+        attempt.status = BatchAttempt.Status.APPLIED
+        attempt.save(update_fields=['outcomes', 'status', 'updated_at'])
+
+    return result
+
+
+def recover_attempts():
+    """
+    Finish attempts left behind by crashed workers.
+
+    RESPONDED attempts older than BATCH_RECOVERY_GRACE are applied from the
+    stored response without re-posting. SENDING attempts older than the
+    claim timeout never got a response recorded; they are marked ABANDONED
+    and their records are reclaimed through the normal stale-claim path.
+    """
+    now = timezone.now()
+    grace = now - timedelta(seconds=settings.BATCH_RECOVERY_GRACE)
+    abandoned_before = now - timedelta(seconds=settings.BATCH_CLAIM_TIMEOUT)
+
+    applied = 0
+    stuck = BatchAttempt.objects.filter(
+        status=BatchAttempt.Status.RESPONDED, updated_at__lt=grace
+    ).values_list('pk', flat=True)
+    for attempt_id in stuck:
+        if apply_attempt(attempt_id) is not None:
+            applied += 1
+
+    abandoned = BatchAttempt.objects.filter(
+        status=BatchAttempt.Status.SENDING, updated_at__lt=abandoned_before
+    ).update(status=BatchAttempt.Status.ABANDONED, updated_at=now)
+
+    if applied or abandoned:
+        logger.warning(
+            "Recovered batch attempts: %d applied from stored response, %d abandoned",
+            applied, abandoned
+        )
+    return {'applied': applied, 'abandoned': abandoned}
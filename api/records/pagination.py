@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination for record listings.
+
+Pages are ordered by (-created_at, -id) and the cursor encodes the last
+(created_at, id) pair of the previous page, so fetching any page is a range
+scan on the index instead of an OFFSET over the whole table.
+"""
+
+import base64
+import binascii
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor that cannot be decoded."""
+
+
+def encode_cursor(created_at, pk):
+    """Encode a (created_at, id) position as an opaque URL-safe token."""
+    raw = f"{created_at.isoformat()}|{pk}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a token produced by encode_cursor into (created_at, id)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def parse_page_size(value, default, maximum):
+    """Parse the page_size query param, clamped to [1, maximum]."""
+    if value in (None, ''):
+        return default
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def _after_cursor(queryset, cursor, page_size):
+    """Order `queryset` newest first, skip to `cursor`, slice one extra row."""
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    # Fetch one extra row to know whether another page exists
+    return queryset[:page_size + 1]
+
+
+def _split_page(rows, page_size, position):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        position = position or (lambda row: (row.created_at, row.pk))
+        next_cursor = encode_cursor(*position(rows[-1]))
+    return rows, next_cursor
+
+
+def _merge(pages, page_size, position):
+    """Merge newest-first pages of several querysets into one."""
+    position = position or (lambda row: (row.created_at, row.pk))
+    return list(islice(heapq.merge(*pages, key=position, reverse=True), page_size + 1))
+
+
+def keyset_page(queryset, cursor=None, page_size=50, position=None):
+    """
+    Return one page of `queryset` after `cursor`.
+
+    `position(row)` returns a row's (created_at, id); it defaults to model
+    attributes and lets callers paginate `.values_list()` querysets too.
+
+    `queryset` may also be a list of querysets with the same columns and
+    disjoint IDs (e.g. live and archived records); each is read after the
+    cursor and the results are merged into one page.
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    if not isinstance(queryset, (list, tuple)):
+        rows = list(_after_cursor(queryset, cursor, page_size))
+        return _split_page(rows, page_size, position)
+
+    pages = [list(_after_cursor(qs, cursor, page_size)) for qs in queryset]
+    return _split_page(_merge(pages, page_size, position), page_size, position)
+
+
+async def akeyset_page(queryset, cursor=None, page_size=50, position=None):
+    """Async version of keyset_page, for async views."""
+    if not isinstance(queryset, (list, tuple)):
+        rows = [row async for row in _after_cursor(queryset, cursor, page_size)]
+        return _split_page(rows, page_size, position)
+
+    pages = [[row async for row in _after_cursor(qs, cursor, page_size)] for qs in queryset]
+    return _split_page(_merge(pages, page_size, position), page_size, position)
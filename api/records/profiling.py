@@ -0,0 +1,200 @@
+"""
+Query counting, query budgets and sampled cProfile for requests and tasks.
+
+QueryProfileMiddleware counts the SQL queries and database time of every
+request and reports them in a Server-Timing header. Views listed in
+QUERY_BUDGETS (by URL name) that run more queries than allowed are logged,
+or fail outright with QUERY_BUDGET_STRICT, which is how tests catch N+1
+regressions. With PROFILE_SAMPLE_RATE > 0, a sample of requests also runs
+under cProfile and the slowest PROFILE_KEEP profiles are kept in PROFILE_DIR.
+
+Celery tasks get the same counting and budgets through @profile_task.
+
+Usage:
+    @shared_task
+    @profile_task(per='batches')
+    def process_batch():
+        ...
+
+    with count_queries() as counter:
+        ...
+    print(counter.queries, counter.duration)
+"""
+
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from records.logger import logger
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised under QUERY_BUDGET_STRICT when a view or task runs too many queries."""
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts queries and their total time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def count_queries():
+    """Count queries on every configured database inside the block."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def check_budget(name, queries):
+    """Log (or raise, under QUERY_BUDGET_STRICT) when `name` is over budget."""
+    budget = settings.QUERY_BUDGETS.get(name)
+    if budget is None or queries <= budget:
+        return
+    message = f"{name} ran {queries} queries (budget {budget})"
+    if settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning("Query budget exceeded: %s", message)
+
+
+class SlowestProfiles:
+    """
+    Keeps the slowest PROFILE_KEEP profiles as .prof files in PROFILE_DIR.
+
+    The duration is the file name prefix, so every process shares one
+    ranking just by listing the directory.
+    """
+
+    # cProfile cannot run twice at once in a process
+    _lock = threading.Lock()
+
+    def __init__(self, directory, keep):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def _kept(self):
+        return sorted(self.directory.glob('*.prof'), reverse=True)
+
+    def save(self, profiler, duration, label):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        kept = self._kept()
+        if len(kept) >= self.keep and f"{duration * 1000:010.1f}" <= kept[self.keep - 1].name[:10]:
+            return None
+
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        path = self.directory / f"{duration * 1000:010.1f}-{safe_label}-{os.getpid()}.prof"
+        profiler.dump_stats(path)
+
+        for stale in self._kept()[self.keep:]:
+            stale.unlink(missing_ok=True)
+        return path
+
+    @contextmanager
+    def sample(self, label):
+        """Profile the block if it is sampled and no other profile is running."""
+        if random.random() >= settings.PROFILE_SAMPLE_RATE or not self._lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            yield
+        finally:
+            profiler.disable()
+            self._lock.release()
+            path = self.save(profiler, time.perf_counter() - started, label)
+            if path:
+                logger.info("Saved profile %s", path)
+
+
+def server_timing(counter, total):
+    """Server-Timing header value; durations in milliseconds."""
+    return (
+        f'db;dur={counter.duration * 1000:.1f};desc="{counter.queries} queries", '
+        f'total;dur={total * 1000:.1f}'
+    )
+
+
+class QueryProfileMiddleware:
+    """
+    Counts queries per request and adds a Server-Timing header.
+
+    Sync-only: execute_wrapper is per-thread, so under ASGI Django runs the
+    request on a thread while this is enabled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            # Django drops the middleware entirely
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profiles = SlowestProfiles(settings.PROFILE_DIR, settings.PROFILE_KEEP)
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with count_queries() as counter, self.profiles.sample(request.path):
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        response['Server-Timing'] = server_timing(counter, total)
+        logger.debug(
+            "%s %s: %d queries, %.1f ms db, %.1f ms total",
+            request.method, view, counter.queries, counter.duration * 1000, total * 1000
+        )
+        check_budget(view, counter.queries)
+        return response
+
+
+def profile_task(func=None, per=None):
+    """
+    Count a Celery task's queries, log them and apply its QUERY_BUDGETS entry.
+
+    With `per`, the budget applies per unit of work: the query count is
+    divided by result[per] (e.g. 'batches' for a draining process_batch).
+    """
+    if func is None:
+        return functools.partial(profile_task, per=per)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not settings.QUERY_PROFILING:
+            return func(*args, **kwargs)
+
+        started = time.perf_counter()
+        with count_queries() as counter:
+            result = func(*args, **kwargs)
+        logger.info(
+            "Task %s: %d queries, %.1f ms db, %.1f ms total",
+            func.__name__, counter.queries, counter.duration * 1000,
+            (time.perf_counter() - started) * 1000
+        )
+
+        units = result.get(per) if per and isinstance(result, dict) else None
+        check_budget(func.__name__, counter.queries // units if units else counter.queries)
+        return result
+
+    return wrapper
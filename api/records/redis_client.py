@@ -0,0 +1,24 @@
+"""
+Shared Redis connection for state that must be visible to every worker.
+
+Uses the same Redis instance as the Celery broker unless REDIS_URL is set.
+"""
+
+import redis
+from django.conf import settings
+
+
+_client = None
+
+
+def get_redis():
+    """Return a process-wide Redis client (connections are pooled)."""
+    global _client
+
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
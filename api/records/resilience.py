@@ -0,0 +1,314 @@
+"""
+Circuit breaker and rate limiter for the external batch API.
+
+Both keep their state in Redis, so every worker sees the same view of the
+downstream:
+
+    CLOSED    -> requests flow; failures are counted over a rolling window
+    OPEN      -> after EXTERNAL_API_BREAKER_THRESHOLD failures, every call
+                 fails fast for EXTERNAL_API_BREAKER_RESET_TIMEOUT seconds
+    HALF_OPEN -> one probe request is let through; success closes the
+                 breaker, failure opens it again
+
+The token bucket caps the request rate across all workers. A caller that
+would wait longer than EXTERNAL_API_RATE_MAX_WAIT gets RateLimited instead
+of holding a worker.
+
+If Redis is unreachable both fail open, so the API is still called.
+
+Usage:
+    from records.resilience import breaker, rate_limiter
+
+    probe = breaker.allow()
+    try:
+        rate_limiter.acquire()
+    except RateLimited:
+        if probe:
+            breaker.release_probe()
+        raise
+"""
+
+import time
+
+import redis
+from django.conf import settings
+
+from records.logger import logger
+from records.redis_client import get_redis
+
+
+class ExternalAPIUnavailable(Exception):
+    """The external API was not called; retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(ExternalAPIUnavailable):
+    """Raised while the circuit breaker is open."""
+
+
+class RateLimited(ExternalAPIUnavailable):
+    """Raised when no request token is available soon enough."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with state shared through Redis."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    FAILURES_KEY = 'records:breaker:failures'
+    # Present (with a TTL) while OPEN; TRIPPED outlives it, which is what
+    # makes the breaker HALF_OPEN once the reset timeout expires
+    OPEN_KEY = 'records:breaker:open'
+    TRIPPED_KEY = 'records:breaker:tripped'
+    PROBE_KEY = 'records:breaker:probe'
+
+    # Returns 0 if allowed, -1 if allowed as the half-open probe, otherwise
+    # milliseconds until a retry makes sense
+    ALLOW_SCRIPT = """
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then return ttl end
+    if redis.call('EXISTS', KEYS[2]) == 0 then return 0 end
+    if redis.call('SET', KEYS[3], 1, 'NX', 'PX', ARGV[1]) then return -1 end
+    return redis.call('PTTL', KEYS[3])
+    """
+
+    # Returns 1 if this failure (re)opened the breaker
+    FAILURE_SCRIPT = """
+    local tripped = redis.call('EXISTS', KEYS[2]) == 1
+    local failures = redis.call('INCR', KEYS[3])
+    if failures == 1 then redis.call('PEXPIRE', KEYS[3], ARGV[2]) end
+    if tripped or failures >= tonumber(ARGV[3]) then
+        redis.call('SET', KEYS[1], 1, 'PX', ARGV[1])
+        redis.call('SET', KEYS[2], 1)
+        redis.call('DEL', KEYS[3], KEYS[4])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._scripts = {}
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    @property
+    def enabled(self):
+        return settings.EXTERNAL_API_BREAKER_ENABLED
+
+    def _run(self, source, keys, args):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.client.register_script(source)
+        return script(keys=keys, args=args)
+
+    def _probe_timeout_ms(self):
+        timeout = settings.EXTERNAL_API_CONNECT_TIMEOUT + settings.EXTERNAL_API_READ_TIMEOUT
+        return int(timeout * 1000)
+
+    def state(self):
+        """Return the current state (CLOSED if disabled or Redis is down)."""
+        if not self.enabled:
+            return self.CLOSED
+        try:
+            pipe = self.client.pipeline()
+            pipe.exists(self.OPEN_KEY)
+            pipe.exists(self.TRIPPED_KEY)
+            is_open, tripped = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+            return self.CLOSED
+        if is_open:
+            return self.OPEN
+        return self.HALF_OPEN if tripped else self.CLOSED
+
+    def retry_after(self):
+        """Seconds until an OPEN breaker lets a probe through (0 otherwise)."""
+        if not self.enabled:
+            return 0
+        try:
+            ttl = self.client.pttl(self.OPEN_KEY)
+        except redis.RedisError:
+            return 0
+        return max(ttl, 0) / 1000
+
+    def allow(self):
+        """
+        Raise CircuitOpen unless a request may be sent now.
+
+        While HALF_OPEN only the first caller gets through as the probe;
+        the rest are rejected until it reports back.
+
+        Returns:
+            True if this caller is the probe. It must then report a success
+            or failure, or call release_probe() if no request was sent.
+        """
+        if not self.enabled:
+            return False
+        try:
+            wait_ms = self._run(
+                self.ALLOW_SCRIPT,
+                keys=[self.OPEN_KEY, self.TRIPPED_KEY, self.PROBE_KEY],
+                args=[self._probe_timeout_ms()],
+            )
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker unavailable, allowing request: %s", e)
+            return False
+        if wait_ms > 0:
+            raise CircuitOpen("External API circuit is open", retry_after=wait_ms / 1000)
+        return wait_ms < 0
+
+    def release_probe(self):
+        """Let another caller probe; for a probe that sent no request."""
+        if not self.enabled:
+            return
+        try:
+            self.client.delete(self.PROBE_KEY)
+        except redis.RedisError as e:
+            logger.warning("Could not release circuit breaker probe: %s", e)
+
+    def record_success(self):
+        """Close the breaker and reset the failure count."""
+        if not self.enabled:
+            return
+        try:
+            pipe = self.client.pipeline()
+            pipe.exists(self.TRIPPED_KEY)
+            pipe.delete(self.FAILURES_KEY, self.TRIPPED_KEY, self.PROBE_KEY, self.OPEN_KEY)
+            was_tripped, _ = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Could not record circuit breaker success: %s", e)
+            return
+        if was_tripped:
+            logger.info("External API recovered, circuit closed")
+
+    def record_failure(self):
+        """Count a failure; opens the breaker at the threshold or on a failed probe."""
+        if not self.enabled:
+            return
+        try:
+            opened = self._run(
+                self.FAILURE_SCRIPT,
+                keys=[self.OPEN_KEY, self.TRIPPED_KEY, self.FAILURES_KEY, self.PROBE_KEY],
+                args=[
+                    int(settings.EXTERNAL_API_BREAKER_RESET_TIMEOUT * 1000),
+                    int(settings.EXTERNAL_API_BREAKER_WINDOW * 1000),
+                    settings.EXTERNAL_API_BREAKER_THRESHOLD,
+                ],
+            )
+        except redis.RedisError as e:
+            logger.warning("Could not record circuit breaker failure: %s", e)
+            return
+        if opened:
+            logger.error(
+                "External API circuit opened for %ss",
+                settings.EXTERNAL_API_BREAKER_RESET_TIMEOUT
+            )
+
+    def open_for(self, seconds):
+        """Open the breaker for `seconds`, e.g. a 429's Retry-After."""
+        if not self.enabled:
+            return
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(self.OPEN_KEY, 1, px=max(1, int(seconds * 1000)))
+            pipe.set(self.TRIPPED_KEY, 1)
+            pipe.delete(self.FAILURES_KEY, self.PROBE_KEY)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Could not open circuit breaker: %s", e)
+            return
+        logger.warning("External API asked to back off, circuit opened for %.1fs", seconds)
+
+    def reset(self):
+        """Force the breaker closed."""
+        self.client.delete(self.FAILURES_KEY, self.TRIPPED_KEY, self.PROBE_KEY, self.OPEN_KEY)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter with state shared through Redis."""
+
+    KEY = 'records:rate_limit:bucket'
+
+    # Refill by elapsed time, then take `requested` tokens if available.
+    # Returns 0 on success, otherwise milliseconds until enough tokens exist.
+    ACQUIRE_SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local requested = tonumber(ARGV[4])
+
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+    local wait = 0
+    if tokens >= requested then
+        tokens = tokens - requested
+    else
+        wait = math.ceil((requested - tokens) / rate * 1000)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+    return wait
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._script = None
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    @property
+    def enabled(self):
+        return settings.EXTERNAL_API_RATE_LIMIT > 0
+
+    def _try_acquire(self, tokens):
+        if self._script is None:
+            self._script = self.client.register_script(self.ACQUIRE_SCRIPT)
+        wait_ms = self._script(
+            keys=[self.KEY],
+            args=[
+                settings.EXTERNAL_API_RATE_LIMIT,
+                settings.EXTERNAL_API_RATE_BURST,
+                time.time(),
+                tokens,
+            ],
+        )
+        return wait_ms / 1000
+
+    def acquire(self, tokens=1):
+        """
+        Take `tokens` from the bucket, sleeping briefly if needed.
+
+        Raises:
+            RateLimited: If the wait would exceed EXTERNAL_API_RATE_MAX_WAIT.
+        """
+        if not self.enabled:
+            return
+
+        deadline = time.monotonic() + settings.EXTERNAL_API_RATE_MAX_WAIT
+        while True:
+            try:
+                wait = self._try_acquire(tokens)
+            except redis.RedisError as e:
+                logger.warning("Rate limiter unavailable, allowing request: %s", e)
+                return
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimited("External API rate limit reached", retry_after=wait)
+            time.sleep(wait)
+
+
+# Default instances - import these
+breaker = CircuitBreaker()
+rate_limiter = TokenBucket()
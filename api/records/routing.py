@@ -0,0 +1,85 @@
+"""
+Celery queue routing and dispatch sharding.
+
+Tasks are split across three queues so a long dispatch backlog cannot
+delay everything else:
+
+- dispatch:      process_batch and the tasks that start it
+- maintenance:   recovery sweeps, archival and stats reconciliation
+- notifications: light, latency-sensitive tasks; the default queue, so
+                 anything not routed explicitly lands here
+
+With DISPATCH_SHARDS > 1 the dispatch queue is split into dispatch.0 ...
+dispatch.N-1. A process_batch run for shard k only claims records with
+id % N == k, so worker nodes that each consume their own shard queues
+split the backlog deterministically and never compete for the same rows.
+
+Each queue's worker concurrency and prefetch come from
+WORKER_QUEUE_OPTIONS, applied at worker start-up (see config/celery.py).
+
+Usage:
+    celery -A config worker -Q dispatch -n dispatch@%h
+    celery -A config worker -Q dispatch.0,dispatch.1 -n dispatch-a@%h
+    celery -A config worker -Q maintenance -n maintenance@%h
+    celery -A config worker -Q notifications -n notifications@%h
+"""
+
+from django.conf import settings
+
+
+DISPATCH_QUEUE = 'dispatch'
+MAINTENANCE_QUEUE = 'maintenance'
+NOTIFICATIONS_QUEUE = 'notifications'
+
+TASK_QUEUES = {
+    'records.tasks.process_batch': DISPATCH_QUEUE,
+    'records.tasks.flush_microbatch': DISPATCH_QUEUE,
+    'records.tasks.dispatch_backlog': DISPATCH_QUEUE,
+    'records.tasks.recover_batch_attempts': MAINTENANCE_QUEUE,
+    'records.tasks.archive_records': MAINTENANCE_QUEUE,
+    'records.tasks.reconcile_stats': MAINTENANCE_QUEUE,
+}
+
+
+def shards():
+    """Shard numbers to dispatch to; [None] when sharding is off."""
+    if settings.DISPATCH_SHARDS > 1:
+        return list(range(settings.DISPATCH_SHARDS))
+    return [None]
+
+
+def shard_queue(shard):
+    if shard is None:
+        return DISPATCH_QUEUE
+    return f"{DISPATCH_QUEUE}.{shard}"
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router (task_routes): queue by task name, dispatch by shard."""
+    queue = TASK_QUEUES.get(name)
+    if queue is None:
+        return None
+    if name == 'records.tasks.process_batch':
+        return {'queue': shard_queue((kwargs or {}).get('shard'))}
+    return {'queue': queue}
+
+
+def worker_options(queues):
+    """
+    Concurrency and prefetch multiplier for a worker consuming `queues`
+    (shard queues count as dispatch), or None if none is configured.
+
+    A worker on several queues gets the most conservative settings of
+    them, so a dispatch worker is never configured for a light queue.
+    """
+    options = [
+        settings.WORKER_QUEUE_OPTIONS[queue.split('.')[0]]
+        for queue in queues
+        if queue.split('.')[0] in settings.WORKER_QUEUE_OPTIONS
+    ]
+    if not options:
+        return None
+    return {
+        'concurrency': min(o['concurrency'] for o in options),
+        'prefetch_multiplier': min(o['prefetch_multiplier'] for o in options),
+    }
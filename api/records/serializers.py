@@ -1,15 +1,24 @@
-import re
-from datetime import date
+import json
 
+from django.utils import timezone
 from rest_framework import serializers
 
+from records import validators
 from records.models import Record
 from records.logger import logger
 
+# Optional fast JSON encoder, otherwise fall back to the stdlib
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 
 class RecordSerializer(serializers.ModelSerializer):
     """
     Serializer for Record model with comprehensive server-side validation.
+    Field rules live in records.validators.
     """
     
     class Meta:
@@ -18,77 +27,25 @@ class RecordSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'status', 'created_at', 'updated_at']
     
     def validate_name(self, value):
-        """Validate name is not empty and has reasonable length."""
-        value = value.strip()
-        if not value:
-            raise serializers.ValidationError("Name cannot be empty.")
-        if len(value) < 2:
-            raise serializers.ValidationError("Name must be at least 2 characters long.")
-        if len(value) > 255:
-            raise serializers.ValidationError("Name cannot exceed 255 characters.")
-        return value
-    
+        return validators.validate_name(value)
+
     def validate_email(self, value):
-        """Validate email format."""
-        value = value.strip().lower()
-        # Basic email regex pattern
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, value):
-            raise serializers.ValidationError("Invalid email format.")
-        return value
-    
+        return validators.validate_email(value)
+
     def validate_phone_number(self, value):
-        """
-        Validate phone number in international format.
-        Format: +[country_code][number] (E.164 format)
-        Examples: +919876543210, +14155552671
-        """
-        value = value.strip()
-        # E.164 format: + followed by 1-15 digits
-        phone_pattern = r'^\+[1-9]\d{1,14}$'
-        if not re.match(phone_pattern, value):
-            raise serializers.ValidationError(
-                "Phone number must be in international format (e.g., +919876543210)."
-            )
-        return value
-    
+        return validators.validate_phone_number(value)
+
     def validate_link(self, value):
-        """
-        Validate optional URL field.
-        Must be a valid URL if provided.
-        """
-        if not value:
-            return None
-        
-        value = value.strip()
-        # Basic URL pattern for portfolio/GitHub/LinkedIn
-        url_pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-        if not re.match(url_pattern, value, re.IGNORECASE):
-            raise serializers.ValidationError("Invalid URL format. Must start with http:// or https://")
-        return value
-    
+        return validators.validate_link(value)
+
     def validate_dob(self, value):
-        """
-        Validate optional date of birth.
-        Must be a valid date in the past if provided.
-        """
-        if not value:
-            return None
-        
-        if value > date.today():
-            raise serializers.ValidationError("Date of birth cannot be in the future.")
-        
-        # Reasonable age check (max 150 years old)
-        min_date = date(date.today().year - 150, 1, 1)
-        if value < min_date:
-            raise serializers.ValidationError("Invalid date of birth.")
-        
-        return value
+        # Bulk callers pass `today` in the context so it is computed once
+        return validators.validate_dob(value, today=self.context.get('today'))
     
     def create(self, validated_data):
         """Create record and log the action."""
         record = super().create(validated_data)
-        logger.info(f"Record created via API: ID={record.id}, Email={record.email}")
+        logger.info("Record created via API: ID=%s, Email=%s", record.id, record.email)
         return record
 
 
@@ -109,3 +66,54 @@ class RecordListSerializer(serializers.ModelSerializer):
         if obj.dob:
             return obj.dob.strftime('%d/%m/%Y')
         return None
+
+
+# Columns for the fast list path, in RecordListSerializer field order
+LIST_FIELDS = ('id', 'name', 'email', 'phone_number', 'link', 'dob', 'status', 'created_at')
+
+
+def _format_datetime(value, tz):
+    """Match DRF DateTimeField: ISO 8601 in the current timezone, UTC as 'Z'."""
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def fast_list_rows(rows):
+    """
+    Convert `.values_list(*LIST_FIELDS)` tuples into RecordListSerializer
+    output without per-row field machinery.
+
+    Dates repeat heavily across rows, so each distinct DOB is formatted once.
+    """
+    tz = timezone.get_current_timezone()
+    dob_cache = {None: None}
+    data = []
+    for pk, name, email, phone_number, link, dob, status, created_at in rows:
+        if dob not in dob_cache:
+            dob_cache[dob] = dob.strftime('%d/%m/%Y')
+        data.append({
+            'id': pk,
+            'name': name,
+            'email': email,
+            'phone_number': phone_number,
+            'link': link,
+            'dob': dob_cache[dob],
+            'status': status,
+            'created_at': _format_datetime(created_at, tz),
+        })
+    return data
+
+
+def render_json(data):
+    """
+    Encode to the same bytes DRF's JSONRenderer produces (compact, UTF-8,
+    U+2028/U+2029 escaped), using orjson when it is installed.
+    """
+    if HAS_ORJSON:
+        body = orjson.dumps(data)
+        return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
@@ -0,0 +1,158 @@
+"""
+Materialized record counters.
+
+Per-status totals live in one Redis hash and are adjusted by the code that
+changes statuses (record creation, claim, release and apply in
+records.batch), so reading them never scans the records table. Adjustments
+run on commit, after the rows are visible, and a rolled-back transaction
+adjusts nothing.
+
+Each hour also gets a hash of throughput events (created, success, failed,
+dead), kept for STATS_HOURLY_RETENTION_HOURS.
+
+Counters can drift: a process may die between commit and the Redis write,
+Redis may be briefly down, or a status may be edited in the admin. The
+reconcile_stats task recounts the totals from the database every 15
+minutes. Archived records stay counted as SUCCESS.
+
+Usage:
+    from records import stats
+
+    stats.adjust({'IN_PROGRESS': -n, 'SUCCESS': n}, success=n)
+"""
+
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from records.logger import logger
+from records.redis_client import get_redis
+
+
+TOTALS_KEY = 'records:stats:totals'
+# Set by reconcile; totals without it only hold increments since a flush
+RECONCILED_FIELD = 'reconciled_at'
+HOUR_KEY_PREFIX = 'records:stats:hour:'
+EVENTS = ('created', 'success', 'failed', 'dead')
+
+
+def _hour_key(hour):
+    return HOUR_KEY_PREFIX + hour.strftime('%Y%m%d%H')
+
+
+def _write(changes, events):
+    try:
+        pipe = get_redis().pipeline()
+        for status, delta in changes.items():
+            if delta:
+                pipe.hincrby(TOTALS_KEY, status, delta)
+        if any(events.values()):
+            key = _hour_key(timezone.now())
+            for event, count in events.items():
+                if count:
+                    pipe.hincrby(key, event, count)
+            pipe.expire(key, settings.STATS_HOURLY_RETENTION_HOURS * 3600)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Record stats update dropped, reconciliation will fix: %s", e)
+
+
+def adjust(changes, **events):
+    """
+    Apply status deltas ({status: delta}) and count throughput events
+    (created=, success=, failed=, dead=) once the current transaction
+    commits.
+    """
+    if not settings.STATS_ENABLED:
+        return
+    transaction.on_commit(lambda: _write(changes, events))
+
+
+def created(count=1):
+    """Count `count` new PENDING records."""
+    adjust({'PENDING': count}, created=count)
+
+
+def database_totals():
+    """Per-status totals counted from the database (archived as SUCCESS)."""
+    # Import here to avoid circular imports
+    from records.models import ArchivedRecord, Record
+
+    counts = dict(
+        Record.objects.values_list('status').annotate(total=Count('id')).order_by()
+    )
+    totals = {status: counts.get(status, 0) for status in Record.Status.values}
+    totals[Record.Status.SUCCESS] += ArchivedRecord.objects.count()
+    return totals
+
+
+def get_totals():
+    """
+    Per-status totals from the counters, or None if Redis is unavailable
+    or the counters have not been reconciled since it was last flushed.
+    """
+    from records.models import Record
+
+    try:
+        raw = get_redis().hgetall(TOTALS_KEY)
+    except redis.RedisError as e:
+        logger.warning("Record stats unavailable: %s", e)
+        return None
+    counts = {key.decode(): value for key, value in raw.items()}
+    if RECONCILED_FIELD not in counts:
+        return None
+    return {status: int(counts.get(status, 0)) for status in Record.Status.values}
+
+
+def get_hourly(hours):
+    """Throughput events for the last `hours` hours, oldest first."""
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    window = [now - timedelta(hours=n) for n in reversed(range(hours))]
+    try:
+        pipe = get_redis().pipeline()
+        for hour in window:
+            pipe.hgetall(_hour_key(hour))
+        results = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Hourly record stats unavailable: %s", e)
+        return []
+
+    hourly = []
+    for hour, raw in zip(window, results):
+        counts = {key.decode(): int(value) for key, value in raw.items()}
+        hourly.append({'hour': hour, **{event: counts.get(event, 0) for event in EVENTS}})
+    return hourly
+
+
+def reconcile():
+    """
+    Reset the totals to a fresh database count.
+
+    Returns:
+        Dict of {status: counter - actual} for every status that had
+        drifted (empty if none, or if Redis is down).
+    """
+    actual = database_totals()
+    counted = get_totals()
+    try:
+        get_redis().hset(
+            TOTALS_KEY, mapping={**actual, RECONCILED_FIELD: timezone.now().isoformat()}
+        )
+    except redis.RedisError as e:
+        logger.warning("Record stats reconciliation skipped: %s", e)
+        return {}
+
+    drift = {}
+    if counted is not None:
+        drift = {
+            status: counted[status] - total
+            for status, total in actual.items()
+            if counted[status] != total
+        }
+    if drift:
+        logger.warning("Record stats drifted, reset from database: %s", drift)
+    return drift
@@ -2,102 +2,234 @@
 Celery tasks for batch processing records.
 """
 
+import time
+
 import requests
 
 from celery import shared_task
+from django.conf import settings
 
+from records import metrics
 from records.logger import logger
+from records.profiling import profile_task
+
+
+def start_batch_workers(per_shard=1):
+    """
+    Queue `per_shard` process_batch runs for every dispatch shard (a
+    single unsharded run set when DISPATCH_SHARDS is 1).
 
+    Returns:
+        Number of runs queued.
+    """
+    from records.routing import shards
+
+    started = 0
+    for shard in shards():
+        for _ in range(per_shard):
+            process_batch.delay(shard=shard)
+            started += 1
+    return started
 
-EXTERNAL_API_URL = 'https://dev.micro.mgsigma.net/batch/process'
-BATCH_SIZE = 10
+
+@shared_task
+def dispatch_backlog():
+    """
+    Fan out BATCH_CONCURRENCY process_batch workers per dispatch shard.
+
+    Runs every 2 hours via Celery Beat as a safety-net sweep; new records
+    are normally dispatched within seconds by records.microbatch. Each
+    worker claims its own batches, so they drain the backlog concurrently
+    without overlapping.
+    """
+    workers = start_batch_workers(settings.BATCH_CONCURRENCY)
+    logger.info("Dispatched %d batch workers", workers)
+    return {'workers': workers}
+
+
+@shared_task
+def flush_microbatch(token=None):
+    """
+    Time-based flush of a micro-batch window (see records.microbatch).
+
+    Scheduled MICROBATCH_MAX_WAIT_MS after the first record of a window.
+    Does nothing if the window was already flushed by size and a newer one
+    has opened since; that window's own timer flushes it.
+    """
+    from records.microbatch import reset
+
+    if reset(token):
+        start_batch_workers()
 
 
 @shared_task(bind=True, max_retries=3)
-def process_batch(self):
+@profile_task(per='batches')
+def process_batch(self, shard=None):
     """
-    Fetch up to 10 PENDING/FAILED records and send to external API.
-    Update status based on response.
-    
-    Runs every 2 hours via Celery Beat.
+    Claim a batch of PENDING/FAILED records and send to external API.
+    Update status based on response. With a `shard`, only that dispatch
+    shard's records are claimed (see records.routing).
+
+    With BATCH_DRAIN enabled, keeps claiming batches until the queue is
+    empty or BATCH_MAX_BATCHES_PER_RUN is reached. Failed records back off
+    (next_attempt_at), so a run does not keep re-sending them. With
+    BATCH_FANOUT > 1, each round claims that many batches and posts them
+    concurrently. The batch size comes from the adaptive controller when
+    BATCH_ADAPTIVE is on, otherwise BATCH_SIZE.
     """
     # Import here to avoid circular imports
-    from records.models import Record
+    from records.adaptive import batch_size_controller
+    from records.batch import claim_batch
+    from records.outbox import recover_attempts
+    from records.resilience import breaker
+
     logger.info("Starting batch processing task")
-    print("jj")
-    
-    # Fetch records that need processing (PENDING or FAILED)
-    records = Record.objects.filter(
-        status__in=[Record.Status.PENDING, Record.Status.FAILED]
-    ).order_by('created_at')[:BATCH_SIZE]
-    
-    if not records:
+
+    # Finish batches a crashed worker left half-applied before claiming more
+    recover_attempts()
+
+    totals = {'batches': 0, 'processed': 0, 'success': 0, 'failed': 0, 'dead': 0}
+
+    while totals['batches'] < settings.BATCH_MAX_BATCHES_PER_RUN:
+        # Don't claim work the downstream cannot take; the next run resumes
+        if breaker.state() == breaker.OPEN:
+            logger.warning("External API circuit is open, stopping batch run")
+            break
+
+        batch_size = batch_size_controller.current()
+        with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='claim'):
+            records = claim_batch(batch_size * settings.BATCH_FANOUT, shard=shard)
+        if not records:
+            break
+
+        if settings.BATCH_FANOUT > 1:
+            result = _process_fanout(self, records, batch_size)
+        else:
+            result = _process_claimed(self, records)
+        for key in totals:
+            totals[key] += result[key]
+
+        if not settings.BATCH_DRAIN:
+            break
+
+    if not totals['batches']:
         logger.info("No records to process")
         return {'processed': 0, 'message': 'No records to process'}
-    
-    logger.info(f"Found {len(records)} records to process")
-    
-    # Prepare batch payload
-    payload = []
-    for record in records:
-        record_data = {
-            'id': record.id,
-            'name': record.name,
-            'email': record.email,
-            'phoneNumber': record.phone_number,
-            'link': record.link or '',
-            'dob': record.dob.strftime('%d/%m/%Y') if record.dob else ''
-        }
-        payload.append(record_data)
-    
-    logger.debug(f"Sending payload: {payload}")
-    
+
+    metrics.count_processed(totals)
+    logger.info("Batch processing finished: %s", totals)
+    return totals
+
+
+@shared_task
+def recover_batch_attempts():
+    """
+    Apply stored responses of batches whose worker crashed mid-apply.
+
+    Runs every 5 minutes via Celery Beat, ahead of BATCH_CLAIM_TIMEOUT, so
+    such records are finished from the outbox instead of being re-sent.
+    """
+    from records.outbox import recover_attempts
+
+    return recover_attempts()
+
+
+@shared_task
+def reconcile_stats():
+    """
+    Reset the record counters from a database count (see records.stats).
+
+    Runs every 15 minutes via Celery Beat.
+    """
+    from records.stats import reconcile
+
+    return {'drift': reconcile()}
+
+
+@shared_task
+def archive_records():
+    """
+    Move old SUCCESS records to the archive table (see records.archive).
+
+    Runs daily via Celery Beat.
+    """
+    from records.archive import archive_records as archive
+
+    return {'archived': archive()}
+
+
+def _process_claimed(task, records):
+    """Send one claimed batch to the external API and apply the results."""
+    from records.adaptive import batch_size_controller
+    from records.batch import build_payload
+    from records.client import UnusableResponse, post_batch
+    from records.outbox import (
+        apply_attempt, mark_failed, mark_responded, mark_unusable, open_attempt,
+    )
+    from records.resilience import ExternalAPIUnavailable
+
+    logger.info("Claimed %d records to process", len(records))
+
+    with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='build'):
+        payload = build_payload(records)
+        attempt = open_attempt(records, payload)
+    logger.debug("Sending payload: %s", payload)
+
+    sent_at = time.monotonic()
     try:
-        # Send to external API
-        response = requests.post(
-            EXTERNAL_API_URL,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
-        response.raise_for_status()
-        
-        # Process response
-        results = response.json()
-        logger.info(f"Received response: {results}")
-        
-        # Update record statuses based on response
-        success_count = 0
-        failed_count = 0
-        
-        for result in results:
-            record_id = result.get('id')
-            status = result.get('status')
-            
-            try:
-                record = Record.objects.get(id=record_id)
-                if status == 'SUCCESS':
-                    record.status = Record.Status.SUCCESS
-                    success_count += 1
-                    logger.info(f"Record {record_id} marked as SUCCESS")
-                else:
-                    record.status = Record.Status.FAILED
-                    failed_count += 1
-                    logger.warning(f"Record {record_id} marked as FAILED")
-                record.save()
-            except Record.DoesNotExist:
-                logger.error(f"Record {record_id} not found in database")
-        
-        return {
-            'processed': len(results),
-            'success': success_count,
-            'failed': failed_count
-        }
-        
+        # Send to external API over the pooled session
+        with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='send'):
+            results = post_batch(payload, idempotency_key=attempt.payload_hash)
+    except ExternalAPIUnavailable as e:
+        # Nothing was sent: hand the batch back and free the worker
+        logger.warning("%s, retrying in %.1fs", e, e.retry_after)
+        mark_failed(attempt, e)
+        raise task.retry(exc=e, countdown=e.retry_after)
+    except UnusableResponse as e:
+        # Delivered, so never released for an immediate re-send
+        logger.error("%s", e)
+        batch_size_controller.observe(len(records), time.monotonic() - sent_at, ok=False)
+        result = mark_unusable(attempt, e) or {'processed': 0, 'success': 0, 'failed': 0, 'dead': 0}
+        return {'batches': 1, **result}
     except requests.exceptions.RequestException as e:
-        logger.error(f"External API request failed: {str(e)}")
+        logger.error("External API request failed: %s", e)
+        batch_size_controller.observe(len(records), time.monotonic() - sent_at, ok=False)
+        mark_failed(attempt, e)
         # Retry the task
-        raise self.retry(exc=e, countdown=60)
+        raise task.retry(exc=e, countdown=60)
     except Exception as e:
-        logger.error(f"Batch processing error: {str(e)}")
+        logger.error("Batch processing error: %s", e)
+        mark_failed(attempt, e)
         raise
+
+    batch_size_controller.observe(len(records), time.monotonic() - sent_at)
+    logger.info("Received %d results", len(results))
+    logger.debug("Received response: %s", results)
+
+    # Once the response is stored, a crash below is recovered by applying
+    # it later rather than re-sending the batch
+    with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='apply'):
+        mark_responded(attempt, results)
+        result = apply_attempt(attempt.pk) or {'processed': 0, 'success': 0, 'failed': 0, 'dead': 0}
+    return {'batches': 1, **result}
+
+
+def _process_fanout(task, records, batch_size):
+    """Split a claimed round into sub-batches and post them concurrently."""
+    from records.dispatcher import dispatch_batches, split_batches
+    from records.resilience import ExternalAPIUnavailable
+
+    logger.info("Claimed %d records to fan out", len(records))
+
+    totals = dispatch_batches(split_batches(records, batch_size))
+    errors = totals.pop('errors')
+
+    # Only retry when nothing got through; partial failures were released
+    # and will be picked up by the next run
+    if errors and not totals['batches']:
+        logger.error("All %d sub-batches failed", len(errors))
+        error = errors[-1]
+        countdown = error.retry_after if isinstance(error, ExternalAPIUnavailable) else 60
+        raise task.retry(exc=error, countdown=countdown)
+
+    return totals
@@ -0,0 +1,119 @@
+"""
+Local stand-in for the external batch API, for tests and benchmarks.
+
+Usage:
+    from records.testing import FakeBatchAPI
+
+    with FakeBatchAPI(latency=0.05) as api:
+        with override_settings(EXTERNAL_API_URL=api.url):
+            process_batch.apply()
+        print(api.requests, api.connections)
+"""
+
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _BatchHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a status for each record in the payload."""
+
+    # Keep-alive, so pooled clients can reuse connections
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY a
+    # reused connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake_api._count('connections')
+
+    def do_POST(self):
+        fake_api = self.server.fake_api
+        fake_api._count('requests')
+
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        payload = json.loads(body)
+
+        if fake_api.latency:
+            time.sleep(fake_api.latency)
+
+        if fake_api.body is not None:
+            response = fake_api.body
+        elif fake_api.status_code >= 400:
+            response = json.dumps({'message': 'error'}).encode('utf-8')
+        else:
+            response = json.dumps([
+                {'id': item['id'], 'status': fake_api.outcome(item)}
+                for item in payload
+            ]).encode('utf-8')
+
+        self.send_response(fake_api.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        for name, value in fake_api.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        # Keep test output quiet
+        pass
+
+
+class FakeBatchAPI:
+    """
+    Threaded HTTP server mimicking POST /batch/process.
+
+    Args:
+        latency: Seconds to sleep before answering each request
+        status_code: HTTP status to answer with (>= 400 simulates an outage)
+        outcome: Callable(item) -> 'SUCCESS' | 'FAILED' (default: all SUCCESS)
+        body: Raw response bytes to answer with instead of the results
+        headers: Extra response headers, e.g. {'Retry-After': '5'}
+    """
+
+    def __init__(self, latency=0.0, status_code=200, outcome=None, body=None, headers=None):
+        self.latency = latency
+        self.status_code = status_code
+        self.outcome = outcome or (lambda item: 'SUCCESS')
+        self.body = body
+        self.headers = headers or {}
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/batch/process"
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _BatchHandler)
+        self._server.daemon_threads = True
+        self._server.fake_api = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
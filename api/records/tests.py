@@ -1,3 +1,1408 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+import redis
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.utils import timezone
+from kombu.exceptions import OperationalError as KombuOperationalError
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+# Optional: Redis-backed tests run against an in-process fake
+try:
+    import fakeredis
+    HAS_FAKEREDIS = True
+except ImportError:
+    HAS_FAKEREDIS = False
+
+from records import benchmarks
+from records.adaptive import AdaptiveBatchSize
+from records import metrics, microbatch
+from records.archive import archive_records
+from records.batch import apply_results, build_payload, claim_batch
+from records import client as record_client
+from records import dispatcher as record_dispatcher
+from records.client import build_session
+from records.dedup import create_unique, split_duplicates
+from records import serializers as record_serializers
+from records import stats as record_stats
+from records.profiling import QueryBudgetExceeded
+from records.resilience import CircuitBreaker, CircuitOpen, RateLimited, TokenBucket
+from records.routing import route_task
+from records import tasks as record_tasks
+from records.tasks import process_batch
+from records import validators
+from records.logger import DailyFileHandler, logger
+from records.models import ArchivedRecord, BatchAttempt, Record
+from records.outbox import apply_attempt, mark_responded, open_attempt, recover_attempts
+from records.testing import FakeBatchAPI
+
+
+SAMPLES = [
+    {'email': ' Alice@Example.COM ', 'phone_number': '+919876543210',
+     'link': 'https://github.com/alice', 'dob': date(1990, 5, 17)},
+    {'email': 'not-an-email', 'phone_number': '9876543210',
+     'link': 'ftp://example.com', 'dob': date(2999, 1, 1)},
+    {'email': 'carl@example.io', 'phone_number': '+14155552671',
+     'link': '', 'dob': date(1800, 1, 1)},
+]
+
+
+# The per-call re.match / date.today() implementations validators replaced
+
+def legacy_validate_email(value):
+    value = value.strip().lower()
+    if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', value):
+        raise serializers.ValidationError("Invalid email format.")
+    return value
+
+
+def legacy_validate_phone_number(value):
+    value = value.strip()
+    if not re.match(r'^\+[1-9]\d{1,14}$', value):
+        raise serializers.ValidationError("Invalid phone number.")
+    return value
+
+
+def legacy_validate_link(value):
+    if not value:
+        return None
+    value = value.strip()
+    if not re.match(r'^https?://[^\s/$.?#].[^\s]*$', value, re.IGNORECASE):
+        raise serializers.ValidationError("Invalid URL format.")
+    return value
+
+
+def legacy_validate_dob(value):
+    if not value:
+        return None
+    if value > date.today():
+        raise serializers.ValidationError("Date of birth cannot be in the future.")
+    if value < date(date.today().year - 150, 1, 1):
+        raise serializers.ValidationError("Invalid date of birth.")
+    return value
+
+
+LEGACY = {
+    'email': legacy_validate_email,
+    'phone_number': legacy_validate_phone_number,
+    'link': legacy_validate_link,
+    'dob': legacy_validate_dob,
+}
+
+CURRENT = {
+    'email': validators.validate_email,
+    'phone_number': validators.validate_phone_number,
+    'link': validators.validate_link,
+    'dob': validators.validate_dob,
+}
+
+
+def run_validators(funcs, sample):
+    """Return (field, cleaned value or None if rejected) for each field."""
+    results = []
+    for field, func in funcs.items():
+        try:
+            results.append((field, func(sample[field])))
+        except serializers.ValidationError:
+            results.append((field, None))
+    return results
+
+
+class ValidatorsTests(SimpleTestCase):
+
+    def test_matches_legacy_behaviour(self):
+        for sample in SAMPLES:
+            self.assertEqual(run_validators(CURRENT, sample), run_validators(LEGACY, sample))
+
+    def test_normalizes_values(self):
+        self.assertEqual(validators.validate_name('  Alice Smith '), 'Alice Smith')
+        self.assertEqual(validators.validate_email(' Alice@Example.COM '), 'alice@example.com')
+        self.assertIsNone(validators.validate_link(''))
+
+    def test_validations_per_second(self):
+        """Micro-benchmark: prints validations/sec before and after."""
+        iterations = 20000
+
+        for label, funcs in (('legacy', LEGACY), ('precompiled', CURRENT)):
+            started = time.perf_counter()
+            for i in range(iterations):
+                run_validators(funcs, SAMPLES[i % len(SAMPLES)])
+            rate = iterations * len(funcs) / (time.perf_counter() - started)
+            print(f"\n{label}: {rate:,.0f} validations/sec")
+
+
+class FastListSerializationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ['Alice', 'Zoë Ünicode', 'Line\u2028Separator', 'Quote "Q" \\ Back']
+        Record.objects.bulk_create([
+            Record(
+                name=names[i % len(names)],
+                email=f"user{i}@example.com",
+                phone_number=f"+9198765{i:05d}",
+                link='https://github.com/user' if i % 3 else None,
+                dob=date(1980 + i % 30, 1 + i % 12, 1 + i % 28) if i % 5 else None,
+                status=Record.Status.SUCCESS,
+            )
+            for i in range(2000)
+        ])
+
+    def render_drf(self, queryset):
+        return JSONRenderer().render(record_serializers.RecordListSerializer(queryset, many=True).data)
+
+    def render_fast(self, queryset):
+        rows = queryset.values_list(*record_serializers.LIST_FIELDS)
+        return record_serializers.render_json(record_serializers.fast_list_rows(rows))
+
+    def test_output_is_byte_identical(self):
+        queryset = Record.objects.order_by('-created_at', '-id')
+        self.assertEqual(self.render_fast(queryset), self.render_drf(queryset))
+
+    def test_stdlib_fallback_is_byte_identical(self):
+        queryset = Record.objects.order_by('-created_at', '-id')[:200]
+        with mock.patch.object(record_serializers, 'HAS_ORJSON', False):
+            self.assertEqual(self.render_fast(queryset), self.render_drf(queryset))
+
+    def test_rows_per_second(self):
+        """Benchmark: prints rows/sec for the DRF and fast paths."""
+        queryset = Record.objects.order_by('-created_at', '-id')
+        rows = queryset.count()
+
+        for label, render in (('drf', self.render_drf), ('fast', self.render_fast)):
+            started = time.perf_counter()
+            for _ in range(3):
+                render(queryset)
+            rate = 3 * rows / (time.perf_counter() - started)
+            print(f"\n{label} list serialization: {rate:,.0f} rows/sec")
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    BATCH_ADAPTIVE=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class BenchmarkSuiteTests(TransactionTestCase):
+    """
+    Runs the `manage.py bench` suite at small volumes so it keeps working.
+
+    process_batch commits in its own transactions, hence TransactionTestCase.
+    """
+
+    def test_create(self):
+        result = benchmarks.bench_create(requests=20)
+        print(f"\ncreate: {result}")
+        self.assertEqual(Record.objects.count(), 20)
+        self.assertGreater(result['requests_per_s'], 0)
+
+    def test_create_rerun(self):
+        # A second run against the same table must not hit duplicate detection
+        benchmarks.bench_create(requests=5)
+        benchmarks.bench_create(requests=5)
+        self.assertEqual(Record.objects.count(), 10)
+
+    def test_seed_spreads_created_at(self):
+        benchmarks.seed_records(200, chunk_size=75)
+        created = Record.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        self.assertGreater(created['last'] - created['first'], timedelta(days=7))
+        self.assertEqual(Record.objects.count(), 200)
+
+    def test_list(self):
+        benchmarks.seed_records(600, status=Record.Status.SUCCESS)
+        result = benchmarks.bench_list(repeats=3, page_size=50, pages=5)
+        print(f"\nlist: {result}")
+        self.assertEqual(result['success_rows'], 600)
+        self.assertIn('page_6', result)
+
+    def test_drain(self):
+        result = benchmarks.bench_drain(200, batch_size=20)
+        print(f"\ndrain: {result}")
+        self.assertEqual(result['success'], 200)
+        self.assertEqual(result['batches'], 10)
+        self.assertFalse(Record.objects.exclude(status=Record.Status.SUCCESS).exists())
+
+
+@override_settings(
+    QUERY_PROFILING=True,
+    QUERY_BUDGET_STRICT=True,
+    MICROBATCH_ENABLED=False,
+    BATCH_ADAPTIVE=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class QueryBudgetTests(TransactionTestCase):
+    """Hot paths must stay within settings.QUERY_BUDGETS."""
+
+    def setUp(self):
+        self.client = Client(SERVER_NAME='localhost')
+
+    def test_create(self):
+        response = self.client.post(
+            '/api/records/',
+            {'name': 'Alice', 'email': 'alice@example.com', 'phone_number': '+919876543210'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_bulk_create(self):
+        items = [
+            {'name': f'User {i}', 'email': f'user{i}@example.com', 'phone_number': '+919876543210'}
+            for i in range(100)
+        ]
+        response = self.client.post('/api/records/bulk/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_success_list(self):
+        benchmarks.seed_records(120, status=Record.Status.SUCCESS)
+        cursor = ''
+        for _ in range(3):
+            response = self.client.get(f'/api/records/success/?cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            cursor = response.json()['next_cursor']
+
+    def test_process_batch(self):
+        # Budget is per batch, so a longer drain must not use more per batch
+        benchmarks.bench_drain(100, batch_size=10)
+
+    def test_over_budget_raises(self):
+        with override_settings(QUERY_BUDGETS={'records-success': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/records/success/')
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class DuplicateSubmissionTests(TestCase):
+    """Repeated submissions must not create extra records."""
+
+    ITEM = {'name': 'Alice  Smith', 'email': 'alice@example.com', 'phone_number': '+919876543210'}
+
+    def setUp(self):
+        self.client = Client(SERVER_NAME='localhost')
+
+    def post(self, data, **extra):
+        return self.client.post('/api/records/', data, content_type='application/json', **extra)
+
+    def test_same_content_returns_existing_record(self):
+        first = self.post(self.ITEM)
+        second = self.post({**self.ITEM, 'name': 'alice smith', 'email': 'ALICE@example.com '})
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['data']['id'], first.json()['data']['id'])
+        self.assertEqual(Record.objects.count(), 1)
+
+    def test_idempotency_key_replays_response(self):
+        first = self.post(self.ITEM, HTTP_IDEMPOTENCY_KEY='submit-1')
+        second = self.post(self.ITEM, HTTP_IDEMPOTENCY_KEY='submit-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+
+    def test_bulk_reports_duplicates(self):
+        existing = self.post(self.ITEM).json()['data']['id']
+        other = {**self.ITEM, 'email': 'bob@example.com'}
+        response = self.client.post(
+            '/api/records/bulk/', [self.ITEM, other, other], content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['created_ids']), 1)
+        self.assertEqual(
+            response.json()['duplicates'], [{'index': 0, 'id': existing}, {'index': 2, 'id': None}]
+        )
+
+
+class ExportTests(TestCase):
+    """Exports stream every matching row and respect the filters."""
+
+    def setUp(self):
+        benchmarks.seed_records(250)
+        self.client = Client(SERVER_NAME='localhost')
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+    def export(self, query):
+        with override_settings(EXPORT_CHUNK_SIZE=40):
+            response = self.client.get(f'/api/records/export/?{query}')
+            return response, b''.join(response.streaming_content)
+
+    def test_csv_by_status(self):
+        response, body = self.export('status=SUCCESS,FAILED')
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+        expected = Record.objects.filter(status__in=['SUCCESS', 'FAILED'])
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(sorted(int(row['id']) for row in rows), sorted(expected.values_list('id', flat=True)))
+
+    def test_ndjson_date_range(self):
+        _, body = self.export('output=ndjson&until=2000-01-01')
+        self.assertEqual(body, b'')
+        _, body = self.export('output=ndjson&since=2000-01-01')
+        self.assertEqual(len(body.splitlines()), 250)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/records/export/').status_code, 403)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ArchiveTests(TestCase):
+    """Archival moves old SUCCESS rows without changing the merged list."""
+
+    def setUp(self):
+        benchmarks.seed_records(300)
+        self.client = Client(SERVER_NAME='localhost')
+        ids = list(Record.objects.order_by('id').values_list('id', flat=True)[:150])
+        Record.objects.filter(id__in=ids).update(created_at=timezone.now() - timedelta(days=365))
+
+    def walk(self, query=''):
+        data, cursor = [], ''
+        while True:
+            body = self.client.get(f'/api/records/success/?page_size=40&cursor={cursor}{query}').json()
+            data += body['data']
+            cursor = body['next_cursor']
+            if not cursor:
+                return data
+
+    def test_archive_and_merged_list(self):
+        before = self.walk()
+        expected = Record.objects.filter(
+            status=Record.Status.SUCCESS, created_at__lt=timezone.now() - timedelta(days=90)
+        ).count()
+
+        with override_settings(ARCHIVE_RETENTION_DAYS=90, ARCHIVE_CHUNK_SIZE=25):
+            self.assertEqual(archive_records(), expected)
+
+        self.assertEqual(ArchivedRecord.objects.count(), expected)
+        self.assertFalse(Record.objects.filter(id__in=ArchivedRecord.objects.values('id')).exists())
+        self.assertEqual(len(self.walk()), len(before) - expected)
+        self.assertEqual(self.walk('&include_archived=1'), before)
+
+    @override_settings(MICROBATCH_ENABLED=False)
+    def test_archived_content_is_still_a_duplicate(self):
+        body = {'name': 'Old Timer', 'email': 'old@example.com', 'phone_number': '+919800000001'}
+        created = self.client.post('/api/records/', body, content_type='application/json').json()
+        Record.objects.filter(id=created['data']['id']).update(
+            status=Record.Status.SUCCESS, created_at=timezone.now() - timedelta(days=365)
+        )
+        archive_records(before=timezone.now() - timedelta(days=90))
+        self.assertTrue(ArchivedRecord.objects.filter(id=created['data']['id']).exists())
+
+        response = self.client.post('/api/records/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['id'], created['data']['id'])
+
+        response = self.client.post('/api/records/bulk/', [body], content_type='application/json')
+        self.assertEqual(response.json()['duplicates'], [{'index': 0, 'id': created['data']['id']}])
+
+    def test_export_include_archived(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        success = Record.objects.filter(status=Record.Status.SUCCESS).count()
+        archive_records(before=timezone.now() - timedelta(days=90))
+
+        def exported(query):
+            response = self.client.get(f'/api/records/export/?output=ndjson&status=SUCCESS{query}')
+            return len(b''.join(response.streaming_content).splitlines())
+
+        self.assertLess(exported(''), success)
+        self.assertEqual(exported('&include_archived=1'), success)
+
+
+@override_settings(MICROBATCH_ENABLED=False)
+class RecordStatsTests(TestCase):
+    """Stats endpoint totals must match the database."""
+
+    def setUp(self):
+        benchmarks.seed_records(200)
+        self.client = Client(SERVER_NAME='localhost')
+
+    def test_database_fallback(self):
+        with mock.patch.object(record_stats, 'get_totals', return_value=None):
+            body = self.client.get('/api/records/stats/').json()
+        self.assertEqual(body['source'], 'database')
+        self.assertEqual(body['total'], 200)
+        self.assertEqual(
+            body['totals']['SUCCESS'], Record.objects.filter(status=Record.Status.SUCCESS).count()
+        )
+
+    def test_adjust_waits_for_commit(self):
+        with mock.patch.object(record_stats, '_write') as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                record_stats.created(3)
+                write.assert_not_called()
+        write.assert_called_once_with({'PENDING': 3}, {'created': 3})
+
+
+class RoutingTests(TestCase):
+    """Tasks go to their queues and dispatch shards split the backlog."""
+
+    def test_routes(self):
+        self.assertEqual(route_task('records.tasks.process_batch', (), {}, {}), {'queue': 'dispatch'})
+        self.assertEqual(route_task('records.tasks.archive_records', (), {}, {}), {'queue': 'maintenance'})
+        self.assertIsNone(route_task('other.task', (), {}, {}))
+        with override_settings(DISPATCH_SHARDS=4):
+            self.assertEqual(
+                route_task('records.tasks.process_batch', (), {'shard': 2}, {}), {'queue': 'dispatch.2'}
+            )
+
+    @override_settings(DISPATCH_SHARDS=3, STATS_ENABLED=False)
+    def test_shards_partition_backlog(self):
+        benchmarks.seed_records(100, status=Record.Status.PENDING)
+        claimed = [{r.id for r in claim_batch(100, shard=shard)} for shard in range(3)]
+        self.assertEqual(set().union(*claimed), set(Record.objects.values_list('id', flat=True)))
+        for shard, ids in enumerate(claimed):
+            self.assertTrue(all(pk % 3 == shard for pk in ids))
+
+
+@skipUnless(hasattr(os, 'fork'), "needs os.fork")
+class LoggerForkTests(SimpleTestCase):
+    """A forked child (Celery prefork) must get its own listener thread."""
+
+    def test_child_starts_listener(self):
+        handler = logger.handlers[0]
+        # Below every handler's level: starts the listener, prints nothing
+        quiet = logging.makeLogRecord({'msg': 'quiet', 'levelno': 5, 'levelname': 'TRACE'})
+        handler.emit(quiet)
+        pid = os.fork()
+        if pid == 0:
+            handler.emit(quiet)
+            ok = handler.listener_pid == os.getpid() and handler.listener._thread.is_alive()
+            handler.listener.stop()
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+@override_settings(EXTERNAL_API_RETRIES=2, EXTERNAL_API_BACKOFF=0, EXTERNAL_API_BACKOFF_JITTER=0)
+class ClientRetryTests(SimpleTestCase):
+    """Only a 503 is retried; 502/504 may hide a processed batch."""
+
+    def post(self, status_code):
+        with FakeBatchAPI(status_code=status_code) as api:
+            response = build_session().post(api.url, json=[{'id': 1}])
+            return response.status_code, api.requests
+
+    def test_retries_503(self):
+        self.assertEqual(self.post(503), (503, 3))
+
+    def test_does_not_retry_502_or_504(self):
+        self.assertEqual(self.post(502), (502, 1))
+        self.assertEqual(self.post(504), (504, 1))
+
+
+@skipUnless(HAS_FAKEREDIS, "fakeredis is not installed")
+@override_settings(
+    EXTERNAL_API_BREAKER_ENABLED=True,
+    EXTERNAL_API_BREAKER_THRESHOLD=2,
+    EXTERNAL_API_BREAKER_RESET_TIMEOUT=0.05,
+    EXTERNAL_API_RATE_LIMIT=20,
+    EXTERNAL_API_RATE_BURST=2,
+    EXTERNAL_API_RATE_MAX_WAIT=0,
+)
+class ResilienceTests(SimpleTestCase):
+    """Breaker state transitions and the token bucket, against fakeredis."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.breaker = CircuitBreaker(client=self.redis)
+        self.bucket = TokenBucket(client=self.redis)
+
+    def trip(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state(), CircuitBreaker.HALF_OPEN)
+
+    def test_opens_at_threshold(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+
+    def test_half_open_lets_one_probe_through(self):
+        self.trip()
+        self.assertTrue(self.breaker.allow())
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+
+    def test_rate_limited_probe_is_released(self):
+        self.trip()
+        for _ in range(2):
+            self.bucket.acquire()
+        with mock.patch.object(record_client, 'breaker', self.breaker), \
+                mock.patch.object(record_client, 'rate_limiter', self.bucket):
+            with self.assertRaises(RateLimited):
+                record_client.post_batch([{'id': 1}])
+        # No request went out, so the next caller may probe
+        self.assertTrue(self.breaker.allow())
+
+    def post(self, status_code, headers=None):
+        with FakeBatchAPI(status_code=status_code, headers=headers) as api, \
+                mock.patch.object(record_client, 'breaker', self.breaker), \
+                mock.patch.object(record_client, 'rate_limiter', self.bucket):
+            with self.assertRaises(requests.HTTPError) as raised:
+                record_client.post_batch([{'id': 1}], url=api.url)
+        return raised.exception
+
+    @override_settings(EXTERNAL_API_RETRY_AFTER_MAX=60)
+    def test_429_opens_for_retry_after(self):
+        error = self.post(429, headers={'Retry-After': '2'})
+        self.assertFalse(record_client.is_client_error(error))
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.allow()
+        # Less the time spent stopping the fake API
+        self.assertTrue(1 < raised.exception.retry_after <= 2)
+
+        # An HTTP date works too, and is capped
+        self.breaker.reset()
+        self.post(429, headers={'Retry-After': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertTrue(59 < self.breaker.retry_after() <= 60)
+
+    def test_other_4xx_leave_breaker_closed(self):
+        for _ in range(2):
+            self.assertTrue(record_client.is_client_error(self.post(400)))
+        self.assertEqual(self.breaker.state(), CircuitBreaker.CLOSED)
+
+    def test_token_bucket(self):
+        self.bucket.acquire()
+        self.bucket.acquire()
+        with self.assertRaises(RateLimited) as raised:
+            self.bucket.acquire()
+        self.assertAlmostEqual(raised.exception.retry_after, 0.05, delta=0.01)
+        with override_settings(EXTERNAL_API_RATE_MAX_WAIT=1):
+            self.bucket.acquire()
+
+
+class OutboxTests(TestCase):
+    """A crashed worker's batch is finished from the outbox, never re-sent."""
+
+    def setUp(self):
+        benchmarks.seed_records(3, status=Record.Status.PENDING)
+        self.records = claim_batch(3)
+        self.attempt = open_attempt(self.records, build_payload(self.records))
+
+    def age(self, seconds):
+        BatchAttempt.objects.filter(pk=self.attempt.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def test_recovers_responded_attempt(self):
+        mark_responded(self.attempt, [{'id': r.id, 'status': 'SUCCESS'} for r in self.records])
+        # The worker dies here, before applying the response
+        self.age(settings.BATCH_RECOVERY_GRACE + 1)
+
+        self.assertEqual(recover_attempts(), {'applied': 1, 'abandoned': 0})
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, BatchAttempt.Status.APPLIED)
+        self.assertEqual(set(self.attempt.outcomes.values()), {'SUCCESS'})
+        self.assertEqual(Record.objects.filter(status=Record.Status.SUCCESS).count(), 3)
+
+    def test_applies_once(self):
+        mark_responded(self.attempt, [{'id': r.id, 'status': 'SUCCESS'} for r in self.records])
+        self.assertEqual(apply_attempt(self.attempt.pk)['success'], 3)
+        self.assertIsNone(apply_attempt(self.attempt.pk))
+
+    def test_abandons_attempt_without_response(self):
+        self.age(settings.BATCH_RECOVERY_GRACE + 1)
+        self.assertEqual(recover_attempts(), {'applied': 0, 'abandoned': 0})
+
+        self.age(settings.BATCH_CLAIM_TIMEOUT + 1)
+        self.assertEqual(recover_attempts(), {'applied': 0, 'abandoned': 1})
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, BatchAttempt.Status.ABANDONED)
+        # The records are reclaimed once their claim goes stale
+        self.assertEqual(claim_batch(3), [])
+        Record.objects.update(claimed_at=timezone.now() - timedelta(seconds=settings.BATCH_CLAIM_TIMEOUT + 1))
+        self.assertEqual(len(claim_batch(3)), 3)
+
+
+@override_settings(BATCH_RETRY_BASE_DELAY=300, BATCH_MAX_ATTEMPTS=3)
+class RetryBackoffTests(TestCase):
+    """FAILED records back off exponentially and go DEAD at the limit."""
+
+    def fail(self, attempt_count):
+        benchmarks.seed_records(1, status=Record.Status.FAILED)
+        Record.objects.update(attempt_count=attempt_count, next_attempt_at=timezone.now())
+        records = claim_batch(1)
+        started = timezone.now()
+        apply_results(records, [{'id': records[0].id, 'status': 'FAILED'}], records[0].claimed_at)
+        record = Record.objects.get()
+        return record, record.next_attempt_at - started if record.next_attempt_at else None
+
+    def test_backoff_doubles_per_attempt(self):
+        record, delay = self.fail(attempt_count=0)
+        self.assertEqual((record.status, record.attempt_count), (Record.Status.FAILED, 1))
+        self.assertTrue(timedelta(seconds=150) <= delay <= timedelta(seconds=301))
+        self.assertEqual(claim_batch(1), [])
+
+        Record.objects.all().delete()
+        record, delay = self.fail(attempt_count=1)
+        self.assertEqual(record.attempt_count, 2)
+        self.assertTrue(timedelta(seconds=300) <= delay <= timedelta(seconds=601))
+
+    def test_dead_at_max_attempts(self):
+        record, _ = self.fail(attempt_count=2)
+        self.assertEqual((record.status, record.attempt_count), (Record.Status.DEAD, 3))
+        self.assertIn('attempt 3', record.last_error)
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    BATCH_ADAPTIVE=False,
+    BATCH_DRAIN=False,
+    BATCH_SIZE=10,
+    EXTERNAL_API_BREAKER_ENABLED=False,
+    EXTERNAL_API_RATE_LIMIT=0,
+)
+class BatchResultsTests(TestCase):
+    """Per-record outcomes from the external API are applied correctly."""
+
+    def setUp(self):
+        benchmarks.seed_records(4, status=Record.Status.PENDING)
+
+    def test_failed_records_are_rescheduled(self):
+        with FakeBatchAPI(outcome=lambda item: 'FAILED' if item['id'] % 2 else 'SUCCESS') as api:
+            with override_settings(EXTERNAL_API_URL=api.url):
+                result = process_batch.apply().get()
+
+        self.assertEqual((result['success'], result['failed']), (2, 2))
+        for record in Record.objects.all():
+            if record.id % 2 == 0:
+                self.assertEqual(record.status, Record.Status.SUCCESS)
+                continue
+            self.assertEqual((record.status, record.attempt_count), (Record.Status.FAILED, 1))
+            self.assertGreater(record.next_attempt_at, timezone.now())
+            self.assertIn('FAILED', record.last_error)
+
+    def test_records_missing_from_response_are_released(self):
+        records = claim_batch(4)
+        result = apply_results(records, [{'id': records[0].id, 'status': 'SUCCESS'}], records[0].claimed_at)
+
+        self.assertEqual(result['processed'], 1)
+        released = Record.objects.exclude(id=records[0].id)
+        self.assertEqual(set(released.values_list('status', 'attempt_count')), {(Record.Status.PENDING, 0)})
+        # Released without counting an attempt, so they are claimable right away
+        self.assertEqual(len(claim_batch(4)), 3)
+
+    def test_unreadable_2xx_fails_records_without_release(self):
+        for body in (b'<html>OK</html>', b'{"status": "ok"}'):
+            Record.objects.update(status=Record.Status.PENDING, attempt_count=0, next_attempt_at=timezone.now())
+            with FakeBatchAPI(body=body) as api:
+                with override_settings(EXTERNAL_API_URL=api.url):
+                    result = process_batch.apply().get()
+
+            self.assertEqual(api.requests, 1)
+            self.assertEqual((result['processed'], result['failed']), (4, 4))
+            self.assertEqual(set(Record.objects.values_list('status', 'attempt_count')), {(Record.Status.FAILED, 1)})
+            self.assertIn('Unusable 200 response', Record.objects.first().last_error)
+            attempt = BatchAttempt.objects.latest('id')
+            self.assertEqual(attempt.status, BatchAttempt.Status.APPLIED)
+            self.assertIn('Unusable 200 response', attempt.error)
+            # Backing off, not released for an immediate re-send
+            self.assertEqual(claim_batch(4), [])
+
+
+class ClaimTests(TransactionTestCase):
+    """Concurrent workers never claim the same row; dead claims expire."""
+
+    def setUp(self):
+        benchmarks.seed_records(4, status=Record.Status.PENDING)
+        self.ids = list(Record.objects.order_by('id').values_list('id', flat=True))
+
+    @skipUnless(connection.features.has_select_for_update_skip_locked, "needs SKIP LOCKED")
+    def test_skips_locked_rows(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(Record.objects.select_for_update().filter(id__in=self.ids[:2]))
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = claim_batch(4)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(sorted(r.id for r in claimed), self.ids[2:])
+
+    def test_reclaims_stale_claims(self):
+        first = claim_batch(2)
+        self.assertEqual([r.id for r in claim_batch(4)], self.ids[2:])
+        self.assertEqual(claim_batch(4), [])
+
+        stale = timezone.now() - timedelta(seconds=settings.BATCH_CLAIM_TIMEOUT + 1)
+        Record.objects.filter(id__in=self.ids[:2]).update(claimed_at=stale)
+        reclaimed = claim_batch(4)
+        self.assertEqual([r.id for r in reclaimed], self.ids[:2])
+
+        # The dead worker's late results no longer touch the reclaimed rows
+        apply_results(first, [{'id': r.id, 'status': 'SUCCESS'} for r in first], first[0].claimed_at)
+        self.assertFalse(Record.objects.filter(status=Record.Status.SUCCESS).exists())
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    BATCH_ADAPTIVE=False,
+    BATCH_DRAIN=False,
+    BATCH_SIZE=5,
+    BATCH_FANOUT=4,
+    EXTERNAL_API_BREAKER_ENABLED=False,
+    EXTERNAL_API_RATE_LIMIT=0,
+)
+class FanoutTests(TransactionTestCase):
+    """Fanned-out sub-batches are posted together and applied to their own records."""
+
+    def test_concurrent_sub_batches(self):
+        benchmarks.seed_records(20, status=Record.Status.PENDING)
+
+        def outcome(item):
+            return 'FAILED' if item['id'] % 3 == 0 else 'SUCCESS'
+
+        with FakeBatchAPI(latency=0.3, outcome=outcome) as api:
+            with override_settings(EXTERNAL_API_URL=api.url):
+                started = time.perf_counter()
+                result = process_batch.apply().get()
+                elapsed = time.perf_counter() - started
+
+        self.assertEqual(api.requests, 4)
+        # Four sequential posts would take at least 1.2s
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual((result['batches'], result['processed']), (4, 20))
+
+        for record in Record.objects.all():
+            expected = Record.Status.FAILED if record.id % 3 == 0 else Record.Status.SUCCESS
+            self.assertEqual(record.status, expected)
+
+        attempts = BatchAttempt.objects.all()
+        self.assertEqual(sorted(len(a.claimed) for a in attempts), [5, 5, 5, 5])
+        for attempt in attempts:
+            self.assertEqual(attempt.status, BatchAttempt.Status.APPLIED)
+            self.assertEqual(attempt.outcomes.keys(), attempt.claimed.keys())
+            for record_id, outcome_status in attempt.outcomes.items():
+                self.assertEqual(outcome_status, outcome({'id': int(record_id)}))
+
+    def test_unexpected_error_releases_only_its_sub_batch(self):
+        benchmarks.seed_records(20, status=Record.Status.PENDING)
+        bad_id = Record.objects.order_by('id').values_list('id', flat=True)[5]
+        post_batch = record_dispatcher.post_batch
+
+        def flaky_post(payload, **kwargs):
+            if any(item['id'] == bad_id for item in payload):
+                raise TypeError("unexpected")
+            return post_batch(payload, **kwargs)
+
+        with FakeBatchAPI() as api, override_settings(EXTERNAL_API_URL=api.url), \
+                mock.patch.object(record_dispatcher, 'post_batch', flaky_post), \
+                mock.patch.object(record_dispatcher, 'close_old_connections') as close_old:
+            result = process_batch.apply().get()
+
+        self.assertEqual((result['batches'], result['success']), (3, 15))
+        self.assertFalse(BatchAttempt.objects.filter(status=BatchAttempt.Status.SENDING).exists())
+        failed = BatchAttempt.objects.get(status=BatchAttempt.Status.FAILED)
+        self.assertIn(str(bad_id), failed.claimed)
+        self.assertEqual(
+            set(Record.objects.filter(id__in=[int(pk) for pk in failed.claimed]).values_list('status', flat=True)),
+            {Record.Status.PENDING},
+        )
+        # Every DB call from the event loop starts from a usable connection
+        self.assertEqual(close_old.call_count, 4 + 2 * 3 + 1)
+
+    def test_unreadable_2xx_is_not_released(self):
+        benchmarks.seed_records(10, status=Record.Status.PENDING)
+
+        with FakeBatchAPI(body=b'not json') as api:
+            with override_settings(EXTERNAL_API_URL=api.url):
+                result = process_batch.apply().get()
+
+        self.assertEqual(api.requests, 2)
+        self.assertEqual((result['batches'], result['failed']), (2, 10))
+        self.assertEqual(set(Record.objects.values_list('status', 'attempt_count')), {(Record.Status.FAILED, 1)})
+        self.assertEqual(claim_batch(10), [])
+
+
+@override_settings(MICROBATCH_ENABLED=False)
+class BulkCreateTests(TestCase):
+    """Bulk ingestion from JSON arrays and NDJSON, reported by input index."""
+
+    VALID = {'name': 'Alice', 'email': 'alice@example.com', 'phone_number': '+919876543210'}
+    INVALID = {'name': 'Bob', 'email': 'not-an-email', 'phone_number': '+919876543211'}
+
+    def setUp(self):
+        self.client = Client(SERVER_NAME='localhost')
+
+    def post_ndjson(self, body):
+        return self.client.post('/api/records/bulk/', body, content_type='application/x-ndjson')
+
+    def test_ndjson(self):
+        other = {**self.VALID, 'email': 'carol@example.com'}
+        body = '\n'.join(json.dumps(item) for item in (self.VALID, self.INVALID, other)) + '\n\n'
+        response = self.post_ndjson(body)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['created_ids']), 2)
+        self.assertEqual(
+            sorted(Record.objects.values_list('email', flat=True)),
+            ['alice@example.com', 'carol@example.com'],
+        )
+
+    def test_ndjson_parse_error(self):
+        response = self.post_ndjson(json.dumps(self.VALID) + '\n{not json\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', response.json()['detail'])
+        self.assertFalse(Record.objects.exists())
+
+    def test_rejected_and_duplicate_indexes(self):
+        items = [self.INVALID, self.VALID, self.INVALID, self.VALID]
+        response = self.client.post('/api/records/bulk/', items, content_type='application/json')
+        body = response.json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['index'] for r in body['rejected']], [0, 2])
+        self.assertIn('email', body['rejected'][0]['errors'])
+        # Indexes refer to the request, not to the list of valid items
+        self.assertEqual(body['duplicates'], [{'index': 3, 'id': None}])
+
+    def test_reports_duplicates_inserted_concurrently(self):
+        other = {**self.VALID, 'email': 'carol@example.com'}
+        competing = {}
+
+        def split_then_race(records):
+            result = split_duplicates(records)
+            # Another request inserts the same content after the pre-insert check
+            competing['id'] = create_unique(dict(self.VALID))[0].id
+            return result
+
+        with mock.patch('records.views.split_duplicates', side_effect=split_then_race):
+            response = self.client.post(
+                '/api/records/bulk/', [self.INVALID, other, self.VALID], content_type='application/json'
+            )
+
+        body = response.json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(body['created_ids']), 1)
+        self.assertEqual(body['duplicates'], [{'index': 2, 'id': competing['id']}])
+        self.assertEqual(Record.objects.count(), 2)
+
+    def test_all_rejected(self):
+        response = self.client.post('/api/records/bulk/', [self.INVALID], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['rejected'][0]['index'], 0)
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class SuccessListCacheTests(TestCase):
+    """ETags and cached pages follow the SUCCESS list version."""
+
+    URL = '/api/records/success/?page_size=10'
+
+    def setUp(self):
+        cache.clear()
+        benchmarks.seed_records(5, status=Record.Status.SUCCESS)
+        self.client = Client(SERVER_NAME='localhost')
+
+    def test_if_none_match_returns_304(self):
+        first = self.client.get(self.URL)
+        etag = first['ETag']
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+
+        again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], etag)
+        self.assertEqual(again.content, b'')
+
+        # The ETag is per page, not per list
+        other = self.client.get('/api/records/success/?page_size=5', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+
+    def test_if_none_match_lists_and_weak_tags(self):
+        etag = self.client.get(self.URL)['ETag']
+        for header, expected in (
+            (f'"other", {etag}', 304),
+            (f'W/{etag}', 304),
+            ('*', 304),
+            (f'"{etag}"', 200),
+            (f'{etag[:-2]}"', 200),
+            ('"other"', 200),
+        ):
+            with self.subTest(header=header):
+                response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, expected)
+
+    def test_success_write_invalidates(self):
+        etag = self.client.get(self.URL)['ETag']
+
+        benchmarks.seed_records(1, status=Record.Status.PENDING)
+        records = claim_batch(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_results(records, [{'id': records[0].id, 'status': 'SUCCESS'}], records[0].claimed_at)
+            # The version is bumped on commit; until then the cached page is served
+            self.assertEqual(self.client.get(self.URL).json()['count'], 5)
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 6)
+
+
+@override_settings(
+    MICROBATCH_ENABLED=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class AsyncViewTests(TransactionTestCase):
+    """
+    The async twins answer exactly like the sync views.
+
+    The async ORM runs in autocommit, hence TransactionTestCase.
+    """
+
+    ITEM = {'name': 'Alice', 'email': 'alice@example.com', 'phone_number': '+919876543210'}
+
+    def setUp(self):
+        cache.clear()
+        benchmarks.seed_records(30, status=Record.Status.SUCCESS)
+        self.async_client = AsyncClient()
+
+    async def test_list_matches_sync_view(self):
+        query = '?page_size=10'
+        while True:
+            sync = await sync_to_async(self.client.get)(f'/api/records/success/{query}')
+            response = await self.async_client.get(f'/api/async/records/success/{query}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, sync.content)
+            self.assertEqual(response['ETag'], sync['ETag'])
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                break
+            query = f'?page_size=10&cursor={cursor}'
+
+    async def test_list_etag_and_stream(self):
+        etag = (await self.async_client.get('/api/async/records/success/'))['ETag']
+        response = await self.async_client.get('/api/async/records/success/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        for header, expected in ((f'"other", W/{etag}', 304), (f'"{etag}"', 200)):
+            response = await self.async_client.get('/api/async/records/success/', headers={'If-None-Match': header})
+            self.assertEqual(response.status_code, expected)
+
+        response = await self.async_client.get('/api/async/records/success/?stream=ndjson')
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 30)
+
+        response = await self.async_client.get('/api/async/records/success/?cursor=bogus')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_create(self):
+        url = '/api/async/records/'
+        first = await self.async_client.post(url, self.ITEM, content_type='application/json')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['data']['email'], 'alice@example.com')
+
+        again = await self.async_client.post(url, self.ITEM, content_type='application/json')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['data']['id'], first.json()['data']['id'])
+        self.assertEqual(await Record.objects.filter(email='alice@example.com').acount(), 1)
+
+    async def test_create_rejects_invalid_input(self):
+        url = '/api/async/records/'
+        response = await self.async_client.post(
+            url, {**self.ITEM, 'email': 'nope'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+
+        response = await self.async_client.post(url, '{oops', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(HAS_FAKEREDIS, "fakeredis is not installed")
+@override_settings(MICROBATCH_ENABLED=True, MICROBATCH_MAX_RECORDS=3, MICROBATCH_MAX_WAIT_MS=1000)
+class MicrobatchTests(SimpleTestCase):
+    """Size and time flushes of the micro-batch window, against fakeredis."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patches = [
+            mock.patch.object(microbatch, 'get_redis', return_value=self.redis),
+            mock.patch.dict(microbatch._scripts, clear=True),
+            mock.patch.object(record_tasks, 'start_batch_workers'),
+            mock.patch.object(record_tasks.flush_microbatch, 'apply_async'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.start_workers = record_tasks.start_batch_workers
+        self.schedule_flush = record_tasks.flush_microbatch.apply_async
+
+    def timer_token(self):
+        return self.schedule_flush.call_args.kwargs['args'][0]
+
+    def test_flushes_by_size(self):
+        microbatch.notify_created()
+        self.schedule_flush.assert_called_once()
+        self.assertEqual(self.schedule_flush.call_args.kwargs['countdown'], 1.0)
+
+        microbatch.notify_created()
+        self.schedule_flush.assert_called_once()
+        self.start_workers.assert_not_called()
+
+        microbatch.notify_created()
+        self.start_workers.assert_called_once()
+        self.assertFalse(self.redis.exists(microbatch.PENDING_KEY, microbatch.TIMER_KEY))
+
+    def test_flushes_by_time(self):
+        microbatch.notify_created(2)
+        record_tasks.flush_microbatch(self.timer_token())
+        self.start_workers.assert_called_once()
+        self.assertFalse(self.redis.exists(microbatch.PENDING_KEY, microbatch.TIMER_KEY))
+
+    def test_stale_timer_leaves_next_window(self):
+        microbatch.notify_created()
+        stale = self.timer_token()
+        microbatch.notify_created(2)  # size flush
+        microbatch.notify_created()   # opens the next window
+        current = self.timer_token()
+        self.start_workers.reset_mock()
+
+        record_tasks.flush_microbatch(stale)
+        self.start_workers.assert_not_called()
+        self.assertEqual(int(self.redis.get(microbatch.PENDING_KEY)), 1)
+
+        record_tasks.flush_microbatch(current)
+        self.start_workers.assert_called_once()
+
+    def test_broker_error_is_not_raised(self):
+        self.schedule_flush.side_effect = KombuOperationalError("broker down")
+        microbatch.notify_created()
+        self.schedule_flush.assert_called_once()
+
+
+@skipUnless(HAS_FAKEREDIS, "fakeredis is not installed")
+@override_settings(
+    BATCH_ADAPTIVE=True,
+    BATCH_SIZE=10,
+    BATCH_SIZE_MIN=5,
+    BATCH_SIZE_MAX=50,
+    BATCH_ADAPTIVE_INCREASE=5,
+    BATCH_ADAPTIVE_DECREASE=0.5,
+    BATCH_ADAPTIVE_TARGET_LATENCY=1.0,
+    BATCH_ADAPTIVE_MAX_ERROR_RATE=0.5,
+    BATCH_ADAPTIVE_WINDOW=10,
+)
+class AdaptiveBatchSizeTests(SimpleTestCase):
+    """AIMD steps start from the shared size, within the configured bounds."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.controller = AdaptiveBatchSize(client=self.redis)
+
+    def size_after(self, start, *observations):
+        self.redis.set(AdaptiveBatchSize.SIZE_KEY, start)
+        for observation in observations:
+            self.controller.observe(*observation)
+        return self.controller.current()
+
+    def test_starts_from_batch_size(self):
+        self.assertEqual(self.controller.current(), 10)
+        self.controller.observe(10, 0.1)
+        self.assertEqual(self.controller.current(), 15)
+
+    def test_grows_from_current_size_not_batch_length(self):
+        # A 3-record micro-batch must not drag the shared size down to 3 + 5
+        self.assertEqual(self.size_after(40, (3, 0.1)), 45)
+
+    def test_halves_on_failure_or_slow_call(self):
+        self.assertEqual(self.size_after(40, (3, 0.1, False)), 20)
+        self.assertEqual(self.size_after(40, (40, 2.0)), 20)
+
+    def test_holds_while_p95_is_slow(self):
+        for _ in range(3):
+            self.redis.lpush(AdaptiveBatchSize.LATENCY_KEY, 5.0)
+        self.assertEqual(self.size_after(40, (40, 0.1)), 40)
+
+    def test_clamped_to_bounds(self):
+        self.assertEqual(self.size_after(48, (48, 0.1)), 50)
+        self.assertEqual(self.size_after(6, (6, 0.1, False)), 5)
+        self.redis.set(AdaptiveBatchSize.SIZE_KEY, 1000)
+        self.assertEqual(self.controller.current(), 50)
+
+    def test_falls_back_to_batch_size(self):
+        broken = mock.Mock(**{
+            'get.side_effect': redis.ConnectionError('down'),
+            'pipeline.side_effect': redis.ConnectionError('down'),
+        })
+        controller = AdaptiveBatchSize(client=broken)
+        self.assertEqual(controller.current(), 10)
+        controller.observe(10, 0.1)
+        with override_settings(BATCH_ADAPTIVE=False):
+            self.redis.set(AdaptiveBatchSize.SIZE_KEY, 40)
+            self.assertEqual(self.controller.current(), 10)
+
+    @override_settings(BATCH_ADAPTIVE_INCREASE=1, BATCH_SIZE_MAX=500)
+    @mock.patch.object(AdaptiveBatchSize, 'MAX_UPDATE_TRIES', 100)
+    def test_concurrent_steps_are_not_lost(self):
+        threads = [threading.Thread(target=self.controller.observe, args=(3, 0.1)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.controller.current(), 30)
+
+
+class DailyFileHandlerTests(SimpleTestCase):
+    """Processes sharing the daily log never lose each other's lines."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.day = date(2026, 1, 20)
+        patch = mock.patch.object(DailyFileHandler, '_today', lambda handler: self.day)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def handler(self):
+        handler = DailyFileHandler(self.directory.name, 'app', backup_count=1, encoding='utf-8')
+        self.addCleanup(handler.close)
+        return handler
+
+    def log(self, handler, message):
+        handler.handle(logging.makeLogRecord({'msg': message, 'levelno': logging.INFO}))
+
+    def read(self, day):
+        return (Path(self.directory.name) / f'app-{day}.log').read_text().splitlines()
+
+    def test_processes_share_each_day(self):
+        first, second = self.handler(), self.handler()
+        self.log(first, 'a1')
+        self.log(second, 'b1')
+
+        self.day = date(2026, 1, 21)
+        self.log(second, 'b2')
+        self.log(first, 'a2')
+
+        self.assertEqual(self.read('2026-01-20'), ['a1', 'b1'])
+        self.assertEqual(self.read('2026-01-21'), ['b2', 'a2'])
+
+        self.day = date(2026, 1, 22)
+        self.log(first, 'a3')
+        self.assertEqual(
+            sorted(p.name for p in Path(self.directory.name).iterdir()),
+            ['app-2026-01-21.log', 'app-2026-01-22.log'],
+        )
+
+
+@override_settings(RECORDS_PAGE_SIZE=3, RECORDS_MAX_PAGE_SIZE=4)
+class SuccessListPagingTests(TestCase):
+    """Keyset pages of the SUCCESS list, and its streaming formats."""
+
+    URL = '/api/records/success/'
+
+    def setUp(self):
+        cache.clear()
+        benchmarks.seed_records(7, status=Record.Status.SUCCESS)
+        benchmarks.seed_records(2, status=Record.Status.PENDING)
+        self.client = Client(SERVER_NAME='localhost')
+        self.ids = list(
+            Record.objects.filter(status=Record.Status.SUCCESS)
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def walk(self, page_size):
+        """Follow next_cursor to the end; returns the pages' ids."""
+        pages, cursor = [], None
+        while True:
+            url = f'{self.URL}?page_size={page_size}' + (f'&cursor={cursor}' if cursor else '')
+            body = self.client.get(url).json()
+            self.assertEqual(body['count'], len(body['data']))
+            pages.append([row['id'] for row in body['data']])
+            cursor = body['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_cursor_continues_across_equal_created_at(self):
+        Record.objects.update(created_at=timezone.now())
+        expected = sorted(self.ids, reverse=True)
+        for fast in (True, False):
+            with self.subTest(fast=fast), override_settings(RECORDS_FAST_SERIALIZATION=fast):
+                cache.clear()
+                pages = self.walk(page_size=3)
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertEqual([pk for page in pages for pk in page], expected)
+
+    def test_invalid_cursor_is_400(self):
+        for cursor in ('!!!', 'Zm9v', 'bm90LWEtZGF0ZXwx'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'{self.URL}?cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid cursor', response.json()['message'])
+
+    def test_page_size_is_clamped(self):
+        for page_size, count in (('0', 1), ('-5', 1), ('1000', 4), ('abc', 3), ('', 3), ('2', 2)):
+            with self.subTest(page_size=page_size):
+                body = self.client.get(f'{self.URL}?page_size={page_size}').json()
+                # count is the rows on this page, not the total
+                self.assertEqual((body['count'], len(body['data'])), (count, count))
+                self.assertIsNotNone(body['next_cursor'])
+
+    def test_streams(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), override_settings(RECORDS_FAST_SERIALIZATION=fast):
+                response = self.client.get(f'{self.URL}?stream=ndjson')
+                self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+                lines = b''.join(response.streaming_content).decode().splitlines()
+                self.assertEqual([json.loads(line)['id'] for line in lines], self.ids)
+
+                response = self.client.get(f'{self.URL}?stream=json')
+                self.assertEqual(response['Content-Type'], 'application/json')
+                rows = json.loads(b''.join(response.streaming_content))
+                self.assertEqual([row['id'] for row in rows], self.ids)
+
+        self.assertEqual(self.client.get(f'{self.URL}?stream=xml').status_code, 400)
+
+
+@skipUnless(metrics.HAS_PROMETHEUS, "prometheus_client is not installed")
+@override_settings(MICROBATCH_ENABLED=False)
+class MetricsTests(TestCase):
+    """Request/batch metrics and /metrics, against a private registry."""
+
+    def setUp(self):
+        from prometheus_client import CollectorRegistry, Counter, Histogram
+
+        self.registry = CollectorRegistry()
+        patches = [
+            mock.patch.object(metrics, 'ENABLED', True),
+            mock.patch.object(metrics, '_registry', return_value=self.registry),
+            mock.patch.object(metrics, 'REQUEST_SECONDS', Histogram(
+                'records_http_request_seconds', '', ['view', 'method', 'status'], registry=self.registry,
+            )),
+            mock.patch.object(metrics, 'BATCH_STAGE_SECONDS', Histogram(
+                'records_batch_stage_seconds', '', ['stage'], registry=self.registry,
+            )),
+            mock.patch.object(metrics, 'RECORDS_PROCESSED', Counter(
+                'records_processed_total', '', ['status'], registry=self.registry,
+            )),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # Built after patching, so its handler loads MetricsMiddleware
+        self.client = Client(SERVER_NAME='localhost')
+
+    def sample(self, name, **labels):
+        return self.registry.get_sample_value(name, labels) or 0
+
+    def test_requests_are_labelled_by_view(self):
+        self.client.get('/api/records/success/')
+        self.client.get('/api/records/success/')
+        self.client.post('/api/records/', data={}, content_type='application/json')
+        self.client.get('/api/nowhere/')
+
+        count = 'records_http_request_seconds_count'
+        self.assertEqual(self.sample(count, view='records-success', method='GET', status='200'), 2)
+        self.assertEqual(self.sample(count, view='record-create', method='POST', status='400'), 1)
+        self.assertEqual(self.sample(count, view='unmatched', method='GET', status='404'), 1)
+
+    async def test_async_middleware(self):
+        async def get_response(request):
+            return HttpResponse(status=201)
+
+        middleware = metrics.MetricsMiddleware(get_response)
+        response = await middleware(RequestFactory().post('/api/async/records/'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.sample(
+            'records_http_request_seconds_count', view='unmatched', method='POST', status='201'
+        ), 1)
+
+    def test_batch_helpers(self):
+        with metrics.timer(metrics.BATCH_STAGE_SECONDS, stage='claim'):
+            pass
+        metrics.count_processed({'success': 3, 'failed': 1, 'dead': 0})
+
+        self.assertEqual(self.sample('records_batch_stage_seconds_count', stage='claim'), 1)
+        self.assertEqual(self.sample('records_processed_total', status='SUCCESS'), 3)
+        self.assertEqual(self.sample('records_processed_total', status='FAILED'), 1)
+        self.assertEqual(self.sample('records_processed_total', status='DEAD'), 0)
+
+    def test_metrics_endpoint(self):
+        benchmarks.seed_records(2, status=Record.Status.PENDING)
+        benchmarks.seed_records(1, status=Record.Status.FAILED)
+        benchmarks.seed_records(4, status=Record.Status.SUCCESS)
+        self.registry.register(metrics.BacklogCollector())
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('records_backlog{status="PENDING"} 2.0', body)
+        self.assertIn('records_backlog{status="FAILED"} 1.0', body)
+        self.assertIn('records_backlog{status="IN_PROGRESS"} 0.0', body)
+        self.assertNotIn('status="SUCCESS"', body.split('records_backlog', 1)[1])
+
+
+@override_settings(MICROBATCH_ENABLED=False)
+class MetricsDisabledTests(TestCase):
+    """With METRICS_ENABLED off, metrics cost nothing and /metrics is gone."""
+
+    def setUp(self):
+        patch = mock.patch.object(metrics, 'ENABLED', False)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_middleware_removes_itself(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            metrics.MetricsMiddleware(lambda request: HttpResponse())
+
+    def test_metrics_are_no_ops(self):
+        noop = metrics._metric('Counter', 'records_unused_total', '')
+        self.assertIsInstance(noop, metrics._NoOpMetric)
+        noop.labels(status='SUCCESS').inc(5)
+        noop.labels(stage='send').observe(1.0)
+        with metrics.timer(noop, stage='send'):
+            pass
+        metrics.count_processed({'success': 1})
+
+    def test_endpoint_is_404(self):
+        self.assertEqual(Client(SERVER_NAME='localhost').get('/metrics').status_code, 404)
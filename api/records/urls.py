@@ -1,9 +1,25 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
-from records.views import RecordCreateView, SuccessRecordsListView
+from records.views import (
+    AsyncRecordCreateView,
+    AsyncSuccessRecordsListView,
+    RecordBulkCreateView,
+    RecordCreateView,
+    RecordExportView,
+    RecordStatsView,
+    SuccessRecordsListView,
+)
 
 
 urlpatterns = [
     path('records/', RecordCreateView.as_view(), name='record-create'),
+    path('records/bulk/', RecordBulkCreateView.as_view(), name='record-bulk-create'),
     path('records/success/', SuccessRecordsListView.as_view(), name='records-success'),
+    path('records/stats/', RecordStatsView.as_view(), name='records-stats'),
+    path('records/export/', RecordExportView.as_view(), name='records-export'),
+
+    # Async (ASGI) intake path; see config/asgi.py
+    path('async/records/', csrf_exempt(AsyncRecordCreateView.as_view()), name='record-create-async'),
+    path('async/records/success/', AsyncSuccessRecordsListView.as_view(), name='records-success-async'),
 ]
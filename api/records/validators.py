@@ -0,0 +1,90 @@
+"""
+Field validators shared by the single and bulk record creation paths.
+
+Patterns are compiled once at import and each validator normalizes its value
+in a single pass, so per-request validation does no regex compilation or
+repeated date lookups.
+"""
+
+import re
+from datetime import date
+
+from rest_framework import serializers
+
+
+# Basic email pattern (applied on top of EmailField's own validator)
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# E.164 format: + followed by 1-15 digits
+PHONE_PATTERN = re.compile(r'^\+[1-9]\d{1,14}$')
+
+# Basic URL pattern for portfolio/GitHub/LinkedIn
+URL_PATTERN = re.compile(r'^https?://[^\s/$.?#].[^\s]*$', re.IGNORECASE)
+
+# Reasonable age check (max 150 years old)
+MAX_AGE_YEARS = 150
+
+
+def validate_name(value):
+    """Validate name is not empty and has reasonable length."""
+    value = value.strip()
+    if not value:
+        raise serializers.ValidationError("Name cannot be empty.")
+    if len(value) < 2:
+        raise serializers.ValidationError("Name must be at least 2 characters long.")
+    if len(value) > 255:
+        raise serializers.ValidationError("Name cannot exceed 255 characters.")
+    return value
+
+
+def validate_email(value):
+    """Validate email format; returns the lowercased address."""
+    value = value.strip().lower()
+    if not EMAIL_PATTERN.match(value):
+        raise serializers.ValidationError("Invalid email format.")
+    return value
+
+
+def validate_phone_number(value):
+    """
+    Validate phone number in international format.
+    Format: +[country_code][number] (E.164 format)
+    Examples: +919876543210, +14155552671
+    """
+    value = value.strip()
+    if not PHONE_PATTERN.match(value):
+        raise serializers.ValidationError(
+            "Phone number must be in international format (e.g., +919876543210)."
+        )
+    return value
+
+
+def validate_link(value):
+    """
+    Validate optional URL field.
+    Must be a valid URL if provided.
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if not URL_PATTERN.match(value):
+        raise serializers.ValidationError("Invalid URL format. Must start with http:// or https://")
+    return value
+
+
+def validate_dob(value, today=None):
+    """
+    Validate optional date of birth.
+    Must be a valid date in the past if provided.
+    """
+    if not value:
+        return None
+
+    today = today or date.today()
+    if value > today:
+        raise serializers.ValidationError("Date of birth cannot be in the future.")
+    if value < date(today.year - MAX_AGE_YEARS, 1, 1):
+        raise serializers.ValidationError("Invalid date of birth.")
+
+    return value
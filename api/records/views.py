@@ -1,34 +1,89 @@
+import json
+from datetime import date
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from records.models import Record
-from records.serializers import RecordSerializer, RecordListSerializer
+from records import stats
+from records.cache import etag_matches, get_page, page_etag, set_page, success_version
+from records.dedup import (
+    acreate_unique,
+    create_unique,
+    get_idempotent_response,
+    split_duplicates,
+    store_idempotent_response,
+)
+from records.export import (
+    CONTENT_TYPES as EXPORT_CONTENT_TYPES,
+    ExportError,
+    export_chunks,
+    iter_rows,
+    parse_bound,
+    parse_statuses,
+)
+from records.ingest import bulk_insert
+from records.models import ArchivedRecord, Record
+from records.pagination import InvalidCursor, akeyset_page, keyset_page, parse_page_size
+from records.parsers import NDJSONParser
+from records.serializers import (
+    LIST_FIELDS,
+    RecordSerializer,
+    RecordListSerializer,
+    fast_list_rows,
+    render_json,
+)
 from records.logger import logger
 
 
+def created_response_body(record, created):
+    """Body and status for a create request; duplicates return the existing record."""
+    if created:
+        logger.info("Record created successfully: ID=%s", record.id)
+        message, code = 'Record created successfully', status.HTTP_201_CREATED
+    else:
+        message, code = 'Duplicate submission, returning existing record', status.HTTP_200_OK
+    return {'message': message, 'data': RecordSerializer(record).data}, code
+
+
 class RecordCreateView(APIView):
     """
     POST /api/records/
     Create a new record from form submission.
+
+    A repeated Idempotency-Key header replays the first response. A
+    submission identical to an existing record (see records.dedup) returns
+    that record with 200 instead of creating another.
     """
     
     def post(self, request):
-        logger.info(f"Received record creation request: {request.data}")
+        logger.debug("Received record creation request")
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            replay = get_idempotent_response(idempotency_key)
+            if replay is not None:
+                code, body = replay
+                response = Response(body, status=code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
         
         serializer = RecordSerializer(data=request.data)
         if serializer.is_valid():
-            record = serializer.save()
-            logger.info(f"Record created successfully: ID={record.id}")
-            return Response(
-                {
-                    'message': 'Record created successfully',
-                    'data': RecordSerializer(record).data
-                },
-                status=status.HTTP_201_CREATED
-            )
+            record, created = create_unique(serializer.validated_data)
+            body, code = created_response_body(record, created)
+            if idempotency_key:
+                store_idempotent_response(idempotency_key, code, body)
+            return Response(body, status=code)
         
-        logger.warning(f"Record validation failed: {serializer.errors}")
+        logger.warning("Record validation failed: %s", serializer.errors)
         return Response(
             {
                 'message': 'Validation failed',
@@ -38,23 +93,457 @@ class RecordCreateView(APIView):
         )
 
 
+class RecordBulkCreateView(APIView):
+    """
+    POST /api/records/bulk/
+    Create many records at once from a JSON array or an NDJSON body
+    (Content-Type: application/x-ndjson).
+
+    Each item is validated independently; valid items are inserted and
+    invalid ones are reported by their index in the input. Items identical
+    to a stored record or an earlier item are reported under `duplicates`
+    with the existing record's ID (null for an earlier item).
+    """
+
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'message': 'Expected a JSON array or NDJSON body'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_items = settings.RECORDS_BULK_MAX_ITEMS
+        if len(items) > max_items:
+            return Response(
+                {'message': f"Too many records: {len(items)} (max {max_items})"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        logger.info("Received bulk creation request with %d records", len(items))
+
+        context = {'today': date.today()}
+        valid = []
+        rejected = []
+        for index, item in enumerate(items):
+            serializer = RecordSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append(Record(**serializer.validated_data))
+            else:
+                rejected.append({'index': index, 'errors': serializer.errors})
+
+        new_records, duplicate_of = split_duplicates(valid)
+        created_ids, conflicts = bulk_insert(new_records)
+
+        # Map duplicates back to their index in the request, including
+        # those a concurrent request inserted after split_duplicates ran
+        rejected_indexes = {r['index'] for r in rejected}
+        valid_indexes = [i for i in range(len(items)) if i not in rejected_indexes]
+        new_positions = [i for i in range(len(valid)) if i not in duplicate_of]
+        for position, record_id in conflicts.items():
+            duplicate_of[new_positions[position]] = record_id
+        duplicates = [
+            {'index': valid_indexes[position], 'id': record_id}
+            for position, record_id in sorted(duplicate_of.items())
+        ]
+
+        if rejected:
+            logger.warning("Bulk creation rejected %d of %d records", len(rejected), len(items))
+
+        if created_ids:
+            code = status.HTTP_201_CREATED
+        elif duplicates:
+            code = status.HTTP_200_OK
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                'message': (
+                    f"Created {len(created_ids)} records, rejected {len(rejected)}, "
+                    f"{len(duplicates)} duplicates"
+                ),
+                'created_ids': created_ids,
+                'rejected': rejected,
+                'duplicates': duplicates
+            },
+            status=code
+        )
+
+
+def wants_archived(params):
+    return params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def list_values(records):
+    """`.values_list(*LIST_FIELDS)` of a queryset or of each in a list."""
+    if isinstance(records, list):
+        return [queryset.values_list(*LIST_FIELDS) for queryset in records]
+    return records.values_list(*LIST_FIELDS)
+
+
 class SuccessRecordsListView(APIView):
     """
     GET /api/records/success/
-    List all records with SUCCESS status.
+    List records with SUCCESS status, newest first.
+
+    Pages are cached and carry an ETag; send If-None-Match to get a 304
+    when no records have changed.
+
+    Query params:
+        cursor:    Opaque token from a previous page's `next_cursor`
+        page_size: Records per page (capped at RECORDS_MAX_PAGE_SIZE)
+        include_archived: `1` to also page through archived records
+                   (see records.archive); not applied to streams
+        stream:    `ndjson` or `json` to stream every SUCCESS record
+                   instead of returning a single page
+
+    Response:
+        count:       Records on this page, not the total
+        next_cursor: Cursor for the next page, or null on the last page
+        data:        The page's records
     """
-    
+
+    STREAM_CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'json': 'application/json',
+    }
+
     def get(self, request):
-        logger.debug("Fetching SUCCESS records")
-        
         records = Record.objects.filter(status=Record.Status.SUCCESS)
-        serializer = RecordListSerializer(records, many=True)
-        
-        logger.info(f"Returning {records.count()} SUCCESS records")
+
+        stream = request.query_params.get('stream')
+        if stream:
+            if stream not in self.STREAM_CONTENT_TYPES:
+                return Response(
+                    {'message': f"Unsupported stream format: {stream}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            logger.debug("Streaming SUCCESS records as %s", stream)
+            return StreamingHttpResponse(
+                self._stream(records, stream),
+                content_type=self.STREAM_CONTENT_TYPES[stream]
+            )
+
+        cursor = request.query_params.get('cursor')
+        page_size = parse_page_size(
+            request.query_params.get('page_size'),
+            default=settings.RECORDS_PAGE_SIZE,
+            maximum=settings.RECORDS_MAX_PAGE_SIZE,
+        )
+
+        # Pages only change when process_batch writes SUCCESS rows, which
+        # bumps the version; serve 304s and cached pages until then
+        archived = wants_archived(request.query_params)
+        if archived:
+            records = [records, ArchivedRecord.objects.all()]
+
+        version = success_version()
+        etag = page_etag(version, cursor, page_size, archived) if version is not None else None
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return self._with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        body = get_page(version, cursor, page_size, archived) if version is not None else None
+        if body is None:
+            try:
+                data, next_cursor = self._page(records, cursor, page_size)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            body = {
+                'count': len(data),
+                'next_cursor': next_cursor,
+                'data': data
+            }
+            if version is not None:
+                set_page(version, cursor, page_size, body, archived)
+
+        logger.info("Returning %d SUCCESS records", body['count'])
+        if settings.RECORDS_FAST_SERIALIZATION:
+            response = HttpResponse(render_json(body), content_type='application/json')
+        else:
+            response = Response(body, status=status.HTTP_200_OK)
+        return self._with_etag(response, etag)
+
+    def _page(self, records, cursor, page_size):
+        """Return (serialized rows, next_cursor) for one page of one or more querysets."""
+        if settings.RECORDS_FAST_SERIALIZATION:
+            rows, next_cursor = keyset_page(
+                list_values(records),
+                cursor=cursor,
+                page_size=page_size,
+                position=lambda row: (row[7], row[0]),
+            )
+            return fast_list_rows(rows), next_cursor
+
+        rows, next_cursor = keyset_page(records, cursor=cursor, page_size=page_size)
+        return RecordListSerializer(rows, many=True).data, next_cursor
+
+    def _with_etag(self, response, etag):
+        if etag:
+            response['ETag'] = etag
+            # Let browsers keep the page but revalidate every time
+            response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _stream(self, records, fmt):
+        """
+        Yield serialized records one at a time from a server-side cursor,
+        so memory stays flat regardless of table size.
+        """
+        rows = records.order_by('-created_at', '-id')
+        chunk_size = settings.RECORDS_STREAM_CHUNK_SIZE
+        if settings.RECORDS_FAST_SERIALIZATION:
+            tuples = rows.values_list(*LIST_FIELDS).iterator(chunk_size=chunk_size)
+            serialized = (
+                item
+                for chunk in iter(lambda: list(islice(tuples, chunk_size)), [])
+                for item in fast_list_rows(chunk)
+            )
+        else:
+            serialized = (
+                RecordListSerializer(record).data
+                for record in rows.iterator(chunk_size=chunk_size)
+            )
+
+        if fmt == 'json':
+            yield b'['
+        for index, item in enumerate(serialized):
+            line = render_json(item)
+            if fmt == 'ndjson':
+                yield line + b'\n'
+            else:
+                yield line if index == 0 else b',' + line
+        if fmt == 'json':
+            yield b']'
+
+
+class RecordStatsView(APIView):
+    """
+    GET /api/records/stats/
+    Per-status record totals and hourly throughput, read from the
+    counters in records.stats instead of counting rows.
+
+    Falls back to counting from the database (without hourly data) while
+    the counters are unavailable.
+
+    Query params:
+        hours: Hours of throughput history (default 24, capped at
+               STATS_HOURLY_RETENTION_HOURS)
+    """
+
+    def get(self, request):
+        hours = parse_page_size(
+            request.query_params.get('hours'),
+            default=24,
+            maximum=settings.STATS_HOURLY_RETENTION_HOURS,
+        )
+
+        totals = stats.get_totals() if settings.STATS_ENABLED else None
+        if totals is None:
+            totals, source, hourly = stats.database_totals(), 'database', []
+        else:
+            source, hourly = 'counters', stats.get_hourly(hours)
+
         return Response(
             {
-                'count': records.count(),
-                'data': serializer.data
+                'total': sum(totals.values()),
+                'totals': totals,
+                'hourly': hourly,
+                'source': source
             },
             status=status.HTTP_200_OK
         )
+
+
+class RecordExportView(APIView):
+    """
+    GET /api/records/export/
+    Stream records as a file download (staff only).
+
+    Query params:
+        output: `csv` (default), `ndjson` or `parquet` (needs pyarrow)
+        status: Status to include; repeat or comma-separate for several,
+                omit for all
+        since:  Created at or after this ISO date/datetime
+        until:  Created before this ISO date/datetime
+        include_archived: `1` to also export archived records (as SUCCESS)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('output', 'csv')
+        statuses = [
+            value
+            for param in request.query_params.getlist('status')
+            for value in param.split(',') if value
+        ]
+        try:
+            rows = iter_rows(
+                statuses=parse_statuses(statuses),
+                since=parse_bound(request.query_params.get('since'), 'since'),
+                until=parse_bound(request.query_params.get('until'), 'until'),
+                include_archived=wants_archived(request.query_params),
+            )
+            chunks = export_chunks(fmt, rows)
+        except ExportError as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info("Exporting records as %s (statuses=%s)", fmt, statuses or 'all')
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="records.{fmt}"'
+        return response
+
+
+def json_response(body, status=200):
+    return HttpResponse(render_json(body), status=status, content_type='application/json')
+
+
+class AsyncRecordCreateView(View):
+    """
+    POST /api/async/records/
+    Async twin of RecordCreateView for ASGI servers (see config/asgi.py).
+
+    Same validation, deduplication and response body; the insert goes
+    through the async ORM, so a request waiting on the database does not
+    hold a worker thread. Accepts JSON bodies only.
+    """
+
+    async def post(self, request):
+        logger.debug("Received async record creation request")
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            replay = await sync_to_async(get_idempotent_response)(idempotency_key)
+            if replay is not None:
+                code, body = replay
+                response = json_response(body, status=code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return json_response({'message': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RecordSerializer(data=data, context={'today': date.today()})
+        if not serializer.is_valid():
+            logger.warning("Record validation failed: %s", serializer.errors)
+            return json_response(
+                {'message': 'Validation failed', 'errors': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        record, created = await acreate_unique(serializer.validated_data)
+        body, code = created_response_body(record, created)
+        if idempotency_key:
+            await sync_to_async(store_idempotent_response)(idempotency_key, code, body)
+        return json_response(body, status=code)
+
+
+class AsyncSuccessRecordsListView(View):
+    """
+    GET /api/async/records/success/
+    Async twin of SuccessRecordsListView: same query params, body, ETag and
+    page cache, with rows fetched through the async ORM.
+    """
+
+    STREAM_CONTENT_TYPES = SuccessRecordsListView.STREAM_CONTENT_TYPES
+    _with_etag = SuccessRecordsListView._with_etag
+
+    async def get(self, request):
+        records = Record.objects.filter(status=Record.Status.SUCCESS)
+
+        stream = request.GET.get('stream')
+        if stream:
+            if stream not in self.STREAM_CONTENT_TYPES:
+                return json_response(
+                    {'message': f"Unsupported stream format: {stream}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            logger.debug("Streaming SUCCESS records as %s", stream)
+            return StreamingHttpResponse(
+                self._stream(records, stream),
+                content_type=self.STREAM_CONTENT_TYPES[stream]
+            )
+
+        cursor = request.GET.get('cursor')
+        page_size = parse_page_size(
+            request.GET.get('page_size'),
+            default=settings.RECORDS_PAGE_SIZE,
+            maximum=settings.RECORDS_MAX_PAGE_SIZE,
+        )
+
+        archived = wants_archived(request.GET)
+        if archived:
+            records = [records, ArchivedRecord.objects.all()]
+
+        version = await sync_to_async(success_version)()
+        etag = page_etag(version, cursor, page_size, archived) if version is not None else None
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return self._with_etag(HttpResponse(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        body = await sync_to_async(get_page)(version, cursor, page_size, archived) if version is not None else None
+        if body is None:
+            try:
+                data, next_cursor = await self._page(records, cursor, page_size)
+            except InvalidCursor as e:
+                return json_response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            body = {
+                'count': len(data),
+                'next_cursor': next_cursor,
+                'data': data
+            }
+            if version is not None:
+                await sync_to_async(set_page)(version, cursor, page_size, body, archived)
+
+        logger.info("Returning %d SUCCESS records", body['count'])
+        return self._with_etag(json_response(body), etag)
+
+    async def _page(self, records, cursor, page_size):
+        """Return (serialized rows, next_cursor) for one page of one or more querysets."""
+        if settings.RECORDS_FAST_SERIALIZATION:
+            rows, next_cursor = await akeyset_page(
+                list_values(records),
+                cursor=cursor,
+                page_size=page_size,
+                position=lambda row: (row[7], row[0]),
+            )
+            return fast_list_rows(rows), next_cursor
+
+        rows, next_cursor = await akeyset_page(records, cursor=cursor, page_size=page_size)
+        return RecordListSerializer(rows, many=True).data, next_cursor
+
+    async def _stream(self, records, fmt):
+        """
+        Yield serialized records a chunk at a time, walking the table with
+        keyset pages so memory stays flat. Always uses the fast serializer
+        (its output is identical).
+        """
+        rows = records.values_list(*LIST_FIELDS)
+        cursor = None
+        first = True
+
+        if fmt == 'json':
+            yield b'['
+        while True:
+            chunk, cursor = await akeyset_page(
+                rows,
+                cursor=cursor,
+                page_size=settings.RECORDS_STREAM_CHUNK_SIZE,
+                position=lambda row: (row[7], row[0]),
+            )
+            for index, item in enumerate(fast_list_rows(chunk)):
+                line = render_json(item)
+                if fmt == 'ndjson':
+                    yield line + b'\n'
+                else:
+                    yield line if first and index == 0 else b',' + line
+            first = first and not chunk
+            if cursor is None:
+                break
+        if fmt == 'json':
+            yield b']'
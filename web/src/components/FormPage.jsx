@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useForm, Controller } from 'react-hook-form';
 import { yupResolver } from '@hookform/resolvers/yup';
 import * as yup from 'yup';
@@ -45,6 +45,8 @@ const FormPage = ({ onSuccess }) => {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [submitError, setSubmitError] = useState(null);
   const [submitSuccess, setSubmitSuccess] = useState(false);
+  // One key per submission, reused on retries so the server can replay the response
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   const {
     register,
@@ -69,7 +71,8 @@ const FormPage = ({ onSuccess }) => {
     setSubmitSuccess(false);
 
     try {
-      await createRecord(data);
+      await createRecord(data, idempotencyKey.current);
+      idempotencyKey.current = crypto.randomUUID();
       setSubmitSuccess(true);
       reset();
       if (onSuccess) onSuccess();
@@ -1,19 +1,28 @@
 import React, { useState, useEffect } from 'react';
 import { Table, Card, Spinner, Alert, Container, Badge } from 'react-bootstrap';
 import './RecordsList.css';
-import { getSuccessRecords } from '../services/api';
+import { getRecordStats, getSuccessRecords } from '../services/api';
 
 const RecordsList = () => {
     const [records, setRecords] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [successTotal, setSuccessTotal] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState(null);
 
     const fetchRecords = async () => {
         setLoading(true);
         setError(null);
         try {
-            const result = await getSuccessRecords();
+            const [result, stats] = await Promise.all([
+                getSuccessRecords(),
+                // The badge falls back to the loaded count without stats
+                getRecordStats().catch(() => null),
+            ]);
             setRecords(result.data || []);
+            setNextCursor(result.next_cursor || null);
+            setSuccessTotal(stats ? stats.totals.SUCCESS : null);
         } catch (err) {
             setError(err.message);
         } finally {
@@ -21,6 +30,19 @@ const RecordsList = () => {
         }
     };
 
+    const fetchMoreRecords = async () => {
+        setLoadingMore(true);
+        try {
+            const result = await getSuccessRecords(nextCursor);
+            setRecords((prev) => [...prev, ...(result.data || [])]);
+            setNextCursor(result.next_cursor || null);
+        } catch (err) {
+            setError(err.message);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchRecords();
     }, []);
@@ -52,7 +74,7 @@ const RecordsList = () => {
             <Card.Body>
                 <Card.Title className="d-flex justify-content-between align-items-center mb-4">
                     <h3>Processed Records</h3>
-                    <Badge bg="success">{records.length} Records</Badge>
+                    <Badge bg="success">{successTotal ?? records.length} Records</Badge>
                 </Card.Title>
 
                 {records.length === 0 ? (
@@ -97,6 +119,17 @@ const RecordsList = () => {
                                 ))}
                             </tbody>
                         </Table>
+                        {nextCursor && (
+                            <div className="text-center mt-3">
+                                <button
+                                    className="btn btn-outline-secondary"
+                                    onClick={fetchMoreRecords}
+                                    disabled={loadingMore}
+                                >
+                                    {loadingMore ? 'Loading...' : 'Load more'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
             </Card.Body>
@@ -8,14 +8,20 @@ const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api
 /**
  * Create a new record
  * @param {Object} data - Record data (name, email, phone_number, link, dob)
+ * @param {string} [idempotencyKey] - Same key for retries of one submission
  * @returns {Promise<Object>} - API response
  */
-export const createRecord = async (data) => {
+export const createRecord = async (data, idempotencyKey) => {
+    const headers = {
+        'Content-Type': 'application/json',
+    };
+    if (idempotencyKey) {
+        headers['Idempotency-Key'] = idempotencyKey;
+    }
+
     const response = await fetch(`${API_BASE_URL}/records/`, {
         method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
+        headers,
         body: JSON.stringify(data),
     });
 
@@ -29,11 +35,13 @@ export const createRecord = async (data) => {
 };
 
 /**
- * Get all records with SUCCESS status
- * @returns {Promise<Object>} - API response with records array
+ * Get one page of records with SUCCESS status
+ * @param {string|null} cursor - `next_cursor` from the previous page, if any
+ * @returns {Promise<Object>} - API response with records array and next_cursor
  */
-export const getSuccessRecords = async () => {
-    const response = await fetch(`${API_BASE_URL}/records/success/`);
+export const getSuccessRecords = async (cursor = null) => {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${API_BASE_URL}/records/success/${query}`);
 
     const result = await response.json();
 
@@ -43,3 +51,19 @@ export const getSuccessRecords = async () => {
 
     return result;
 };
+
+/**
+ * Get per-status record totals and hourly throughput
+ * @returns {Promise<Object>} - API response with totals, total and hourly
+ */
+export const getRecordStats = async () => {
+    const response = await fetch(`${API_BASE_URL}/records/stats/`);
+
+    const result = await response.json();
+
+    if (!response.ok) {
+        throw new Error(result.message || 'Failed to fetch record stats');
+    }
+
+    return result;
+};